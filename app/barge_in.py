@@ -0,0 +1,299 @@
+"""
+语音打断（barge-in）
+
+    PlaybackRingBuffer   流式播放环形缓冲：WebSocket 线程写入，sounddevice 输出回调读取，
+                         flush() 后下一次回调即输出静音（最多一个回调周期）
+    BargeInController    本地 VAD 检测到用户在 AI 播放时开口 → 发送 response.cancel、
+                         清空播放缓冲、丢弃被取消 response_id 的迟到音频包，并记录打断延迟
+
+打断延迟（写入 TurnTracer，python -m app.latency_tracer report 可查看）：
+    barge_in_cancel    检测到打断 → response.cancel 已发送
+    barge_in_silence   检测到打断 → 播放回调输出静音
+    barge_in_ack       检测到打断 → 服务端返回被取消的 response.done
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Optional
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SDK_PATH = os.path.join(PROJECT_ROOT, "glm-realtime-sdk", "python")
+if SDK_PATH not in sys.path:
+    sys.path.insert(0, SDK_PATH)
+
+from rtclient.models import ResponseCancelMessage
+
+from .latency_tracer import TurnTracer
+from .realtime_common import SAMPLE_RATE
+
+
+class PlaybackRingBuffer:
+    """流式播放环形缓冲（线程安全）"""
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        speed: float = 1.5,
+        gain: float = 2.0,
+        blocksize: int = 512,
+        capacity_seconds: float = 120.0,
+    ):
+        """
+        Args:
+            sample_rate: 服务端音频采样率
+            speed: 播放倍速（通过提高设备采样率实现，与原 sd.play 行为一致）
+            gain: 固定增益（流式播放无法按整段音频归一化）
+            blocksize: 输出回调的帧数，决定打断后静音的最大延迟
+            capacity_seconds: 缓冲容量，写满后丢弃新音频并计数
+        """
+        self.playback_rate = int(sample_rate * speed)
+        self.gain = gain
+        self.blocksize = blocksize
+        self.capacity = int(sample_rate * capacity_seconds)
+        self.dropped_samples = 0
+        self.on_first_audible: Optional[Callable[[Optional[str], float], None]] = None
+        self.on_flushed: Optional[Callable[[float, float], None]] = None
+
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._read = 0  # 累计读取位置
+        self._write = 0  # 累计写入位置
+        self._segments: deque[tuple[int, Optional[str]]] = deque()  # (结束位置, response_id)
+        self._last_started: Optional[str] = None
+        self._flush_requested_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stream = None
+
+    @property
+    def callback_period(self) -> float:
+        return self.blocksize / self.playback_rate
+
+    @property
+    def playing(self) -> bool:
+        with self._lock:
+            return self._write > self._read
+
+    @property
+    def current_response_id(self) -> Optional[str]:
+        """正在播放的音频所属的 response_id"""
+        with self._lock:
+            return self._segments[0][1] if self._segments else None
+
+    def open(self):
+        import sounddevice as sd
+
+        if self._stream is None:
+            self._stream = sd.OutputStream(
+                channels=1,
+                samplerate=self.playback_rate,
+                dtype="int16",
+                blocksize=self.blocksize,
+                latency="low",
+                callback=self.callback,
+            )
+            self._stream.start()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def write(self, chunk: np.ndarray, response_id: Optional[str] = None) -> bool:
+        """写入一段 int16 音频，缓冲已满时丢弃并返回 False"""
+        if self.gain != 1.0:
+            chunk = np.clip(chunk.astype(np.int32) * self.gain, -32768, 32767).astype(np.int16)
+        n = len(chunk)
+        with self._lock:
+            if n > self.capacity - (self._write - self._read):
+                self.dropped_samples += n
+                return False
+            start = self._write % self.capacity
+            first = min(n, self.capacity - start)
+            self._buffer[start:start + first] = chunk[:first]
+            self._buffer[:n - first] = chunk[first:]
+            self._write += n
+            self._segments.append((self._write, response_id))
+        return True
+
+    def flush(self):
+        """丢弃所有未播放的音频，下一次输出回调开始输出静音"""
+        with self._lock:
+            self._read = self._write
+            self._segments.clear()
+            self._last_started = None
+            self._flush_requested_at = time.perf_counter()
+
+    def callback(self, outdata, frames, time_info, status):
+        """sounddevice 输出回调"""
+        now = time.perf_counter()
+        started: Optional[str] = None
+        flushed: Optional[float] = None
+        out = outdata.reshape(-1)
+        with self._lock:
+            if self._flush_requested_at is not None:
+                flushed, self._flush_requested_at = self._flush_requested_at, None
+            n = min(frames, self._write - self._read)
+            if n > 0:
+                response_id = self._segments[0][1]
+                if response_id != self._last_started:
+                    self._last_started = started = response_id
+                start = self._read % self.capacity
+                first = min(n, self.capacity - start)
+                out[:first] = self._buffer[start:start + first]
+                out[first:n] = self._buffer[:n - first]
+                self._read += n
+                while self._segments and self._segments[0][0] <= self._read:
+                    self._segments.popleft()
+            out[n:] = 0
+        if flushed is not None and self.on_flushed:
+            self.on_flushed(flushed, now)
+        if started is not None and self.on_first_audible:
+            self.on_first_audible(started, now)
+
+
+class BargeInController:
+    """本地 VAD 触发的打断控制器"""
+
+    def __init__(
+        self,
+        player: PlaybackRingBuffer,
+        tracer: Optional[TurnTracer] = None,
+        send: Optional[Callable[[str], None]] = None,
+        vad: Optional[Callable[[np.ndarray], object]] = None,
+        voice_rms_threshold: float = 1500.0,
+        min_speech_ms: float = 240.0,
+        sample_rate: int = SAMPLE_RATE,
+    ):
+        """
+        Args:
+            player: 播放缓冲
+            tracer: 打断延迟写入的追踪器
+            send: 发送 JSON 文本到服务端的函数
+            vad: 可选的语音判定函数（如 SimpleMyVoiceProcessor.process，返回 None 表示非语音）
+            voice_rms_threshold: 播放期间判定为用户说话的 RMS 阈值（高于扬声器回声）
+            min_speech_ms: 连续有声超过该时长才触发打断，避免咳嗽/回声误触发
+        """
+        self.player = player
+        self.tracer = tracer or TurnTracer(enabled=False)
+        self.send = send
+        self.vad = vad
+        self.voice_rms_threshold = voice_rms_threshold
+        self.min_speech_ms = min_speech_ms
+        self.sample_rate = sample_rate
+
+        self.active_response_id: Optional[str] = None
+        self.cancelled: deque[str] = deque(maxlen=32)
+        self.late_deltas_dropped = 0
+        self.interruptions = 0
+        self._voiced_ms = 0.0
+        self._pending: Optional[dict] = None
+        self._lock = threading.Lock()
+
+        player.on_flushed = self._on_flushed
+        player.on_first_audible = lambda response_id, ts: self.tracer.mark("first_audible", ts)
+
+    def attach(self, send: Callable[[str], None]):
+        self.send = send
+
+    # --- 服务端事件 ---
+
+    def on_response_created(self, response_id: Optional[str]):
+        with self._lock:
+            self.active_response_id = response_id
+
+    def accept_delta(self, response_id: Optional[str]) -> bool:
+        """被取消的 response 的迟到音频包返回 False"""
+        if response_id is not None and response_id in self.cancelled:
+            self.late_deltas_dropped += 1
+            return False
+        return True
+
+    def on_response_done(self, response: dict):
+        with self._lock:
+            response_id = response.get("id")
+            if response_id == self.active_response_id:
+                self.active_response_id = None
+            pending = self._pending
+            if pending is None or response_id != pending["generating_id"]:
+                return
+            pending["ack"] = time.perf_counter()
+            pending["status"] = response.get("status")
+            self._finish_locked()
+
+    # --- 本地检测 ---
+
+    def on_mic_chunk(self, chunk: np.ndarray):
+        """麦克风回调中调用：AI 播放期间检测到持续人声则打断"""
+        if not self.player.playing:
+            self._voiced_ms = 0.0
+            return
+        mono = np.asarray(chunk).reshape(-1)
+        rms = float(np.sqrt(np.mean(np.square(mono.astype(np.float32))))) if mono.size else 0.0
+        voiced = rms >= self.voice_rms_threshold and (self.vad is None or self.vad(mono) is not None)
+        if not voiced:
+            self._voiced_ms = 0.0
+            return
+        self._voiced_ms += mono.size / self.sample_rate * 1000
+        if self._voiced_ms >= self.min_speech_ms:
+            self._voiced_ms = 0.0
+            self.interrupt(source="local_vad")
+
+    def interrupt(self, source: str = "local_vad", send_cancel: bool = True) -> bool:
+        """
+        打断当前回复
+        Args:
+            source: 触发来源（local_vad / keyboard / server_vad）
+            send_cancel: 是否发送 response.cancel（服务端 VAD 触发时服务端已自行取消）
+        Returns:
+            是否有可打断的回复
+        """
+        detected = time.perf_counter()
+        with self._lock:
+            response_id = self.player.current_response_id or self.active_response_id
+            if response_id is None and not self.player.playing:
+                return False
+            if self._pending is not None:
+                self._finish_locked()
+            # 服务端已生成完毕（只剩本地缓冲在播放）时无需取消，也不会有 ack
+            generating_id = self.active_response_id
+            for cancelled_id in {response_id, generating_id} - {None}:
+                self.cancelled.append(cancelled_id)
+            self._pending = {
+                "source": source, "response_id": response_id, "generating_id": generating_id, "detected": detected,
+            }
+            self.interruptions += 1
+        # 先静音再通知服务端：本地播放停止不依赖网络
+        self.player.flush()
+        if send_cancel and generating_id is not None and self.send is not None:
+            try:
+                self.send(ResponseCancelMessage().model_dump_json())
+                with self._lock:
+                    if self._pending is not None and self._pending["detected"] == detected:
+                        self._pending["cancel_sent"] = time.perf_counter()
+            except Exception as e:
+                print(f"   ⚠️ 发送取消命令失败: {e}")
+        print(f"\n⚡ [Barge-in] 已打断 AI 回复（{source}）")
+        return True
+
+    def _on_flushed(self, requested_at: float, flushed_at: float):
+        with self._lock:
+            if self._pending is not None and "silenced" not in self._pending:
+                self._pending["silenced"] = flushed_at
+                if self._pending["generating_id"] is None:
+                    self._finish_locked()
+
+    def _finish_locked(self):
+        pending, self._pending = self._pending, None
+        stages = {}
+        for stage, key in (("barge_in_cancel", "cancel_sent"), ("barge_in_silence", "silenced"), ("barge_in_ack", "ack")):
+            if key in pending:
+                stages[stage] = round(pending[key] - pending["detected"], 6)
+        self.tracer.record_interruption(stages, source=pending["source"], response_id=pending["response_id"])
+        if "barge_in_silence" in stages:
+            print(f"   ⏱️  打断静音延迟 {stages['barge_in_silence'] * 1000:.0f}ms")
@@ -0,0 +1,303 @@
+"""
+语音对话轮次延迟追踪
+
+每轮对话记录以下时间点（单调时钟）：
+    speech_end       本地估计的用户说话结束（最后一个超过能量阈值的上行音频块）
+    speech_stopped   收到 input_audio_buffer.speech_stopped
+    first_delta      收到第一个 response.audio.delta
+    first_audible    第一个音频样本交给播放设备
+    tool_requested   收到 response.function_call_arguments.done
+    tool_start/end   function call 往返
+
+打断（barge-in）单独记录为 type=interruption 的行，阶段见 app/barge_in.py。
+
+轮次在 response.done 时结束（若本轮有工具调用且尚未收到音频，则等待工具结果生成的回复；
+若音频尚未开始播放，则延后到 first_audible），结束后追加一行 JSONL，
+并刷新 Prometheus 文本格式的直方图文件（可供 node_exporter textfile collector 采集）。
+
+查看多次会话的 p50/p95：
+    python -m app.latency_tracer report data/latency/turns.jsonl
+"""
+
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+# 阶段名 → (起点事件, 终点事件)
+STAGES = {
+    "vad_detect": ("speech_end", "speech_stopped"),
+    "first_delta": ("speech_stopped", "first_delta"),
+    "playback_start": ("first_delta", "first_audible"),
+    "end_to_end": ("speech_end", "first_audible"),
+}
+TOOL_STAGE = "tool_call"
+# 打断（barge-in）延迟，见 app/barge_in.py
+INTERRUPTION_STAGES = ("barge_in_cancel", "barge_in_silence", "barge_in_ack")
+
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+class StageHistogram:
+    """Prometheus 风格的累积直方图"""
+
+    def __init__(self, buckets: tuple = HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        for i, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                self.counts[i] += 1
+
+    def exposition(self, metric: str, stage: str) -> list[str]:
+        lines = [f'{metric}_bucket{{stage="{stage}",le="{upper}"}} {n}' for upper, n in zip(self.buckets, self.counts)]
+        lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {self.count}')
+        lines.append(f'{metric}_sum{{stage="{stage}"}} {self.sum:.6f}')
+        lines.append(f'{metric}_count{{stage="{stage}"}} {self.count}')
+        return lines
+
+
+class TurnTracer:
+    """
+    轮次级延迟追踪器（线程安全，可在 websocket 线程、发送线程、播放线程中同时调用）
+    """
+
+    METRIC = "voice_turn_stage_seconds"
+
+    def __init__(
+        self,
+        output_dir: str = "data/latency",
+        voice_rms_threshold: float = 500.0,
+        enabled: bool = True,
+    ):
+        """
+        Args:
+            output_dir: turns.jsonl 与 metrics.prom 的输出目录
+            voice_rms_threshold: 判定上行音频块为"有声"的 RMS 阈值（int16）
+            enabled: 关闭后所有调用均为空操作
+        """
+        self.enabled = enabled
+        self.session_id = uuid.uuid4().hex[:12]
+        self.voice_rms_threshold = voice_rms_threshold
+        self.jsonl_path = os.path.join(output_dir, "turns.jsonl")
+        self.prom_path = os.path.join(output_dir, "metrics.prom")
+        if enabled:
+            os.makedirs(output_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._turn_index = 0
+        self._events: dict[str, float] = {}
+        self._tool_calls: list[float] = []
+        self._tool_started: Optional[float] = None
+        self._end_pending = False
+        self._histograms = {stage: StageHistogram() for stage in (*STAGES, TOOL_STAGE, *INTERRUPTION_STAGES)}
+
+    # --- 事件记录 ---
+
+    def note_audio(self, chunk: np.ndarray, ts: Optional[float] = None):
+        """上行音频块：超过能量阈值时更新本地估计的说话结束时间"""
+        if not self.enabled or chunk.size == 0:
+            return
+        rms = float(np.sqrt(np.mean(np.square(chunk.astype(np.float32)))))
+        if rms >= self.voice_rms_threshold:
+            with self._lock:
+                # 新一轮开始后才覆盖，已收到 speech_stopped 的轮次不再更新
+                if "speech_stopped" not in self._events:
+                    self._events["speech_end"] = ts or time.perf_counter()
+
+    def mark(self, event: str, ts: Optional[float] = None):
+        """记录事件（同一轮内只保留首次出现的时间）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if event == "speech_stopped" and self._end_pending:
+                # 上一轮的音频始终未播放（例如被打断），先结束上一轮
+                self._flush_locked()
+            self._events.setdefault(event, ts or time.perf_counter())
+            if event == "first_audible" and self._end_pending:
+                self._flush_locked()
+
+    def tool_call_started(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._tool_started = time.perf_counter()
+
+    def tool_call_finished(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._tool_started is not None:
+                self._tool_calls.append(time.perf_counter() - self._tool_started)
+                self._tool_started = None
+
+    def on_server_event(self, msg_type: str):
+        """在消息处理入口调用，按服务端事件类型打点"""
+        match msg_type:
+            case "input_audio_buffer.speech_stopped":
+                self.mark("speech_stopped")
+            case "response.audio.delta":
+                self.mark("first_delta")
+            case "response.function_call_arguments.done":
+                self.mark("tool_requested")
+            case "response.done":
+                self.end_turn()
+
+    # --- 轮次结束与输出 ---
+
+    def end_turn(self):
+        """收到 response.done 时调用；音频尚未开始播放时延后到 first_audible 再结束"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._events:
+                return
+            # 工具调用后的首个 response.done 不包含音频，等待工具结果触发的回复
+            # （工具可能还在队列中尚未开始执行，因此以收到 function call 为准，
+            # 未标记 tool_requested 的客户端仍以工具往返记录判断）
+            has_tool = "tool_requested" in self._events or self._tool_calls or self._tool_started is not None
+            if has_tool and "first_delta" not in self._events:
+                return
+            if "first_delta" in self._events and "first_audible" not in self._events:
+                self._end_pending = True
+                return
+            self._flush_locked()
+
+    def record_interruption(self, stages: dict[str, float], **fields):
+        """记录一次打断的各阶段耗时（单独成行，type=interruption）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for stage, seconds in stages.items():
+                self._histograms[stage].observe(seconds)
+            record = {
+                "session_id": self.session_id,
+                "type": "interruption",
+                "turn": self._turn_index,
+                "timestamp": datetime.now().isoformat(),
+                **fields,
+                "stages": stages,
+            }
+            self._write(record, self._exposition())
+
+    def _flush_locked(self):
+        record = self._build_record()
+        self._turn_index += 1
+        self._events = {}
+        self._tool_calls = []
+        self._tool_started = None
+        self._end_pending = False
+        for stage, seconds in record["stages"].items():
+            if stage == TOOL_STAGE:
+                for value in seconds:
+                    self._histograms[TOOL_STAGE].observe(value)
+            else:
+                self._histograms[stage].observe(seconds)
+        self._write(record, self._exposition())
+
+    def _build_record(self) -> dict:
+        stages: dict = {}
+        for stage, (start, end) in STAGES.items():
+            if start in self._events and end in self._events:
+                stages[stage] = round(self._events[end] - self._events[start], 6)
+        if self._tool_calls:
+            stages[TOOL_STAGE] = [round(v, 6) for v in self._tool_calls]
+        return {
+            "session_id": self.session_id,
+            "turn": self._turn_index,
+            "timestamp": datetime.now().isoformat(),
+            "stages": stages,
+        }
+
+    def _exposition(self) -> str:
+        lines = [
+            f"# HELP {self.METRIC} Voice turn latency per pipeline stage",
+            f"# TYPE {self.METRIC} histogram",
+        ]
+        for stage, histogram in self._histograms.items():
+            lines.extend(histogram.exposition(self.METRIC, stage))
+        return "\n".join(lines) + "\n"
+
+    def _write(self, record: dict, exposition: str):
+        try:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            tmp_path = self.prom_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(exposition)
+            os.replace(tmp_path, self.prom_path)
+        except OSError as e:
+            print(f"⚠️  [Latency] 写入延迟记录失败: {e}")
+
+
+# --- 报告 ---
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q))
+
+
+def load_stage_values(paths: list[str]) -> tuple[dict[str, list[float]], set[str]]:
+    """读取 turns.jsonl，返回 {阶段: [秒]} 与会话 ID 集合"""
+    values: dict[str, list[float]] = {}
+    sessions: set[str] = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                sessions.add(record.get("session_id", ""))
+                for stage, seconds in record.get("stages", {}).items():
+                    if isinstance(seconds, list):
+                        values.setdefault(stage, []).extend(seconds)
+                    else:
+                        values.setdefault(stage, []).append(seconds)
+    return values, sessions
+
+
+def print_report(paths: list[str]):
+    values, sessions = load_stage_values(paths)
+    print(f"📊 Voice turn latency ({len(sessions)} sessions)")
+    print(f"   {'stage':<15}{'count':>7}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}")
+    for stage in (*STAGES, TOOL_STAGE, *INTERRUPTION_STAGES):
+        stage_values = values.get(stage)
+        if not stage_values:
+            continue
+        print(
+            f"   {stage:<15}{len(stage_values):>7}"
+            f"{_percentile(stage_values, 50) * 1000:>10.0f}"
+            f"{_percentile(stage_values, 95) * 1000:>10.0f}"
+            f"{max(stage_values) * 1000:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="语音对话轮次延迟工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="打印各阶段 p50/p95")
+    report_parser.add_argument("paths", nargs="*", default=["data/latency/turns.jsonl"], help="turns.jsonl 文件或通配符")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        files = sorted({f for pattern in args.paths for f in glob.glob(pattern)})
+        if not files:
+            print("❌ 未找到延迟记录文件")
+        else:
+            print_report(files)
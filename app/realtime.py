@@ -16,6 +16,17 @@ from memory.realtime_sync import create_sync_worker  # 🔑 方案3：实时同
 from dotenv import load_dotenv
 from pynput import keyboard  # 用于键盘监听
 from .audio_processing import SimpleMyVoiceProcessor
+from .barge_in import BargeInController, PlaybackRingBuffer
+from .latency_tracer import TurnTracer
+from .realtime_common import (
+    WS_URL,
+    SAMPLE_RATE,
+    CHUNK,
+    CHUNK_DURATION,
+    build_session_config,
+    generate_jwt_token,
+    pcm_to_wav_base64,
+)
 
 # Load environment variables from .env file
 load_dotenv('/Users/xwj/Desktop/gpt-realtime-demo/.env')
@@ -64,17 +75,13 @@ def speak_local_tts(text: str):
 
 # --- 全局变量 ---
 API_KEY = os.getenv("ZHIPU_API_KEY")
-WS_URL = "wss://open.bigmodel.cn/api/paas/v4/realtime?model=GLM-Realtime"
 logger = DialogueLogger(filename="data/save_data.jsonl")
+tracer = TurnTracer(output_dir="data/latency")  # 轮次延迟追踪
 
 # 🔑 方案3：实时同步工作器
 CURRENT_USER_ID = os.getenv("USER_ID", "3f6c7b1a-9d2e-4f8a-b5c3-e1f2a3b4c5d6")
 sync_worker = None  # 延迟初始化，避免启动时连接失败影响主流程
 
-SAMPLE_RATE = 16000
-CHUNK = 1024
-CHUNK_DURATION = CHUNK / SAMPLE_RATE  # 0.064 秒
-
 # 本地语音处理器（VAD + 预留降噪）
 # vad_aggressiveness: 调整为2，平衡过滤噪音和保留语音
 voice_processor = SimpleMyVoiceProcessor(sample_rate=SAMPLE_RATE, vad_aggressiveness=2)
@@ -97,6 +104,12 @@ ai_is_responding = False
 ai_response_lock = threading.Lock()
 ws_global = None  # 全局 WebSocket 对象，用于打断功能
 
+# 🔑 Barge-in 模式：流式播放 + 本地 VAD 打断（BARGE_IN=1 或 --barge-in 启用）
+# 播放期间不暂停麦克风，用户开口即取消当前回复并在一个回调周期内静音
+BARGE_IN = os.getenv("BARGE_IN", "0") == "1" or "--barge-in" in sys.argv
+playback_ring = PlaybackRingBuffer(sample_rate=SAMPLE_RATE, speed=1.5)
+barge_in = BargeInController(playback_ring, tracer=tracer, vad=voice_processor.process)
+
 # 🔑 手动触发功能（空格键完成说话）
 manual_trigger_flag = threading.Event()
 last_manual_trigger_time = 0  # 防止连续触发
@@ -111,6 +124,13 @@ def interrupt_ai_response():
     """打断 AI 的回复"""
     global ai_is_responding, audio_playback_buffer
     
+    if BARGE_IN:
+        # 流式播放模式：清空播放缓冲 + response.cancel，迟到的音频包按 response_id 丢弃
+        if barge_in.interrupt(source="keyboard"):
+            with ai_response_lock:
+                ai_is_responding = False
+        return
+    
     with ai_response_lock:
         if not ai_is_responding:
             print("💡 AI 当前未在回复，无需打断")
@@ -198,37 +218,6 @@ def manual_trigger_listener_thread():
 
 # --- 核心函数 ---
 
-def pcm_to_wav_base64(pcm_data: np.ndarray, sample_rate: int = 16000) -> str:
-    """
-    将 PCM 音频数据包装成 WAV 格式并转为 base64
-    Args:
-        pcm_data: int16 格式的 numpy 数组
-        sample_rate: 采样率
-    Returns:
-        base64 编码的 WAV 数据
-    """
-    wav_io = BytesIO()
-    with wave.open(wav_io, "wb") as wav_out:
-        wav_out.setnchannels(1)  # 单声道
-        wav_out.setsampwidth(2)  # 16bit = 2 bytes
-        wav_out.setframerate(sample_rate)
-        wav_out.writeframes(pcm_data.tobytes())
-    
-    wav_io.seek(0)
-    return base64.b64encode(wav_io.getvalue()).decode("utf-8")
-
-def generate_jwt_token(api_key: str, exp_seconds: int = 3600) -> str:
-    """Generate JWT token for authentication."""
-    try:
-        api_key_id, api_key_secret = api_key.split('.')
-    except ValueError:
-        raise ValueError("API Key format is incorrect, should be 'API_KEY_ID.API_KEY_SECRET'")
-    current_time = int(time.time())
-    payload = {"api_key": api_key_id, "exp": current_time + exp_seconds, "timestamp": current_time}
-    encoded_jwt = jwt.encode(payload, api_key_secret, algorithm="HS256",
-                             headers={"alg": "HS256", "sign_type": "SIGN"})
-    return encoded_jwt
-
 def callback(indata, frames, time_info, status):
     """sounddevice input stream callback function."""
     global last_audio_time, is_speaking
@@ -240,6 +229,10 @@ def callback(indata, frames, time_info, status):
     if stop_event.is_set():
         return
     
+    # 🔑 Barge-in：AI 播放期间检测到持续人声则打断
+    if BARGE_IN:
+        barge_in.on_mic_chunk(indata)
+    
     # 🔑 完全依赖 Server VAD，本地只做最基础的音量显示
     volume_norm = np.linalg.norm(indata) * 10 
     
@@ -301,6 +294,7 @@ def send_audio_loop(ws):
         
         try:
             chunk = audio_queue.get(timeout=0.05)
+            tracer.note_audio(chunk)
             audio_batch.append(chunk)
             
             # 当累积到足够的音频 且 满足速率限制
@@ -347,6 +341,7 @@ def on_message(ws, message):
     
     data = json.loads(message)
     msg_type = data.get("type")
+    tracer.on_server_event(msg_type)
     
     # 只在关键消息时打印详细信息
     if msg_type in ("session.created", "session.updated", "error", "session.error"):
@@ -354,6 +349,9 @@ def on_message(ws, message):
     
     if msg_type in ("session.created", "session.updated"):
         print("✅ Session Info:", data.get("session", {}).get("id"))
+        if BARGE_IN:
+            barge_in.attach(ws.send)
+            playback_ring.open()
         session_ready.set()
         
     elif msg_type == "conversation.item.input_audio_transcription.completed":
@@ -375,6 +373,9 @@ def on_message(ws, message):
         sys.stdout.flush()
         
     elif msg_type == "response.audio.delta":
+        # 🔑 Barge-in：已取消回复的迟到音频包直接丢弃
+        if BARGE_IN and not barge_in.accept_delta(data.get("response_id")):
+            return
         try:
             # 🔑 标记 AI 开始回复（第一次接收音频时）
             if not ai_is_responding:
@@ -393,16 +394,20 @@ def on_message(ws, message):
             # 调试信息
             print(f"🔊 Audio chunk: {len(audio_bytes)} bytes", end='\r', flush=True)
             
-            # 累积音频到缓冲区
-            with playback_lock:
-                audio_playback_buffer.append(audio_np)
+            # 累积音频到缓冲区（Barge-in 模式直接写入流式播放缓冲）
+            if BARGE_IN:
+                playback_ring.write(audio_np, data.get("response_id"))
+                audio_played_in_response = True
+            else:
+                with playback_lock:
+                    audio_playback_buffer.append(audio_np)
             
         except Exception as e:
             print(f"\n❌ Audio processing error: {e}")
             import traceback
             traceback.print_exc()
             
-    elif msg_type == "response.audio.done":
+    elif msg_type == "response.audio.done" and not BARGE_IN:
         try:
             print(f"\n\n🎵 Audio stream complete, preparing playback...")
             
@@ -458,6 +463,7 @@ def on_message(ws, message):
                                 stream_was_active = True
                         
                         try:
+                            tracer.mark("first_audible")
                             sd.play(full_audio, samplerate=playback_rate, blocking=True)
                             print("   ✅ 播放完成！")
                         finally:
@@ -513,6 +519,8 @@ def on_message(ws, message):
         # 🔑 标记 AI 回复结束
         with ai_response_lock:
             ai_is_responding = False
+        if BARGE_IN:
+            barge_in.on_response_done(data.get("response", {}))
         
         print("🎉 Response complete")
         print("🎤 [正在听...] 您可以说话了\n" + "="*40)
@@ -541,6 +549,9 @@ def on_message(ws, message):
         
     elif msg_type == "input_audio_buffer.speech_started":
         print("\n🎤 [Server VAD] 检测到语音开始")
+        # 🔑 Barge-in：服务端 VAD 先于本地检测到说话时，服务端已自行取消回复，只需本地静音
+        if BARGE_IN and playback_ring.playing:
+            barge_in.interrupt(source="server_vad", send_cancel=False)
         
     elif msg_type == "input_audio_buffer.speech_stopped":
         print("\n⏸️  [Server VAD] 检测到语音结束")
@@ -568,6 +579,8 @@ def on_message(ws, message):
     elif msg_type == "response.created":
         # 显示 AI 开始生成回复
         print("\n🤖 AI 开始生成回复...")
+        if BARGE_IN:
+            barge_in.on_response_created(data.get("response", {}).get("id"))
         
     elif msg_type in ("rate_limits.updated", "conversation.created", "conversation.updated"):
         # 静默处理这些常见消息
@@ -583,31 +596,7 @@ def on_message(ws, message):
 def on_open(ws):
     """Called when WebSocket connection is established."""
     print("🔌 WebSocket connected, configuring session...")
-    session_config = {
-        "type": "session.update",
-        "session": {
-            "input_audio_format": "wav",
-            "output_audio_format": "pcm",
-            "turn_detection": {
-                "type": "server_vad",
-                "threshold": 0.5,              # 🔑 降低阈值，更容易检测到语音
-                "prefix_padding_ms": 300,      # 说话前缓冲 (毫秒)
-                "silence_duration_ms": 700     # 🔑 0.7秒静音即可触发，更灵敏
-            },
-            "input_audio_transcription": {
-                "enabled": True
-            },
-            "temperature": 0.8,  # 自然度
-            "modalities": ["audio", "text"],
-            "voice": "female-sweet",  # 🔑 甜美女声
-            "beta_fields": {
-               "chat_mode": "audio",
-               "tts_source": "e2e",  # 端到端语音合成
-               "auto_search": False,
-               "voice": "female-sweet"  # 🔑 甜美女声
-           }
-        }
-    }
+    session_config = build_session_config()
     print(f"📤 Session config:")
     print(f"   - Server VAD: threshold=0.5, silence=700ms")
     print(f"   - Voice: female-sweet (甜美女声)")
@@ -678,7 +667,7 @@ if __name__ == "__main__":
     print("💡 Usage:")
     print("   1. Speak into the microphone")
     print("   2. Pause for 2 seconds to get response")
-    print("   3. Press Enter to interrupt AI")
+    print("   3. Press Enter to interrupt AI" + ("（或直接开口打断）" if BARGE_IN else ""))
     print("   4. Press Ctrl+C to exit")
     print("="*50 + "\n")
     
@@ -752,4 +741,7 @@ if __name__ == "__main__":
         if ws:
              threading.Thread(target=ws.close).start()
         sd.stop()
+        if BARGE_IN:
+            playback_ring.close()
+            print(f"⚡ Barge-in: 打断 {barge_in.interruptions} 次，丢弃迟到音频包 {barge_in.late_deltas_dropped} 个")
         print("✅ 已退出")
\ No newline at end of file
@@ -0,0 +1,493 @@
+"""
+asyncio 版 GLM-Realtime 语音助手核心循环
+
+基于 rtclient.RTSessionManager（断线自动重连），所有阶段运行在同一个事件循环中，
+阶段之间通过有界 asyncio.Queue 通信，背压显式可见：
+
+    采集 capture  → [uplink_queue]   → 上行 uplink   → WebSocket
+    WebSocket     → 下行 downlink    → [playback_queue] → 播放 playback
+                                     → [tool_queue]     → 工具调用 tool
+                                     → [memory_queue]   → 记忆同步 memory
+
+每个阶段记录排队等待时间与处理时间（StageStats），退出时打印汇总。
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SDK_PATH = os.path.join(PROJECT_ROOT, "glm-realtime-sdk", "python")
+if SDK_PATH not in sys.path:
+    sys.path.insert(0, SDK_PATH)
+
+from rtclient import RTSessionManager, close_shared_connector
+from rtclient.models import (
+    FunctionCallOutputItem,
+    InputAudioBufferAppendMessage,
+    ItemCreateMessage,
+    ResponseCreateMessage,
+)
+
+from .latency_tracer import TurnTracer
+from .realtime_common import (
+    CHUNK,
+    SAMPLE_RATE,
+    WS_URL,
+    build_session_config,
+    generate_jwt_token,
+    pcm_to_wav_base64,
+)
+
+
+@dataclass
+class StageStats:
+    """单个流水线阶段的延迟统计"""
+
+    name: str
+    count: int = 0
+    dropped: int = 0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+    busy_total: float = 0.0
+    busy_max: float = 0.0
+
+    def record(self, enqueued_at: float, started_at: float, finished_at: float):
+        wait = started_at - enqueued_at
+        busy = finished_at - started_at
+        self.count += 1
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.busy_total += busy
+        self.busy_max = max(self.busy_max, busy)
+
+    def summary(self) -> str:
+        if not self.count:
+            return f"{self.name:<9} count=0 dropped={self.dropped}"
+        return (
+            f"{self.name:<9} count={self.count} dropped={self.dropped} "
+            f"wait(avg/max)={self.queue_wait_total / self.count * 1000:.1f}/{self.queue_wait_max * 1000:.1f}ms "
+            f"busy(avg/max)={self.busy_total / self.count * 1000:.1f}/{self.busy_max * 1000:.1f}ms"
+        )
+
+
+class MicrophoneSource:
+    """麦克风采集源：sounddevice 回调线程 → 事件循环内的有界队列（满则丢弃并计数）"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, blocksize: int = CHUNK, maxsize: int = 64):
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stream = None
+
+    def _push(self, chunk: np.ndarray):
+        try:
+            self._queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            print("Microphone Warning:", status, file=sys.stderr)
+        self._loop.call_soon_threadsafe(self._push, indata.reshape(-1).copy())
+
+    async def __aiter__(self) -> AsyncIterator[np.ndarray]:
+        import sounddevice as sd
+
+        self._loop = asyncio.get_running_loop()
+        self._stream = sd.InputStream(
+            channels=1, samplerate=self.sample_rate, dtype="int16", blocksize=self.blocksize, callback=self._callback
+        )
+        self._stream.start()
+        try:
+            while True:
+                yield await self._queue.get()
+        finally:
+            self._stream.stop()
+            self._stream.close()
+
+
+class SpeakerSink:
+    """扬声器播放：流式写入 sounddevice OutputStream（阻塞写放到线程中执行）"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, speed: float = 1.5, gain: float = 2.0):
+        self.sample_rate = int(sample_rate * speed)
+        self.gain = gain
+        self._stream = None
+
+    def open(self):
+        import sounddevice as sd
+
+        self._stream = sd.OutputStream(channels=1, samplerate=self.sample_rate, dtype="int16")
+        self._stream.start()
+
+    async def write(self, chunk: np.ndarray):
+        if self.gain != 1.0:
+            chunk = np.clip(chunk.astype(np.int32) * self.gain, -32768, 32767).astype(np.int16)
+        await asyncio.to_thread(self._stream.write, chunk)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+def _field(message: Any, name: str, default=None):
+    """rtclient 未能转换的消息以 dict 返回，统一取字段"""
+    if isinstance(message, dict):
+        return message.get(name, default)
+    return getattr(message, name, default)
+
+
+class AsyncRealtimeClient:
+    """单事件循环的实时语音客户端"""
+
+    def __init__(
+        self,
+        url: str,
+        headers: dict[str, str],
+        source,
+        sink,
+        session_config: Optional[dict] = None,
+        tool_executor: Optional[Callable[[str, dict], Any]] = None,
+        dialogue_logger=None,
+        sync_worker=None,
+        tracer: Optional[TurnTracer] = None,
+        batch_size: int = 4,
+        max_qps: int = 20,
+        uplink_maxsize: int = 32,
+        playback_maxsize: int = 256,
+        tool_maxsize: int = 8,
+        memory_maxsize: int = 32,
+        drain_timeout: float = 10.0,
+    ):
+        """
+        Args:
+            url: WebSocket 地址
+            headers: 请求头（含鉴权）
+            source: 异步可迭代的采集源，产出 int16 单声道 numpy 块
+            sink: 播放端，需实现 open() / async write(chunk) / close()
+            session_config: session.update 消息，默认使用 build_session_config()
+            tool_executor: 同步函数 (name, arguments) -> result，在线程中执行
+            dialogue_logger: memory.data_logger.DialogueLogger 实例
+            sync_worker: memory.realtime_sync.MemobaseSyncWorker 实例
+            tracer: 轮次延迟追踪器，默认不记录
+            batch_size: 每次上行合并的音频块数（4 * 64ms ≈ 256ms）
+            max_qps: 上行请求速率上限
+            drain_timeout: 采集源结束后等待进行中的回复、工具调用与记忆同步完成的最长时间（秒）
+        """
+        self.session = RTSessionManager(url, headers=headers)
+        self.source = source
+        self.sink = sink
+        self.session_config = session_config or build_session_config()
+        self.tool_executor = tool_executor
+        self.dialogue_logger = dialogue_logger
+        self.sync_worker = sync_worker
+        self.tracer = tracer or TurnTracer(enabled=False)
+        self.batch_size = batch_size
+        self.min_interval = 1.0 / max_qps
+        self.drain_timeout = drain_timeout
+
+        self.uplink_queue: asyncio.Queue = asyncio.Queue(maxsize=uplink_maxsize)
+        self.playback_queue: asyncio.Queue = asyncio.Queue(maxsize=playback_maxsize)
+        self.tool_queue: asyncio.Queue = asyncio.Queue(maxsize=tool_maxsize)
+        self.memory_queue: asyncio.Queue = asyncio.Queue(maxsize=memory_maxsize)
+
+        self.stats = {name: StageStats(name) for name in ("capture", "uplink", "playback", "tool", "memory")}
+        self.session_ready = asyncio.Event()
+        self.stop_event = asyncio.Event()
+        self.ai_is_responding = False
+        self._last_delta_response_id: Optional[str] = None
+        # 没有进行中的回复（用户开始说话或工具结果请求回复时清除，response.done 时设置）
+        self.response_idle = asyncio.Event()
+        self.response_idle.set()
+
+    # --- 采集 → 上行 ---
+
+    async def capture_stage(self):
+        """采集阶段：从采集源读取音频块放入上行队列（队列满时阻塞，背压传导到采集源）"""
+        async for chunk in self.source:
+            if self.stop_event.is_set():
+                break
+            start = time.perf_counter()
+            self.tracer.note_audio(chunk, start)
+            await self.uplink_queue.put((start, chunk))
+            self.stats["capture"].record(start, start, time.perf_counter())
+        await self.uplink_queue.put(None)  # 采集结束
+
+    async def uplink_stage(self):
+        """上行阶段：批量合并音频并按速率限制发送"""
+        await self.session_ready.wait()
+        batch: list[tuple[float, np.ndarray]] = []
+        last_send_time = 0.0
+        while True:
+            item = await self.uplink_queue.get()
+            if item is not None:
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                wait = self.min_interval - (time.perf_counter() - last_send_time)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                start = time.perf_counter()
+                audio_base64 = pcm_to_wav_base64(np.concatenate([chunk for _, chunk in batch]), SAMPLE_RATE)
+                await self.session.send(InputAudioBufferAppendMessage(audio=audio_base64))
+                last_send_time = time.perf_counter()
+                self.stats["uplink"].record(batch[0][0], start, last_send_time)
+                batch.clear()
+            if item is None:
+                break
+
+    # --- 下行 → 播放 / 工具 / 记忆 ---
+
+    async def downlink_stage(self):
+        """下行阶段：接收服务器消息并分发到各队列"""
+        async for message in self.session:
+            if self.stop_event.is_set():
+                break
+            received_at = time.perf_counter()
+            msg_type = _field(message, "type")
+            self.tracer.on_server_event(msg_type)
+            match msg_type:
+                case "session.created" | "session.updated":
+                    self.session_ready.set()
+                case "conversation.item.input_audio_transcription.completed":
+                    transcript = _field(message, "transcript", "")
+                    if transcript:
+                        print(f"\n📝 [USER_TEXT]: {transcript}")
+                        if self.dialogue_logger:
+                            self.dialogue_logger.log_user_input(transcript)
+                case "response.audio.delta":
+                    self.ai_is_responding = True
+                    delta = _field(message, "delta")
+                    if delta:
+                        chunk = np.frombuffer(base64.b64decode(delta), dtype=np.int16)
+                        response_id = _field(message, "response_id")
+                        first_of_response = response_id != self._last_delta_response_id
+                        self._last_delta_response_id = response_id
+                        await self.playback_queue.put((received_at, chunk, first_of_response))
+                case "response.audio_transcript.done":
+                    transcript = _field(message, "transcript", "")
+                    if transcript:
+                        print(f"\n📝 AI: {transcript}")
+                        if self.dialogue_logger:
+                            self.dialogue_logger.log_assistant_delta(transcript)
+                case "response.function_call_arguments.done":
+                    await self.tool_queue.put((received_at, message))
+                case "response.created":
+                    self.response_idle.clear()
+                case "response.done":
+                    self.ai_is_responding = False
+                    self.response_idle.set()
+                    try:
+                        self.memory_queue.put_nowait((received_at, None))
+                    except asyncio.QueueFull:
+                        self.stats["memory"].dropped += 1
+                case "input_audio_buffer.speech_started":
+                    self.response_idle.clear()
+                    print("\n🎤 [Server VAD] 检测到语音开始")
+                case "input_audio_buffer.speech_stopped":
+                    print("\n⏸️  [Server VAD] 检测到语音结束")
+                case "error":
+                    print(f"❌ Error: {_field(message, 'error')}")
+
+    async def playback_stage(self):
+        """播放阶段：按顺序写入播放端"""
+        self.sink.open()
+        try:
+            while True:
+                received_at, chunk, first_of_response = await self.playback_queue.get()
+                start = time.perf_counter()
+                if first_of_response:
+                    self.tracer.mark("first_audible", start)
+                await self.sink.write(chunk)
+                self.stats["playback"].record(received_at, start, time.perf_counter())
+                self.playback_queue.task_done()
+        finally:
+            self.sink.close()
+
+    async def tool_stage(self):
+        """工具调用阶段：在线程中执行函数调用，结果回传并请求生成回复"""
+        while True:
+            received_at, message = await self.tool_queue.get()
+            start = time.perf_counter()
+            self.tracer.tool_call_started()
+            name = _field(message, "name", "")
+            try:
+                arguments = json.loads(_field(message, "arguments") or "{}")
+                print(f"\n🔔 收到 Function Call: {name}")
+                if self.tool_executor is None:
+                    result = {"status": "error", "message": f"未配置工具执行器，无法调用 {name}"}
+                else:
+                    result = await asyncio.to_thread(self.tool_executor, name, arguments)
+                output_item = FunctionCallOutputItem(output=json.dumps(result, ensure_ascii=False))
+                await self.session.send(ItemCreateMessage(item=output_item))
+                # 工具结果触发的回复在 response.created 到达前就视为进行中
+                self.response_idle.clear()
+                await self.session.send(ResponseCreateMessage())
+            except Exception as e:
+                print(f"\n❌ Function Call 处理错误: {e}")
+            self.tracer.tool_call_finished()
+            self.stats["tool"].record(received_at, start, time.perf_counter())
+            self.tool_queue.task_done()
+
+    async def memory_stage(self):
+        """记忆同步阶段：落盘本轮对话并交给 Memobase 同步工作器"""
+        while True:
+            received_at, _ = await self.memory_queue.get()
+            start = time.perf_counter()
+            if self.dialogue_logger:
+                dialogue_data = await asyncio.to_thread(self.dialogue_logger.finalize_turn)
+                if dialogue_data and self.sync_worker:
+                    if not self.sync_worker.enqueue(dialogue_data):
+                        print("⚠️  [实时同步] 加入队列失败，将由定时任务处理")
+            self.stats["memory"].record(received_at, start, time.perf_counter())
+            self.memory_queue.task_done()
+
+    # --- 生命周期 ---
+
+    async def drain(self):
+        """等待进行中的回复、工具调用、播放与记忆同步全部完成"""
+        while True:
+            await self.response_idle.wait()
+            await self.tool_queue.join()
+            # 工具结果可能又请求了一轮回复
+            if self.response_idle.is_set():
+                break
+        await self.playback_queue.join()
+        await self.memory_queue.join()
+
+    async def run(self):
+        """连接并运行所有阶段，直到采集源结束（并排空，见 drain）、连接关闭或 stop_event 被设置"""
+        await self.session.connect()
+        await self.session.send(self.session_config)
+        stage_tasks = [
+            asyncio.create_task(stage(), name=stage.__name__)
+            for stage in (
+                self.capture_stage,
+                self.uplink_stage,
+                self.downlink_stage,
+                self.playback_stage,
+                self.tool_stage,
+                self.memory_stage,
+            )
+        ]
+        uplink_task, downlink_task = stage_tasks[1], stage_tasks[2]
+        stop_task = asyncio.create_task(self.stop_event.wait())
+        drain_task = None
+        try:
+            done, _ = await asyncio.wait(
+                [uplink_task, downlink_task, stop_task], return_when=asyncio.FIRST_COMPLETED
+            )
+            if uplink_task in done and not downlink_task.done() and not stop_task.done():
+                # 音频已发完，保留下行与播放直到最后一轮回复结束或超时
+                drain_task = asyncio.create_task(self.drain())
+                await asyncio.wait(
+                    [drain_task, downlink_task, stop_task],
+                    timeout=self.drain_timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+        finally:
+            if drain_task is not None:
+                stage_tasks.append(drain_task)
+            for task in stage_tasks + [stop_task]:
+                task.cancel()
+            await asyncio.gather(*stage_tasks, stop_task, return_exceptions=True)
+            await self.session.close()
+            await close_shared_connector()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def print_stats(self):
+        print("\n📊 Pipeline stage stats")
+        for stage in self.stats.values():
+            print(f"   {stage.summary()}")
+        if self.session.reconnect_times:
+            print(f"   reconnects={len(self.session.reconnect_times)} "
+                  f"max={max(self.session.reconnect_times) * 1000:.0f}ms")
+
+
+def build_agent_options(user_id: str) -> tuple[dict, Callable[[str, dict], Any]]:
+    """集成版配置：function call 定义 + 用户记忆 + Claude Code 执行器"""
+    from agents.claude_code_client import execute_function_call
+    from agents.function_definitions import get_function_definitions
+    from memory.memory_manager import format_memory_for_glm
+
+    instructions = "你是一个智能旅行助手，能帮用户规划行程、订票、订酒店。"
+    memory_context = format_memory_for_glm(user_id)
+    if memory_context:
+        instructions += f"\n\n{memory_context}"
+    session_config = build_session_config(tools=get_function_definitions(), instructions=instructions)
+    return session_config, execute_function_call
+
+
+async def main(args: argparse.Namespace):
+    from dotenv import load_dotenv
+
+    from memory.data_logger import DialogueLogger
+    from memory.realtime_sync import create_sync_worker
+
+    load_dotenv()
+    api_key = os.getenv("ZHIPU_API_KEY")
+    if not api_key:
+        print("❌ Please set the ZHIPU_API_KEY environment variable first")
+        sys.exit(1)
+    user_id = os.getenv("USER_ID", "3f6c7b1a-9d2e-4f8a-b5c3-e1f2a3b4c5d6")
+
+    session_config, tool_executor = None, None
+    if args.agent:
+        session_config, tool_executor = build_agent_options(user_id)
+
+    try:
+        sync_worker = create_sync_worker(user_id)
+    except Exception as e:
+        print(f"⚠️  实时同步工作器初始化失败: {e}")
+        sync_worker = None
+
+    client = AsyncRealtimeClient(
+        WS_URL,
+        headers={"Authorization": f"Bearer {generate_jwt_token(api_key)}"},
+        source=MicrophoneSource(),
+        sink=SpeakerSink(),
+        session_config=session_config,
+        tool_executor=tool_executor,
+        dialogue_logger=DialogueLogger(filename="data/save_data.jsonl"),
+        sync_worker=sync_worker,
+        tracer=TurnTracer(output_dir="data/latency"),
+        batch_size=args.batch_size,
+    )
+    print("🎤 [正在听...] Ready! Start speaking... (Ctrl+C 退出)")
+    try:
+        await client.run()
+    finally:
+        client.print_stats()
+        if sync_worker:
+            sync_worker.stop(timeout=5)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="asyncio 版 GLM-Realtime 语音助手")
+    parser.add_argument("--agent", action="store_true", help="启用 function call + 用户记忆")
+    parser.add_argument("--batch-size", type=int, default=4, help="每次上行合并的音频块数")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,83 @@
+"""
+实时语音客户端公共部分
+不依赖音频设备，线程版 realtime.py 与 asyncio 版 realtime_async.py 共用
+"""
+
+import base64
+import time
+import wave
+from io import BytesIO
+
+import jwt
+import numpy as np
+
+WS_URL = "wss://open.bigmodel.cn/api/paas/v4/realtime?model=GLM-Realtime"
+
+SAMPLE_RATE = 16000
+CHUNK = 1024
+CHUNK_DURATION = CHUNK / SAMPLE_RATE  # 0.064 秒
+
+
+def pcm_to_wav_base64(pcm_data: np.ndarray, sample_rate: int = 16000) -> str:
+    """
+    将 PCM 音频数据包装成 WAV 格式并转为 base64
+    Args:
+        pcm_data: int16 格式的 numpy 数组
+        sample_rate: 采样率
+    Returns:
+        base64 编码的 WAV 数据
+    """
+    wav_io = BytesIO()
+    with wave.open(wav_io, "wb") as wav_out:
+        wav_out.setnchannels(1)  # 单声道
+        wav_out.setsampwidth(2)  # 16bit = 2 bytes
+        wav_out.setframerate(sample_rate)
+        wav_out.writeframes(pcm_data.tobytes())
+
+    wav_io.seek(0)
+    return base64.b64encode(wav_io.getvalue()).decode("utf-8")
+
+def generate_jwt_token(api_key: str, exp_seconds: int = 3600) -> str:
+    """Generate JWT token for authentication."""
+    try:
+        api_key_id, api_key_secret = api_key.split('.')
+    except ValueError:
+        raise ValueError("API Key format is incorrect, should be 'API_KEY_ID.API_KEY_SECRET'")
+    current_time = int(time.time())
+    payload = {"api_key": api_key_id, "exp": current_time + exp_seconds, "timestamp": current_time}
+    encoded_jwt = jwt.encode(payload, api_key_secret, algorithm="HS256",
+                             headers={"alg": "HS256", "sign_type": "SIGN"})
+    return encoded_jwt
+
+def build_session_config(**overrides) -> dict:
+    """
+    构建 session.update 消息（Server VAD + 甜美女声）
+    Args:
+        overrides: 覆盖 session 中的字段，如 tools / instructions
+    Returns:
+        session.update 消息字典
+    """
+    session = {
+        "input_audio_format": "wav",
+        "output_audio_format": "pcm",
+        "turn_detection": {
+            "type": "server_vad",
+            "threshold": 0.5,              # 🔑 降低阈值，更容易检测到语音
+            "prefix_padding_ms": 300,      # 说话前缓冲 (毫秒)
+            "silence_duration_ms": 700     # 🔑 0.7秒静音即可触发，更灵敏
+        },
+        "input_audio_transcription": {
+            "enabled": True
+        },
+        "temperature": 0.8,  # 自然度
+        "modalities": ["audio", "text"],
+        "voice": "female-sweet",  # 🔑 甜美女声
+        "beta_fields": {
+           "chat_mode": "audio",
+           "tts_source": "e2e",  # 端到端语音合成
+           "auto_search": False,
+           "voice": "female-sweet"  # 🔑 甜美女声
+       }
+    }
+    session.update(overrides)
+    return {"type": "session.update", "session": session}
@@ -29,6 +29,9 @@ def on_message_with_agent(ws, message):
     
     # 🔧 处理 Function Call
     if msg_type == "response.function_call_arguments.done":
+        # 此分支不经过 rt.on_message，需自行打点，否则首个 response.done 会提前结束本轮
+        tracer.on_server_event(msg_type)
+        tracer.tool_call_started()
         try:
             function_name = data.get("name", "")
             arguments_str = data.get("arguments", "{}")
@@ -68,6 +71,9 @@ def on_message_with_agent(ws, message):
             print(f"\n❌ Function Call 处理错误: {e}")
             import traceback
             traceback.print_exc()
+        finally:
+            # 工具往返：收到参数 → 结果与 response.create 已发送
+            tracer.tool_call_finished()
     
     else:
         # 其他消息类型使用原有的处理逻辑
@@ -0,0 +1,126 @@
+"""
+录制真实 GLM-Realtime 会话，生成 bench/replay_server.py 可回放的录制文件
+
+    python -m bench.record_session input.wav -o data/bench/recording.json
+
+按实时节奏发送 WAV（结束后补静音），以 speech_stopped 为每轮基准时间记录服务端事件；
+收到 function call 时回传固定结果并记录 wait_for，回放时由被测客户端的 response.create 驱动。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from aiohttp import ClientSession, WSMsgType
+
+from app.realtime_common import SAMPLE_RATE, WS_URL, build_session_config, generate_jwt_token, pcm_to_wav_base64
+
+from .wav_source import WavSource
+
+
+class SessionRecorder:
+    """把服务端事件按轮次切分为录制格式"""
+
+    def __init__(self):
+        self.session_events: list[dict] = []
+        self.turns: list[dict] = []
+        self.audio_ms_sent = 0.0
+        self._base: float = 0.0
+        self._pending_speech_started: list[dict] = []
+
+    def on_event(self, event: dict):
+        now = time.perf_counter()
+        msg_type = event.get("type", "")
+        if msg_type == "input_audio_buffer.speech_started":
+            self._pending_speech_started.append(event)
+            return
+        if msg_type == "input_audio_buffer.speech_stopped":
+            self._base = now
+            events = [{"offset_ms": 0, "event": e} for e in self._pending_speech_started]
+            self._pending_speech_started = []
+            events.append({"offset_ms": 0, "event": event})
+            self.turns.append({"trigger_audio_ms": round(self.audio_ms_sent), "events": events})
+            return
+        if not self.turns:
+            self.session_events.append(event)
+            return
+        offset = round((now - self._base) * 1000, 1)
+        self.turns[-1]["events"].append({"offset_ms": offset, "event": event})
+
+    def on_response_create(self):
+        self.turns[-1]["events"].append({"wait_for": "response.create"})
+        self._base = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        return {"session": self.session_events, "turns": self.turns}
+
+
+async def record(wav_path: str, api_key: str, tail_seconds: float, batch_size: int = 4) -> dict:
+    recorder = SessionRecorder()
+    headers = {"Authorization": f"Bearer {generate_jwt_token(api_key)}"}
+    async with ClientSession() as session, session.ws_connect(WS_URL, headers=headers) as ws:
+        await ws.send_json(build_session_config())
+
+        async def uplink():
+            batch = []
+            async for chunk in WavSource(wav_path, trailing_silence=tail_seconds):
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    pcm = np.concatenate(batch)
+                    await ws.send_json({"type": "input_audio_buffer.append",
+                                        "audio": pcm_to_wav_base64(pcm, SAMPLE_RATE)})
+                    recorder.audio_ms_sent += len(pcm) / SAMPLE_RATE * 1000
+                    batch.clear()
+
+        async def downlink():
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                event = json.loads(msg.data)
+                recorder.on_event(event)
+                if event.get("type") == "response.function_call_arguments.done":
+                    output = {"status": "success", "message": "录制用固定结果"}
+                    await ws.send_json({"type": "conversation.item.create", "item": {
+                        "type": "function_call_output", "output": json.dumps(output, ensure_ascii=False)}})
+                    await ws.send_json({"type": "response.create"})
+                    recorder.on_response_create()
+                elif event.get("type") == "error":
+                    print(f"❌ Error: {event.get('error')}")
+
+        receiver = asyncio.create_task(downlink())
+        try:
+            await uplink()
+        finally:
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+    return recorder.to_dict()
+
+
+def cli():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="录制 GLM-Realtime 会话用于离线回放")
+    parser.add_argument("wav", help="输入 WAV 文件")
+    parser.add_argument("-o", "--output", default="data/bench/recording.json", help="录制文件输出路径")
+    parser.add_argument("--tail", type=float, default=8.0, help="WAV 结束后继续发送静音并录制的秒数")
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("ZHIPU_API_KEY")
+    if not api_key:
+        print("❌ Please set the ZHIPU_API_KEY environment variable first")
+        sys.exit(1)
+
+    recording = asyncio.run(record(args.wav, api_key, args.tail))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(recording, f, ensure_ascii=False)
+    print(f"✅ 已录制 {len(recording['turns'])} 轮 → {args.output}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,246 @@
+"""
+本地 GLM-Realtime 替身服务器：按录制的节奏回放服务端事件流
+
+录制文件格式（JSON）：
+{
+  "session": [<连接建立后立即发送的事件>, ...],
+  "turns": [
+    {
+      "trigger_audio_ms": 2000,            # 客户端累计上行音频达到该时长后触发本轮
+      "events": [
+        {"offset_ms": 0,   "event": {...}},  # 相对本轮基准时间的偏移
+        {"wait_for": "response.create"},      # 等待客户端发送该类型消息后重置基准时间
+        ...
+      ]
+    }
+  ]
+}
+
+真实会话可用 bench/record_session.py 录制，synthetic_recording() 生成合成录制。
+"""
+
+import asyncio
+import base64
+import json
+import time
+import wave
+from collections import Counter
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+
+def load_recording(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def synthetic_recording(
+    turns: int = 3,
+    turn_ms: int = 8000,
+    speech_ms: int = 2000,
+    vad_silence_ms: int = 700,
+    reply_audio_ms: int = 3000,
+    delta_ms: int = 100,
+    first_delta_ms: int = 600,
+    stream_speedup: float = 2.0,
+    tool_call_every: int = 0,
+    sample_rate: int = 16000,
+) -> dict:
+    """
+    生成合成录制，与 synthetic_speech_wav() 生成的输入音频对齐：
+    每轮 turn_ms 音频中前 speech_ms 为语音，语音结束 vad_silence_ms 后触发 speech_stopped
+
+    Args:
+        turns: 轮数
+        turn_ms: 每轮输入音频总时长（语音 + 静音）
+        speech_ms: 每轮用户说话时长
+        vad_silence_ms: 服务端 VAD 判定说话结束所需的静音时长
+        reply_audio_ms: 每轮回复音频时长
+        delta_ms: 每个 response.audio.delta 包含的音频时长
+        first_delta_ms: speech_stopped 到首个音频包的服务端耗时
+        stream_speedup: 服务端下发音频相对实时播放的倍速
+        tool_call_every: 每隔多少轮插入一次 function call（0 表示不插入）
+        sample_rate: 回复音频采样率
+    """
+    samples = int(sample_rate * delta_ms / 1000)
+    tone = (np.sin(2 * np.pi * 220 * np.arange(samples) / sample_rate) * 3000).astype(np.int16)
+    delta = base64.b64encode(tone.tobytes()).decode("utf-8")
+    session = {
+        "id": "sess_replay",
+        "model": "glm-realtime",
+        "modalities": ["audio", "text"],
+        "beta_fields": {"chat_mode": "audio", "tts_source": "e2e", "auto_search": False},
+    }
+
+    def audio_response(response_id: str, start_ms: float) -> list[dict]:
+        events = [
+            {"offset_ms": start_ms, "event": {"type": "response.created",
+                                              "response": {"id": response_id, "status": "in_progress"}}},
+        ]
+        interval = delta_ms / stream_speedup
+        count = reply_audio_ms // delta_ms
+        for i in range(count):
+            events.append({"offset_ms": start_ms + first_delta_ms + i * interval, "event": {
+                "type": "response.audio.delta", "response_id": response_id, "delta": delta}})
+        end_ms = start_ms + first_delta_ms + count * interval
+        events += [
+            {"offset_ms": end_ms, "event": {"type": "response.audio_transcript.done",
+                                            "response_id": response_id, "transcript": "好的，这是回放的回复。"}},
+            {"offset_ms": end_ms, "event": {"type": "response.audio.done", "response_id": response_id}},
+            {"offset_ms": end_ms, "event": {"type": "response.done",
+                                            "response": {"id": response_id, "status": "completed"}}},
+        ]
+        return events
+
+    recorded_turns = []
+    for turn in range(turns):
+        item_id = f"item_{turn}"
+        events = [
+            {"offset_ms": 0, "event": {"type": "input_audio_buffer.speech_started", "item_id": item_id}},
+            {"offset_ms": 0, "event": {"type": "input_audio_buffer.speech_stopped", "item_id": item_id}},
+            {"offset_ms": 150, "event": {"type": "conversation.item.input_audio_transcription.completed",
+                                         "item_id": item_id, "transcript": f"第 {turn + 1} 轮用户输入"}},
+        ]
+        if tool_call_every and (turn + 1) % tool_call_every == 0:
+            call_response = f"resp_{turn}_call"
+            events += [
+                {"offset_ms": first_delta_ms, "event": {"type": "response.created",
+                                                        "response": {"id": call_response, "status": "in_progress"}}},
+                {"offset_ms": first_delta_ms, "event": {"type": "response.function_call_arguments.done",
+                                                        "response_id": call_response, "name": "plan_trip",
+                                                        "arguments": "{\"destination\": \"北京\"}"}},
+                {"offset_ms": first_delta_ms, "event": {"type": "response.done",
+                                                        "response": {"id": call_response, "status": "completed"}}},
+                {"wait_for": "response.create"},
+            ]
+            events += audio_response(f"resp_{turn}", 0)
+        else:
+            events += audio_response(f"resp_{turn}", 0)
+        trigger_audio_ms = turn * turn_ms + speech_ms + vad_silence_ms
+        recorded_turns.append({"trigger_audio_ms": trigger_audio_ms, "events": events})
+
+    return {
+        "session": [{"type": "session.created", "session": session}],
+        "turns": recorded_turns,
+    }
+
+
+def synthetic_speech_wav(
+    path: str, turns: int = 3, turn_ms: int = 8000, speech_ms: int = 2000, sample_rate: int = 16000
+):
+    """生成与 synthetic_recording() 对齐的输入 WAV：每轮 speech_ms 调幅噪声 + 静音"""
+    rng = np.random.default_rng(0)
+    speech_samples = int(sample_rate * speech_ms / 1000)
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * np.arange(speech_samples) / sample_rate)
+    speech = (rng.normal(0, 4000, speech_samples) * envelope).astype(np.int16)
+    silence = np.zeros(int(sample_rate * (turn_ms - speech_ms) / 1000), dtype=np.int16)
+    pcm = np.concatenate([np.concatenate([speech, silence]) for _ in range(turns)])
+    with wave.open(path, "wb") as wav_out:
+        wav_out.setnchannels(1)
+        wav_out.setsampwidth(2)
+        wav_out.setframerate(sample_rate)
+        wav_out.writeframes(pcm.tobytes())
+
+
+def _wav_duration_ms(audio_base64: str) -> float:
+    try:
+        with wave.open(BytesIO(base64.b64decode(audio_base64)), "rb") as wav_in:
+            return wav_in.getnframes() / wav_in.getframerate() * 1000
+    except (wave.Error, EOFError, ValueError):
+        return 0.0
+
+
+class ReplayServer:
+    """回放服务器：每个连接独立回放一份录制"""
+
+    def __init__(self, recording: dict, speed: float = 1.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            recording: 录制内容，见模块说明
+            speed: 回放倍速（>1 更快），同时作用于事件偏移
+            host / port: 监听地址，port=0 表示随机端口
+        """
+        self.recording = recording
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.received = Counter()
+        self.audio_ms_received = 0.0
+        self.turns_completed = 0
+        self.all_turns_done = asyncio.Event()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/"
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        progress = asyncio.Condition()
+        received = Counter()
+        audio_ms = 0.0
+
+        async def read_client():
+            nonlocal audio_ms
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                msg_type = data.get("type", "")
+                async with progress:
+                    received[msg_type] += 1
+                    self.received[msg_type] += 1
+                    if msg_type == "input_audio_buffer.append":
+                        duration = _wav_duration_ms(data.get("audio", ""))
+                        audio_ms += duration
+                        self.audio_ms_received += duration
+                    progress.notify_all()
+
+        async def play_turns():
+            for event in self.recording.get("session", []):
+                await ws.send_str(json.dumps(event, ensure_ascii=False))
+            for turn in self.recording.get("turns", []):
+                async with progress:
+                    await progress.wait_for(lambda: audio_ms >= turn["trigger_audio_ms"])
+                    baseline = Counter(received)
+                base = time.perf_counter()
+                for step in turn["events"]:
+                    if "wait_for" in step:
+                        wanted = step["wait_for"]
+                        async with progress:
+                            await progress.wait_for(lambda: received[wanted] > baseline[wanted])
+                            baseline[wanted] = received[wanted]
+                        base = time.perf_counter()
+                        continue
+                    delay = base + step["offset_ms"] / 1000 / self.speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    await ws.send_str(json.dumps(step["event"], ensure_ascii=False))
+                self.turns_completed += 1
+            self.all_turns_done.set()
+
+        reader = asyncio.create_task(read_client())
+        player = asyncio.create_task(play_turns())
+        try:
+            await reader
+        finally:
+            player.cancel()
+        return ws
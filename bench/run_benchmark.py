@@ -0,0 +1,226 @@
+"""
+离线基准测试：本地回放服务器 + WAV 采集源，测量实时客户端的 CPU、内存与延迟
+
+    python -m bench.run_benchmark                           # asyncio 版客户端，合成 3 轮对话
+    python -m bench.run_benchmark --client rtclient         # 直接使用 rtclient.RTLowLevelClient
+    python -m bench.run_benchmark --recording rec.json --wav input.wav
+    python -m bench.run_benchmark --speed 4 --json          # CI：4 倍速，输出 JSON
+
+回放服务器运行在独立线程的事件循环中，CPU 时间只统计客户端所在线程；
+峰值 RSS 为整个进程。--speed 同时加速输入音频、服务端事件与模拟播放，
+延迟数值按同一倍速缩短，不同倍速的结果不可直接比较。
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.latency_tracer import STAGES, TOOL_STAGE, TurnTracer, load_stage_values
+from app.realtime_async import SDK_PATH, AsyncRealtimeClient
+from app.realtime_common import SAMPLE_RATE, build_session_config, pcm_to_wav_base64
+
+from .replay_server import ReplayServer, load_recording, synthetic_recording, synthetic_speech_wav
+from .wav_source import NullSink, WavSource
+
+if SDK_PATH not in sys.path:
+    sys.path.insert(0, SDK_PATH)
+
+from rtclient import RTLowLevelClient
+from rtclient.models import InputAudioBufferAppendMessage
+
+
+class ServerThread:
+    """在后台线程中运行回放服务器，避免其 CPU 计入客户端"""
+
+    def __init__(self, server: ReplayServer):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="replay-server", daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.start())
+        self._started.set()
+        self.loop.run_forever()
+
+    def start(self) -> str:
+        self._thread.start()
+        self._started.wait()
+        return self.server.url
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+def _plan_trip(name: str, arguments: dict) -> dict:
+    return {"status": "success", "function": name, "arguments": arguments}
+
+
+async def run_async_client(url: str, source: WavSource, sink: NullSink, tracer: TurnTracer, batch_size: int) -> dict:
+    client = AsyncRealtimeClient(
+        url,
+        headers={},
+        source=source,
+        sink=sink,
+        tool_executor=_plan_trip,
+        tracer=tracer,
+        batch_size=batch_size,
+    )
+    await client.run()
+    return {stage.name: stage.__dict__ for stage in client.stats.values()}
+
+
+async def run_rtclient(url: str, source: WavSource, tracer: TurnTracer, batch_size: int) -> dict:
+    """最小 rtclient 循环：批量上行音频，下行只解码不播放（首包即视为可播放）"""
+    counts = {"sent": 0, "received": 0, "audio_bytes": 0}
+    async with RTLowLevelClient(url) as client:
+        await client.send_json(build_session_config())
+
+        async def uplink():
+            batch = []
+            async for chunk in source:
+                tracer.note_audio(chunk)
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    audio = pcm_to_wav_base64(np.concatenate(batch), SAMPLE_RATE)
+                    await client.send(InputAudioBufferAppendMessage(audio=audio))
+                    counts["sent"] += 1
+                    batch.clear()
+
+        async def downlink():
+            last_response_id = None
+            async for message in client:
+                counts["received"] += 1
+                msg_type = message.get("type") if isinstance(message, dict) else message.type
+                tracer.on_server_event(msg_type)
+                if msg_type == "response.audio.delta":
+                    counts["audio_bytes"] += len(base64.b64decode(message.delta))
+                    if message.response_id != last_response_id:
+                        last_response_id = message.response_id
+                        tracer.mark("first_audible")
+
+        receiver = asyncio.create_task(downlink())
+        try:
+            await uplink()
+        finally:
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+    return counts
+
+
+def _latency_summary(jsonl_path: str) -> dict:
+    if not os.path.exists(jsonl_path):
+        return {}
+    values, _ = load_stage_values([jsonl_path])
+    summary = {}
+    for stage in (*STAGES, TOOL_STAGE):
+        stage_values = values.get(stage)
+        if stage_values:
+            summary[stage] = {
+                "count": len(stage_values),
+                "p50_ms": round(float(np.percentile(stage_values, 50)) * 1000, 1),
+                "p95_ms": round(float(np.percentile(stage_values, 95)) * 1000, 1),
+            }
+    return summary
+
+
+def _peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_benchmark(args: argparse.Namespace, workdir: str) -> dict:
+    if args.recording:
+        recording = load_recording(args.recording)
+    else:
+        recording = synthetic_recording(
+            turns=args.turns, turn_ms=args.turn_ms, speech_ms=args.speech_ms, tool_call_every=args.tool_call_every
+        )
+    wav_path = args.wav
+    if wav_path is None:
+        wav_path = os.path.join(workdir, "input.wav")
+        synthetic_speech_wav(wav_path, turns=args.turns, turn_ms=args.turn_ms, speech_ms=args.speech_ms)
+
+    server = ServerThread(ReplayServer(recording, speed=args.speed))
+    url = server.start()
+    source = WavSource(wav_path, speed=args.speed)
+    tracer = TurnTracer(output_dir=os.path.join(workdir, "latency"))
+
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        if args.client == "async":
+            sink = NullSink(speed=args.speed)
+            client_stats = await run_async_client(url, source, sink, tracer, args.batch_size)
+            client_stats["audio_played_s"] = round(sink.seconds_played, 3)
+        else:
+            client_stats = await run_rtclient(url, source, tracer, args.batch_size)
+        wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+    finally:
+        server.stop()
+
+    return {
+        "client": args.client,
+        "speed": args.speed,
+        "turns_expected": len(recording.get("turns", [])),
+        "turns_replayed": server.server.turns_completed,
+        "audio_sent_s": round(server.server.audio_ms_received / 1000, 3),
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "cpu_pct": round(cpu / wall * 100, 1) if wall else 0.0,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "latency": _latency_summary(tracer.jsonl_path),
+        "client_stats": client_stats,
+    }
+
+
+def print_result(result: dict):
+    print(f"\n📊 Benchmark ({result['client']}, speed x{result['speed']})")
+    print(f"   turns      {result['turns_replayed']}/{result['turns_expected']}  audio sent {result['audio_sent_s']}s")
+    print(f"   wall       {result['wall_s']}s")
+    print(f"   cpu        {result['cpu_s']}s ({result['cpu_pct']}%)")
+    print(f"   peak rss   {result['peak_rss_mb']}MB")
+    print(f"   {'stage':<15}{'count':>7}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for stage, values in result["latency"].items():
+        print(f"   {stage:<15}{values['count']:>7}{values['p50_ms']:>10.0f}{values['p95_ms']:>10.0f}")
+
+
+def cli(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="实时客户端离线基准测试")
+    parser.add_argument("--client", choices=["async", "rtclient"], default="async", help="被测客户端")
+    parser.add_argument("--recording", help="录制文件（默认生成合成录制）")
+    parser.add_argument("--wav", help="输入 WAV（默认生成与合成录制对齐的音频）")
+    parser.add_argument("--turns", type=int, default=3, help="合成录制轮数")
+    parser.add_argument("--turn-ms", type=int, default=8000, help="合成录制每轮输入音频时长")
+    parser.add_argument("--speech-ms", type=int, default=2000, help="合成录制每轮说话时长")
+    parser.add_argument("--tool-call-every", type=int, default=0, help="每隔多少轮插入一次 function call")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速")
+    parser.add_argument("--batch-size", type=int, default=4, help="每次上行合并的音频块数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="realtime-bench-") as workdir:
+        result = asyncio.run(run_benchmark(args, workdir))
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print_result(result)
+    if result["turns_replayed"] < result["turns_expected"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
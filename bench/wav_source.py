@@ -0,0 +1,88 @@
+"""
+离线基准测试用的采集源与播放端（不依赖音频设备）
+"""
+
+import asyncio
+import time
+import wave
+from collections.abc import AsyncIterator
+
+import numpy as np
+
+from app.realtime_common import CHUNK, SAMPLE_RATE
+
+
+def read_wav_pcm(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """读取 16bit WAV 为 int16 单声道 PCM（多声道取第一声道，采样率不一致时线性重采样）"""
+    with wave.open(path, "rb") as wav_in:
+        if wav_in.getsampwidth() != 2:
+            raise ValueError(f"仅支持 16bit WAV: {path}")
+        channels = wav_in.getnchannels()
+        rate = wav_in.getframerate()
+        pcm = np.frombuffer(wav_in.readframes(wav_in.getnframes()), dtype=np.int16)
+    if channels > 1:
+        pcm = pcm[::channels]
+    if rate != sample_rate:
+        target = np.arange(int(len(pcm) * sample_rate / rate)) * rate / sample_rate
+        pcm = np.interp(target, np.arange(len(pcm)), pcm).astype(np.int16)
+    return pcm
+
+
+class WavSource:
+    """WAV 采集源：按实时节奏（可加速）产出 CHUNK 大小的音频块，结束后补静音"""
+
+    def __init__(
+        self,
+        path: str,
+        blocksize: int = CHUNK,
+        sample_rate: int = SAMPLE_RATE,
+        speed: float = 1.0,
+        trailing_silence: float = 1.0,
+    ):
+        """
+        Args:
+            path: 输入 WAV 文件
+            blocksize: 每块采样数（与麦克风回调一致）
+            speed: 播放倍速（>1 更快）
+            trailing_silence: 文件结束后追加的静音时长（秒），让服务端 VAD 判定说话结束
+        """
+        pcm = read_wav_pcm(path, sample_rate)
+        silence = np.zeros(int(sample_rate * trailing_silence), dtype=np.int16)
+        self.pcm = np.concatenate([pcm, silence])
+        self.blocksize = blocksize
+        self.interval = blocksize / sample_rate / speed
+
+    async def __aiter__(self) -> AsyncIterator[np.ndarray]:
+        start = time.perf_counter()
+        for i, offset in enumerate(range(0, len(self.pcm), self.blocksize)):
+            # 以起始时间为基准计算等待，避免 sleep 误差累积
+            delay = start + i * self.interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            chunk = self.pcm[offset:offset + self.blocksize]
+            if len(chunk) < self.blocksize:
+                chunk = np.pad(chunk, (0, self.blocksize - len(chunk)))
+            yield chunk
+
+
+class NullSink:
+    """空播放端：按音频时长模拟设备写入耗时，统计播放总时长"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, speed: float = 1.0):
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.samples_played = 0
+
+    def open(self):
+        pass
+
+    async def write(self, chunk: np.ndarray):
+        self.samples_played += len(chunk)
+        await asyncio.sleep(len(chunk) / self.sample_rate / self.speed)
+
+    def close(self):
+        pass
+
+    @property
+    def seconds_played(self) -> float:
+        return self.samples_played / self.sample_rate
@@ -87,9 +87,13 @@ from rtclient.models import (
     Voice,
     create_message_from_dict,
 )
+from rtclient.session_manager import RTSessionManager, close_shared_connector, get_shared_connector
 
 __all__ = [
     "RTLowLevelClient",
+    "RTSessionManager",
+    "get_shared_connector",
+    "close_shared_connector",
     "RealtimeException",
     "Voice",
     "AudioFormat",
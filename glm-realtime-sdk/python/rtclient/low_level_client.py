@@ -24,6 +24,7 @@ class RTLowLevelClient:
         url: str,
         headers: Optional[dict[str, str]] = None,
         params: Optional[dict[str, Any]] = None,
+        session: Optional[ClientSession] = None,
     ):
         """初始化WebSocket客户端
 
@@ -31,11 +32,13 @@ class RTLowLevelClient:
             url: WebSocket服务器地址
             headers: 请求头
             params: URL参数
+            session: 外部传入的 ClientSession，传入时由调用方负责关闭（用于复用连接池）
         """
         self._url = url
         self._headers = headers or {}
         self._params = params or {}
-        self._session = ClientSession()
+        self._owns_session = session is None
+        self._session = session or ClientSession()
         self.request_id: Optional[uuid.UUID] = None
         self.ws = None
 
@@ -53,7 +56,8 @@ class RTLowLevelClient:
                 params=self._params
             )
         except WSServerHandshakeError as e:
-            await self._session.close()
+            if self._owns_session:
+                await self._session.close()
             error_message = f"连接服务器失败，状态码: {e.status}"
             raise ConnectionError(error_message, e.headers) from e
 
@@ -106,7 +110,8 @@ class RTLowLevelClient:
         """关闭连接"""
         if self.ws:
             await self.ws.close()
-        await self._session.close()
+        if self._owns_session:
+            await self._session.close()
 
     @property
     def closed(self) -> bool:
@@ -0,0 +1,249 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Any, Optional
+
+from aiohttp import ClientConnectionError, ClientSession, TCPConnector
+
+from rtclient.low_level_client import ConnectionError, RTLowLevelClient
+from rtclient.models import (
+    AssistantMessageItem,
+    InputTextContentPart,
+    ItemCreateMessage,
+    OutputTextContentPart,
+    ServerMessageType,
+    SessionUpdateMessage,
+    UserMessageItem,
+    UserMessageType,
+)
+
+_SHARED_CONNECTORS: dict[asyncio.AbstractEventLoop, TCPConnector] = {}
+
+
+def get_shared_connector() -> TCPConnector:
+    """获取当前事件循环共享的 TCPConnector
+
+    同一事件循环内的所有会话复用同一个连接池（DNS 缓存、TLS 会话），
+    重连时无需重新创建 ClientSession。
+    """
+    loop = asyncio.get_running_loop()
+    connector = _SHARED_CONNECTORS.get(loop)
+    if connector is None or connector.closed:
+        connector = TCPConnector(ttl_dns_cache=300, keepalive_timeout=30)
+        _SHARED_CONNECTORS[loop] = connector
+    return connector
+
+
+async def close_shared_connector():
+    """关闭当前事件循环的共享 TCPConnector（程序退出前调用）"""
+    connector = _SHARED_CONNECTORS.pop(asyncio.get_running_loop(), None)
+    if connector is not None and not connector.closed:
+        await connector.close()
+
+
+class RTSessionManager:
+    """带断线重连与会话恢复的实时会话管理器
+
+    - 复用共享连接池，重连只重建 WebSocket
+    - 断线后按指数退避重连
+    - 重连成功后重放最近一次 session.update 以及本地记录的会话条目
+    - 记录每次重连耗时
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        max_retries: int = 5,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        transcript_limit: int = 50,
+    ):
+        """初始化会话管理器
+
+        Args:
+            url: WebSocket服务器地址
+            headers: 请求头
+            params: URL参数
+            max_retries: 单次断线的最大重连次数
+            initial_backoff: 首次重连等待时间（秒）
+            max_backoff: 重连等待时间上限（秒）
+            transcript_limit: 本地保留并在重连后重放的会话条目数量
+        """
+        self._url = url
+        self._headers = headers or {}
+        self._params = params or {}
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self._http_session: Optional[ClientSession] = None
+        self._client: Optional[RTLowLevelClient] = None
+        self._reconnect_lock = asyncio.Lock()
+        self._closing = False
+
+        self._session_update: Optional[SessionUpdateMessage | dict[str, Any]] = None
+        self.transcript: deque[ItemCreateMessage | dict[str, Any]] = deque(maxlen=transcript_limit)
+        self.reconnect_times: list[float] = []
+
+    @property
+    def client(self) -> Optional[RTLowLevelClient]:
+        """当前使用的底层客户端"""
+        return self._client
+
+    @property
+    def closed(self) -> bool:
+        """会话是否已被主动关闭"""
+        return self._closing
+
+    async def connect(self):
+        """建立连接（首次连接失败同样按退避策略重试）"""
+        self._closing = False
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = ClientSession(connector=get_shared_connector(), connector_owner=False)
+        await self._connect_with_backoff()
+
+    async def _open_client(self):
+        client = RTLowLevelClient(self._url, headers=self._headers, params=self._params, session=self._http_session)
+        await client.connect()
+        self._client = client
+
+    async def _connect_with_backoff(self):
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = min(self.initial_backoff * (2 ** (attempt - 1)), self.max_backoff)
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            try:
+                await self._open_client()
+                return
+            except (ConnectionError, ClientConnectionError, OSError) as e:
+                last_error = e
+                print(f"连接失败（第 {attempt + 1} 次）: {e}")
+        raise ConnectionError(f"重连 {self.max_retries} 次后仍失败: {last_error}")
+
+    async def reconnect(self):
+        """断线重连并恢复会话状态"""
+        async with self._reconnect_lock:
+            if self._closing or (self._client is not None and not self._client.closed):
+                return
+            start = time.perf_counter()
+            if self._client is not None:
+                await self._client.close()
+            await self._connect_with_backoff()
+            await self._replay()
+            elapsed = time.perf_counter() - start
+            self.reconnect_times.append(elapsed)
+            print(f"重连成功，耗时 {elapsed * 1000:.0f}ms，重放 {len(self.transcript)} 条会话条目")
+
+    async def _replay(self):
+        if self._session_update is not None:
+            await self._client.send(self._session_update)
+        for item_message in self.transcript:
+            await self._client.send(item_message)
+
+    def record_item(self, message: ItemCreateMessage | dict[str, Any]):
+        """记录一条会话条目，重连后会被重放"""
+        self.transcript.append(message)
+
+    def record_user_text(self, text: str):
+        """将用户语音转写结果记录为会话条目"""
+        if text:
+            self.record_item(ItemCreateMessage(item=UserMessageItem(content=[InputTextContentPart(text=text)])))
+
+    def record_assistant_text(self, text: str):
+        """将模型回复文本记录为会话条目"""
+        if text:
+            self.record_item(
+                ItemCreateMessage(item=AssistantMessageItem(content=[OutputTextContentPart(text=text)]))
+            )
+
+    def _track(self, message: Any):
+        # 未能转换为模型的消息以 dict 形式返回
+        if isinstance(message, dict):
+            msg_type, transcript = message.get("type"), message.get("transcript")
+        else:
+            msg_type, transcript = message.type, getattr(message, "transcript", None)
+        match msg_type:
+            case "conversation.item.input_audio_transcription.completed":
+                self.record_user_text(transcript)
+            case "response.audio_transcript.done":
+                self.record_assistant_text(transcript)
+
+    async def send(self, message: UserMessageType | dict[str, Any]):
+        """发送消息，连接断开时自动重连后重试一次
+
+        Args:
+            message: 要发送的消息；session.update 与 conversation.item.create 会被记录以便重放
+        """
+        msg_type = message.get("type") if isinstance(message, dict) else message.type
+        replayable = msg_type in ("session.update", "conversation.item.create")
+        if msg_type == "session.update":
+            self._session_update = message
+        elif msg_type == "conversation.item.create":
+            self.record_item(message)
+
+        if self._client is None or self._client.closed:
+            await self.reconnect()
+            if replayable:
+                return
+        client = self._client
+        try:
+            await client.send(message)
+        except (ClientConnectionError, ConnectionResetError):
+            # 发送失败时 aiohttp 常常仍报告 ws.closed == False，先关闭才能触发重连
+            await client.close()
+            await self.reconnect()
+            # 可重放的消息已由 _replay 发送，不再重复发送
+            if not replayable:
+                await self._client.send(message)
+
+    async def send_json(self, message: dict[str, Any]):
+        """发送JSON消息到服务器"""
+        await self.send(message)
+
+    async def recv(self) -> Optional[ServerMessageType]:
+        """接收服务器消息，连接断开时自动重连
+
+        Returns:
+            接收到的消息对象；会话被主动关闭时返回 None
+        """
+        while not self._closing:
+            if self._client is None or self._client.closed:
+                await self.reconnect()
+                continue
+            message = await self._client.recv()
+            if message is not None:
+                self._track(message)
+                return message
+        return None
+
+    def __aiter__(self) -> AsyncIterator[ServerMessageType]:
+        return self
+
+    async def __anext__(self):
+        message = await self.recv()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self):
+        """关闭会话（不关闭共享连接池）"""
+        self._closing = True
+        if self._client is not None:
+            await self._client.close()
+        if self._http_session is not None:
+            await self._http_session.close()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Compare Memobase `process_mode: standard` and `process_mode: fast` on Locomo.
+
+Every session is replayed as small buffers (2 messages by default, like a voice
+assistant flushing after each turn), and each flush is timed. Per mode it reports:
+- flush latency (mean/p50/p95)
+- LLM tokens, from the project's `project_token_cost_month` before and after
+- profile quality, as the share of fixture answers covered by the user's profile,
+  and the slot overlap between both modes
+
+    python compare_process_modes.py --conversations 2 --sessions 3
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+from memobase import MemoBaseClient, ChatBlob
+
+load_dotenv()
+
+root_dir = os.path.dirname(os.path.abspath(__file__))
+config_path = os.path.join(root_dir, "src", "memobase_client", "config.yaml")
+PROCESS_MODES = ["standard", "fast"]
+
+
+def string_to_uuid(s: str, salt="memobase_compare_modes") -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, s + salt))
+
+
+def normalize_tokens(text: str) -> set[str]:
+    return set(re.findall(r"[a-z0-9]+", str(text).lower()))
+
+
+def session_messages(conversation: dict, max_sessions: int) -> list[list[dict]]:
+    speaker_a = conversation["speaker_a"]
+    sessions = []
+    for key in conversation.keys():
+        if key in ["speaker_a", "speaker_b"] or "date" in key or "timestamp" in key:
+            continue
+        timestamp = conversation[key + "_date_time"]
+        sessions.append(
+            [
+                {
+                    "role": "user" if chat["speaker"] == speaker_a else "assistant",
+                    "content": chat["text"],
+                    "alias": chat["speaker"],
+                    "created_at": timestamp,
+                }
+                for chat in conversation[key]
+            ]
+        )
+    return sessions[:max_sessions]
+
+
+def answer_coverage(profile_text: str, answers: list[str]) -> float:
+    """Share of gold answers whose words all appear in the profile"""
+    if not answers:
+        return 0.0
+    profile_tokens = normalize_tokens(profile_text)
+    covered = [
+        a
+        for a in answers
+        if normalize_tokens(a) and normalize_tokens(a) <= profile_tokens
+    ]
+    return len(covered) / len(answers)
+
+
+class ModeRunner:
+    def __init__(self, client: MemoBaseClient, base_config: str, batch_size: int):
+        self.client = client
+        self.base_config = base_config
+        self.batch_size = batch_size
+
+    def tokens_used(self) -> int:
+        # billing is recorded asynchronously after each LLM call
+        time.sleep(2)
+        return self.client.get_usage()["project_token_cost_month"]
+
+    def run(self, mode: str, conversations: list[tuple[str, list]]) -> dict:
+        self.client.update_config(self.base_config + f"\nprocess_mode: {mode}\n")
+        tokens_before = self.tokens_used()
+        latencies = []
+        profiles = {}
+        for conv_id, sessions in conversations:
+            uid = string_to_uuid(f"{conv_id}_{mode}")
+            try:
+                self.client.delete_user(uid)
+            except Exception:
+                pass
+            user = self.client.get_or_create_user(uid)
+            for messages in sessions:
+                for i in range(0, len(messages), self.batch_size):
+                    user.insert(ChatBlob(messages=messages[i : i + self.batch_size]))
+                    start = time.perf_counter()
+                    user.flush(sync=True)
+                    latencies.append((time.perf_counter() - start) * 1000)
+            profiles[conv_id] = {
+                (p.topic, p.sub_topic): p.content
+                for p in user.profile(max_token_size=100000)
+            }
+            print(f"[{mode}] conversation {conv_id}: {len(profiles[conv_id])} slots")
+        return {
+            "latencies_ms": latencies,
+            "tokens": self.tokens_used() - tokens_before,
+            "profiles": profiles,
+        }
+
+
+def summarize(result: dict, qa: dict) -> dict:
+    latencies = result["latencies_ms"]
+    coverage = [
+        answer_coverage(
+            " ".join(profile.values()),
+            [q["answer"] for q in qa.get(conv_id, []) if q["category"] in ("1", "2")],
+        )
+        for conv_id, profile in result["profiles"].items()
+    ]
+    return {
+        "flushes": len(latencies),
+        "latency_mean_ms": round(float(np.mean(latencies)), 1),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "tokens": result["tokens"],
+        "tokens_per_flush": round(result["tokens"] / max(len(latencies), 1), 1),
+        "profile_slots": sum(len(p) for p in result["profiles"].values()),
+        "answer_coverage": round(float(np.mean(coverage)), 4),
+    }
+
+
+def slot_overlap(a: dict, b: dict) -> float:
+    scores = []
+    for conv_id in a:
+        slots_a, slots_b = set(a[conv_id]), set(b.get(conv_id, {}))
+        if slots_a | slots_b:
+            scores.append(len(slots_a & slots_b) / len(slots_a | slots_b))
+    return round(float(np.mean(scores)), 4) if scores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Memobase process modes")
+    parser.add_argument("--data_path", default="dataset/locomo10.json")
+    parser.add_argument(
+        "--qa_path", default="fixture/memobase/memobase_eval_0710_3000.json"
+    )
+    parser.add_argument("--conversations", type=int, default=2)
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--batch_size", type=int, default=2)
+    parser.add_argument("--output", default="results/process_modes.json")
+    args = parser.parse_args()
+
+    with open(args.data_path) as f:
+        data = json.load(f)
+    with open(args.qa_path) as f:
+        qa = json.load(f)
+    with open(config_path) as f:
+        base_config = f.read()
+
+    conversations = [
+        (str(idx), session_messages(item["conversation"], args.sessions))
+        for idx, item in enumerate(data[: args.conversations])
+    ]
+    client = MemoBaseClient(
+        api_key=os.getenv("MEMOBASE_API_KEY"),
+        project_url=os.getenv("MEMOBASE_PROJECT_URL", "https://api.memobase.dev"),
+    )
+    runner = ModeRunner(client, base_config, args.batch_size)
+    results = {mode: runner.run(mode, conversations) for mode in PROCESS_MODES}
+    client.update_config(base_config)
+
+    report = {mode: summarize(results[mode], qa) for mode in PROCESS_MODES}
+    report["slot_overlap"] = slot_overlap(
+        results["standard"]["profiles"], results["fast"]["profiles"]
+    )
+
+    print(json.dumps(report, indent=2))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import memobase_server.env
 import os
+import asyncio
 
 # Done setting up env
 from contextlib import asynccontextmanager
@@ -8,23 +9,54 @@ from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
 from memobase_server.connectors import (
     close_connection,
+    create_tables,
     init_redis_pool,
 )
 from memobase_server import api_layer
-from memobase_server.env import LOG, TRACE_LOG
+from memobase_server.env import LOG, TRACE_LOG, CONFIG, get_encoder
+from memobase_server.controllers.event_compaction import (
+    run_event_compaction_periodically,
+)
+from memobase_server.controllers.health import run_health_probe_periodically
 from memobase_server.llms.embeddings import check_embedding_sanity
 from memobase_server.llms import llm_sanity_check
+from memobase_server.llms.utils import preload_sdks
 from memobase_server.api_layer.docs import API_X_CODE_DOCS
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
 
+async def warm_up():
+    """Load what the first requests would wait for, after the server is ready"""
+    await asyncio.to_thread(get_encoder)
+    await asyncio.to_thread(preload_sdks)
+    if CONFIG.startup_sanity_check == "background":
+        try:
+            await check_embedding_sanity()
+            await llm_sanity_check()
+        except Exception as e:
+            LOG.error(f"Sanity check failed, requests will fail too: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if CONFIG.migrate_on_startup:
+        await asyncio.to_thread(create_tables)
     init_redis_pool()
-    await check_embedding_sanity()
-    await llm_sanity_check()
+    if CONFIG.startup_sanity_check == "blocking":
+        await check_embedding_sanity()
+        await llm_sanity_check()
     LOG.info(f"Start Memobase Server {memobase_server.__version__} 🖼️")
+    background_tasks = [
+        asyncio.create_task(warm_up()),
+        asyncio.create_task(run_health_probe_periodically()),
+    ]
+    if CONFIG.event_hot_retention_days is not None:
+        background_tasks.append(
+            asyncio.create_task(run_event_compaction_periodically())
+        )
     yield
+    for task in background_tasks:
+        task.cancel()
     await close_connection()
 
 
@@ -48,7 +80,7 @@ if USE_CORS:
         allow_headers=["*"],
     )
 
-NO_AUTH = {"/api/v1/healthcheck"}
+NO_AUTH = {"/api/v1/healthcheck", "/api/v1/readiness"}
 
 
 def custom_openapi():
@@ -92,6 +124,8 @@ router.get(
     "/healthcheck", tags=["chore"], openapi_extra=API_X_CODE_DOCS["GET /healthcheck"]
 )(api_layer.chore.healthcheck)
 
+router.get("/readiness", tags=["chore"])(api_layer.chore.readiness)
+
 router.get(
     "/admin/status_check",
     tags=["admin"],
@@ -166,6 +200,12 @@ router.get(
 )(api_layer.user.get_user_all_blobs)
 
 
+router.get(
+    "/users/export/{user_id}",
+    tags=["user"],
+)(api_layer.user.export_user)
+
+
 router.post(
     "/blobs/insert/{user_id}",
     tags=["blob"],
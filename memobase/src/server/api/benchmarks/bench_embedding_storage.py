@@ -0,0 +1,169 @@
+"""
+Compare recall, search latency and storage of event embedding storage modes.
+
+Synthetic gists are clustered unit vectors (a user talks about a few topics),
+queries are noisy copies of random gists. Each mode gets its own table and the
+same exact-scan `ORDER BY ... LIMIT k` a user's gist search runs, recall@k is
+measured against float64 ground truth:
+
+- `vector`: float32, the default storage.
+- `halfvec`: float16, `embedding_storage: halfvec`. Skipped on pgvector < 0.7.0.
+- `bit+rerank`: sign bits ranked by hamming distance, the top `k * --rerank`
+  candidates reranked by their float32 vectors. Not a storage mode, the bits
+  are stored next to the vectors and only pay off with an index.
+
+`float16 (numpy)` is the halfvec recall computed offline, so it is reported
+even where the extension can't run halfvec.
+
+    python -m benchmarks.bench_embedding_storage --rows 10000 --queries 200
+"""
+
+import time
+import argparse
+import numpy as np
+from sqlalchemy import text
+from memobase_server.env import CONFIG
+from memobase_server.connectors import DB_ENGINE
+
+TABLE = "bench_embedding_storage"
+
+
+def synthetic_gists(rows: int, dim: int, topics: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(topics, dim))
+    vectors = centers[rng.integers(topics, size=rows)] + rng.normal(size=(rows, dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(vectors @ query) / np.linalg.norm(vectors, axis=1))[:k]
+
+
+def recall(found: list, truth: np.ndarray) -> float:
+    return len(set(found) & set(truth.tolist())) / len(truth)
+
+
+def to_db(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{v:.7g}" for v in vector) + "]"
+
+
+def to_bits(vector: np.ndarray) -> str:
+    return "".join("1" if v > 0 else "0" for v in vector)
+
+
+def create_table(conn, storage: str, vectors: np.ndarray, batch: int = 500):
+    dim = vectors.shape[1]
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}_{storage}"))
+    if storage == "bit":
+        columns = f"embedding vector({dim}), bits bit({dim})"
+    else:
+        columns = f"embedding {storage}({dim})"
+    conn.execute(text(f"CREATE TABLE {TABLE}_{storage} (id int, {columns})"))
+    for start in range(0, len(vectors), batch):
+        rows = [
+            {"id": i, "embedding": to_db(vectors[i]), "bits": to_bits(vectors[i])}
+            for i in range(start, min(start + batch, len(vectors)))
+        ]
+        if storage == "bit":
+            values = "(:id, CAST(:embedding AS vector), CAST(:bits AS bit varying))"
+        else:
+            values = f"(:id, CAST(:embedding AS {storage}))"
+        conn.execute(text(f"INSERT INTO {TABLE}_{storage} VALUES {values}"), rows)
+    conn.execute(text(f"ANALYZE {TABLE}_{storage}"))
+
+
+def search(conn, storage: str, query: np.ndarray, k: int, rerank: int) -> list:
+    if storage == "bit":
+        sql = (
+            "SELECT id FROM (SELECT id, embedding "
+            f"FROM {TABLE}_bit "
+            "ORDER BY bit_count(bits # CAST(:bits AS bit varying)) LIMIT :candidates"
+            ") c ORDER BY embedding <=> CAST(:query AS vector) LIMIT :k"
+        )
+    else:
+        sql = (
+            f"SELECT id FROM {TABLE}_{storage} "
+            f"ORDER BY embedding <=> CAST(:query AS {storage}) LIMIT :k"
+        )
+    params = {
+        "query": to_db(query),
+        "bits": to_bits(query),
+        "k": k,
+        "candidates": k * rerank,
+    }
+    return [row.id for row in conn.execute(text(sql), params)]
+
+
+def run_mode(conn, storage, vectors, queries, truths, args) -> dict:
+    create_table(conn, storage, vectors)
+    size = conn.execute(
+        text(f"SELECT pg_total_relation_size('{TABLE}_{storage}')")
+    ).scalar()
+    # warm the table into shared buffers before timing
+    search(conn, storage, queries[0], args.k, args.rerank)
+    durations, recalls = [], []
+    for query, truth in zip(queries, truths):
+        start = time.perf_counter()
+        found = search(conn, storage, query, args.k, args.rerank)
+        durations.append(time.perf_counter() - start)
+        recalls.append(recall(found, truth))
+    conn.execute(text(f"DROP TABLE {TABLE}_{storage}"))
+    durations.sort()
+    return {
+        "recall": float(np.mean(recalls)),
+        "mean_ms": sum(durations) / len(durations) * 1000,
+        "p99_ms": durations[int(len(durations) * 0.99)] * 1000,
+        "size_mb": size / 1024 / 1024,
+    }
+
+
+def main(args: argparse.Namespace):
+    rng = np.random.default_rng(0)
+    dim = args.dim or CONFIG.embedding_dim
+    vectors = synthetic_gists(args.rows, dim, args.topics, rng)
+    picked = vectors[rng.integers(args.rows, size=args.queries)]
+    queries = picked + rng.normal(scale=args.query_noise / np.sqrt(dim), size=picked.shape)
+    truths = [top_k(vectors, q, args.k) for q in queries]
+
+    half = vectors.astype(np.float16).astype(np.float64)
+    half_recall = np.mean(
+        [
+            recall(top_k(half, q.astype(np.float16), args.k).tolist(), t)
+            for q, t in zip(queries, truths)
+        ]
+    )
+
+    results = {}
+    with DB_ENGINE.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        has_halfvec = conn.execute(
+            text("SELECT 1 FROM pg_type WHERE typname = 'halfvec'")
+        ).scalar()
+        for name, storage in [
+            ("vector", "vector"),
+            ("halfvec", "halfvec"),
+            ("bit+rerank", "bit"),
+        ]:
+            if storage == "halfvec" and not has_halfvec:
+                print("halfvec: skipped, needs pgvector >= 0.7.0")
+                continue
+            results[name] = run_mode(conn, storage, vectors, queries, truths, args)
+
+    print(f"{args.rows} gists, dim {dim}, {args.queries} queries, recall@{args.k}")
+    print(f"{'mode':<18}{'recall':>8}{'mean(ms)':>10}{'p99(ms)':>10}{'size(MB)':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<18}{r['recall']:>8.3f}{r['mean_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['size_mb']:>10.2f}"
+        )
+    print(f"{'float16 (numpy)':<18}{half_recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=None)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-noise", type=float, default=0.5)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=4)
+    main(parser.parse_args())
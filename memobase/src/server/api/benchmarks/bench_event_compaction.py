@@ -0,0 +1,145 @@
+"""
+Measure event table sizes and event read latency before and after compaction.
+
+Seeds users with `--events-per-day` events (each with `--gists-per-event` gists
+and random embeddings) over the last `--days` days, then runs `compact_events`
+with `--hot-retention-days`. Latencies are for the default 21-day reads, which
+still scan every row of the user through `(user_id, project_id)` indexes.
+A plain VACUUM leaves the freed pages to new rows instead of shrinking the
+files, `--vacuum-full` rewrites the tables to show the reclaimable size.
+
+    python -m benchmarks.bench_event_compaction --users 10 --days 120
+"""
+
+import time
+import asyncio
+import argparse
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from sqlalchemy import text
+from memobase_server.env import CONFIG
+from memobase_server.connectors import DB_ENGINE, Session
+from memobase_server.models.utils import Promise
+from memobase_server.models.response import UserData
+from memobase_server.models.database import (
+    DEFAULT_PROJECT_ID,
+    UserEvent,
+    UserEventGist,
+)
+from memobase_server.controllers import full as controllers
+
+RNG = np.random.default_rng(0)
+
+
+async def random_embedding(project_id, texts, **kwargs):
+    return Promise.resolve(RNG.random((len(texts), CONFIG.embedding_dim)))
+
+
+def seed_user(user_id, days: int, events_per_day: int, gists_per_event: int):
+    now = datetime.now(timezone.utc)
+    with Session() as session:
+        for day in range(days):
+            for i in range(events_per_day):
+                created_at = now - timedelta(days=day, hours=i)
+                lines = [
+                    f"- user did thing {day}-{i}-{g} [mention {created_at:%Y/%m/%d}]"
+                    for g in range(gists_per_event)
+                ]
+                event = UserEvent(
+                    user_id=user_id,
+                    project_id=DEFAULT_PROJECT_ID,
+                    event_data={"event_tip": "\n".join(lines), "profile_delta": []},
+                    embedding=RNG.random(CONFIG.embedding_dim),
+                )
+                event.created_at = created_at
+                session.add(event)
+                for line in lines:
+                    gist = UserEventGist(
+                        user_id=user_id,
+                        project_id=DEFAULT_PROJECT_ID,
+                        event_id=event.id,
+                        gist_data={"content": line},
+                        embedding=RNG.random(CONFIG.embedding_dim),
+                    )
+                    gist.created_at = created_at
+                    session.add(gist)
+        session.commit()
+
+
+async def read_latency_ms(user_ids: list, rounds: int) -> dict:
+    timings = {"get_user_event_gists": [], "search_user_event_gists": []}
+    for _ in range(rounds):
+        for user_id in user_ids:
+            start = time.perf_counter()
+            p = await controllers.event_gist.get_user_event_gists(
+                user_id, DEFAULT_PROJECT_ID
+            )
+            assert p.ok(), p.msg()
+            timings["get_user_event_gists"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            p = await controllers.event_gist.search_user_event_gists(
+                user_id, DEFAULT_PROJECT_ID, "what did the user do", topk=10
+            )
+            assert p.ok(), p.msg()
+            timings["search_user_event_gists"].append(time.perf_counter() - start)
+    return {k: sum(v) / len(v) * 1000 for k, v in timings.items()}
+
+
+def print_report(name: str, sizes: dict, latency: dict):
+    print(f"[{name}]")
+    for table, size in sizes.items():
+        print(f"  {table:<28}{size / 1024 / 1024:>10.2f} MB")
+    for read, ms in latency.items():
+        print(f"  {read:<28}{ms:>10.2f} ms")
+
+
+async def main(args: argparse.Namespace):
+    user_ids = []
+    for _ in range(args.users):
+        p = await controllers.user.create_user(UserData(), DEFAULT_PROJECT_ID)
+        assert p.ok(), p.msg()
+        user_ids.append(p.data().id)
+        seed_user(p.data().id, args.days, args.events_per_day, args.gists_per_event)
+
+    try:
+        with patch.object(
+            controllers.event_gist, "get_embedding", random_embedding
+        ), patch.object(
+            controllers.event_compaction, "get_embedding", random_embedding
+        ):
+            sizes = controllers.event_compaction.event_table_sizes()
+            print_report("before", sizes, await read_latency_ms(user_ids, args.rounds))
+
+            start = time.perf_counter()
+            p = await controllers.event_compaction.compact_events(
+                DEFAULT_PROJECT_ID, hot_retention_days=args.hot_retention_days
+            )
+            assert p.ok(), p.msg()
+            stats = {k: v for k, v in p.data().items() if not k.startswith("sizes")}
+            print(f"compaction: {stats} in {time.perf_counter() - start:.1f}s")
+
+            vacuum = "VACUUM FULL ANALYZE" if args.vacuum_full else "VACUUM ANALYZE"
+            with DB_ENGINE.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as conn:
+                for table in controllers.event_compaction.EVENT_TABLES:
+                    conn.execute(text(f"{vacuum} {table}"))
+            sizes = controllers.event_compaction.event_table_sizes()
+            print_report("after", sizes, await read_latency_ms(user_ids, args.rounds))
+    finally:
+        for user_id in user_ids:
+            await controllers.user.delete_user(user_id, DEFAULT_PROJECT_ID)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--events-per-day", type=int, default=2)
+    parser.add_argument("--gists-per-event", type=int, default=2)
+    parser.add_argument("--hot-retention-days", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--vacuum-full", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,172 @@
+"""
+Measure event tag filtering with and without the GIN index on event tags.
+
+Seeds `--users` users with `--events` events each. Every event carries 1 to 3
+of `--tags` tag names with one of 5 values and a random embedding. `legacy` is
+the filter before the index, one `@>` per tag on `event_data['event_tags']`,
+which checks every event of the user. `gin` is `filter_user_events`, one
+containment test served by `idx_user_events_event_tags`. The last rows time
+`search_user_events` with and without tag filters, the query embedding is
+random so only the database time is measured.
+
+    python -m benchmarks.bench_event_tags --users 20 --events 5000
+"""
+
+import time
+import random
+import asyncio
+import argparse
+import numpy as np
+from unittest.mock import patch
+from uuid import uuid4
+from sqlalchemy import insert, delete, text
+from memobase_server.env import CONFIG
+from memobase_server.connectors import Session
+from memobase_server.models.utils import Promise
+from memobase_server.models.database import DEFAULT_PROJECT_ID, User, UserEvent
+from memobase_server.controllers import full as controllers
+
+BATCH = 2000
+RNG = np.random.default_rng(0)
+VALUES = ["a", "b", "c", "d", "e"]
+
+
+async def random_embedding(project_id, texts, **kwargs):
+    return Promise.resolve(RNG.random((len(texts), CONFIG.embedding_dim)))
+
+
+def seed(args: argparse.Namespace) -> list:
+    rng = random.Random(0)
+    tag_names = [f"tag_{i}" for i in range(args.tags)]
+    users = [
+        {"id": uuid4(), "project_id": DEFAULT_PROJECT_ID} for _ in range(args.users)
+    ]
+    events = []
+    for user in users:
+        for i in range(args.events):
+            tags = [
+                {"tag": name, "value": rng.choice(VALUES)}
+                for name in rng.sample(tag_names, rng.randint(1, 3))
+            ]
+            events.append(
+                {
+                    "id": uuid4(),
+                    "user_id": user["id"],
+                    "project_id": DEFAULT_PROJECT_ID,
+                    "event_data": {
+                        "event_tip": f"- event {i}",
+                        "profile_delta": [],
+                        "event_tags": tags,
+                    },
+                    "embedding": RNG.random(CONFIG.embedding_dim),
+                }
+            )
+    with Session() as session:
+        session.execute(insert(User), users)
+        for i in range(0, len(events), BATCH):
+            session.execute(insert(UserEvent), events[i : i + BATCH])
+        session.execute(text("ANALYZE users, user_events"))
+        session.commit()
+    return [user["id"] for user in users]
+
+
+def legacy_filter(user_id, has_event_tag, event_tag_equal, topk) -> list:
+    with Session() as session:
+        query = session.query(UserEvent).filter_by(
+            user_id=user_id, project_id=DEFAULT_PROJECT_ID
+        )
+        query = query.filter(UserEvent.event_data.has_key("event_tags"))
+        query = query.filter(UserEvent.event_data["event_tags"].isnot(None))
+        for tag_name in has_event_tag:
+            query = query.filter(
+                UserEvent.event_data["event_tags"].op("@>")(
+                    f'[{{"tag": "{tag_name}"}}]'
+                )
+            )
+        for tag_name, tag_value in event_tag_equal.items():
+            query = query.filter(
+                UserEvent.event_data["event_tags"].op("@>")(
+                    f'[{{"tag": "{tag_name}", "value": "{tag_value}"}}]'
+                )
+            )
+        return query.order_by(UserEvent.created_at.desc()).limit(topk).all()
+
+
+async def gin_filter(user_id, has_event_tag, event_tag_equal, topk) -> list:
+    p = await controllers.event.filter_user_events(
+        user_id, DEFAULT_PROJECT_ID, has_event_tag, event_tag_equal, topk
+    )
+    assert p.ok(), p.msg()
+    return p.data().events
+
+
+async def vector_search(user_id, has_event_tag, event_tag_equal, topk) -> list:
+    p = await controllers.event.search_user_events(
+        user_id,
+        DEFAULT_PROJECT_ID,
+        "query",
+        topk,
+        similarity_threshold=0,
+        time_range_in_days=36500,
+        has_event_tag=has_event_tag,
+        event_tag_equal=event_tag_equal,
+    )
+    assert p.ok(), p.msg()
+    return p.data().events
+
+
+async def median_ms(search, user_ids, filters, topk) -> float:
+    timings = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        result = search(user_id, *filters, topk)
+        if asyncio.iscoroutine(result):
+            result = await result
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+async def main(args: argparse.Namespace):
+    user_ids = seed(args)
+    cases = {
+        "has tag": (["tag_0"], {}),
+        "tag=value": ([], {"tag_0": "a"}),
+        "2 tag=values": ([], {"tag_0": "a", "tag_1": "b"}),
+    }
+    rows = []
+    try:
+        with patch.object(controllers.event, "get_embedding", random_embedding):
+            for case, filters in cases.items():
+                rows.append(
+                    [
+                        case,
+                        await median_ms(legacy_filter, user_ids, filters, args.topk),
+                        await median_ms(gin_filter, user_ids, filters, args.topk),
+                    ]
+                )
+            no_tags = await median_ms(vector_search, user_ids, ([], {}), args.topk)
+            with_tags = await median_ms(
+                vector_search, user_ids, cases["2 tag=values"], args.topk
+            )
+    finally:
+        with Session() as session:
+            session.execute(delete(User).where(User.id.in_(user_ids)))
+            session.commit()
+
+    print(f"{args.users} users x {args.events} events, {args.tags} tag names")
+    print(f"{'filter':<16}{'legacy(ms)':>12}{'gin(ms)':>12}")
+    for case, legacy_ms, gin_ms in rows:
+        print(f"{case:<16}{legacy_ms:>12.2f}{gin_ms:>12.2f}")
+    print(
+        f"search_user_events: no tags {no_tags:.2f}ms, "
+        f"2 tag=values {with_tags:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--tags", type=int, default=20)
+    parser.add_argument("--topk", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
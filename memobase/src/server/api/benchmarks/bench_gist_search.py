@@ -0,0 +1,162 @@
+"""
+Measure gist retrieval quality and latency of each event search mode on LoCoMo.
+
+Every dialog turn of a LoCoMo conversation is stored as one gist of a user,
+every question (except the adversarial category 5) searches that user's gists.
+A question is answered from its `evidence` turns, so recall@k is the share of
+evidence turns in the top k and MRR the reciprocal rank of the first one.
+`latest` is the top k latest gists, what context got without embeddings.
+Latency includes the query embedding call of the `vector` and `hybrid` modes.
+
+Download `locomo10.json` as described in docs/experiments/locomo-benchmark,
+`vector` and `hybrid` call the configured embedding provider:
+
+    python -m benchmarks.bench_gist_search --data locomo10.json
+    python -m benchmarks.bench_gist_search --data locomo10.json --modes latest,lexical
+"""
+
+import time
+import asyncio
+import argparse
+import json
+import numpy as np
+from unittest.mock import patch
+from memobase_server.env import CONFIG
+from memobase_server.connectors import Session
+from memobase_server.llms.embeddings import get_embedding
+from memobase_server.models.response import UserData
+from memobase_server.models.database import (
+    DEFAULT_PROJECT_ID,
+    UserEvent,
+    UserEventGist,
+)
+from memobase_server.controllers import full as controllers
+
+MODES = ["latest", "lexical", "vector", "hybrid"]
+
+
+def conversation_turns(conversation: dict) -> list[dict]:
+    turns = []
+    for key, chats in conversation.items():
+        if not key.startswith("session_") or not isinstance(chats, list):
+            continue
+        date = conversation.get(f"{key}_date_time", "")
+        for chat in chats:
+            turns.append(
+                {
+                    "dia_id": chat["dia_id"],
+                    "content": f"- {chat['speaker']}: {chat['text']} [mention {date}]",
+                }
+            )
+    return turns
+
+
+async def seed_user(turns: list[dict], embed: bool, batch: int = 64) -> tuple:
+    p = await controllers.user.create_user(UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok(), p.msg()
+    user_id = p.data().id
+
+    embeddings = [None] * len(turns)
+    if embed:
+        embeddings = []
+        for start in range(0, len(turns), batch):
+            p = await get_embedding(
+                DEFAULT_PROJECT_ID,
+                [t["content"] for t in turns[start : start + batch]],
+                phase="document",
+                model=CONFIG.embedding_model,
+            )
+            assert p.ok(), p.msg()
+            embeddings.extend(p.data())
+
+    gist_turns = {}
+    with Session() as session:
+        event = UserEvent(
+            user_id=user_id,
+            project_id=DEFAULT_PROJECT_ID,
+            event_data={"event_tip": None, "profile_delta": []},
+        )
+        session.add(event)
+        for turn, embedding in zip(turns, embeddings):
+            gist = UserEventGist(
+                user_id=user_id,
+                project_id=DEFAULT_PROJECT_ID,
+                event_id=event.id,
+                gist_data={"content": turn["content"]},
+                embedding=embedding,
+            )
+            session.add(gist)
+            gist_turns[gist.id] = turn["dia_id"]
+        session.commit()
+    return user_id, gist_turns
+
+
+async def search(mode: str, user_id, question: str, k: int) -> list:
+    if mode == "latest":
+        p = await controllers.event_gist.get_user_event_gists(
+            user_id, DEFAULT_PROJECT_ID, topk=k, time_range_in_days=36500
+        )
+    else:
+        with patch.object(CONFIG, "event_search_mode", mode):
+            p = await controllers.event_gist.search_user_event_gists(
+                user_id,
+                DEFAULT_PROJECT_ID,
+                question,
+                topk=k,
+                similarity_threshold=0,
+                time_range_in_days=36500,
+            )
+    assert p.ok(), p.msg()
+    return [g.id for g in p.data().gists]
+
+
+async def main(args: argparse.Namespace):
+    with open(args.data) as f:
+        samples = json.load(f)[: args.samples]
+    modes = args.modes.split(",")
+    embed = any(m in ("vector", "hybrid") for m in modes)
+    if embed and not CONFIG.enable_event_embedding:
+        raise ValueError("vector and hybrid modes need enable_event_embedding")
+
+    results = {m: {"recall": [], "mrr": [], "latency": []} for m in modes}
+    for sample in samples:
+        user_id, gist_turns = await seed_user(
+            conversation_turns(sample["conversation"]), embed
+        )
+        try:
+            for qa in sample["qa"]:
+                evidence = set(qa.get("evidence") or [])
+                if str(qa.get("category")) == "5" or not evidence:
+                    continue
+                for mode in modes:
+                    start = time.perf_counter()
+                    found = await search(mode, user_id, qa["question"], args.k)
+                    results[mode]["latency"].append(time.perf_counter() - start)
+                    turns = [gist_turns[g] for g in found]
+                    results[mode]["recall"].append(
+                        len(evidence & set(turns)) / len(evidence)
+                    )
+                    ranks = [i for i, t in enumerate(turns) if t in evidence]
+                    results[mode]["mrr"].append(1 / (ranks[0] + 1) if ranks else 0)
+        finally:
+            await controllers.user.delete_user(user_id, DEFAULT_PROJECT_ID)
+
+    questions = len(results[modes[0]]["recall"])
+    print(f"{len(samples)} conversations, {questions} questions, k={args.k}")
+    print(f"{'mode':<10}{'recall':>8}{'mrr':>8}{'mean(ms)':>10}{'p99(ms)':>10}")
+    for mode, r in results.items():
+        latency = sorted(r["latency"])
+        print(
+            f"{mode:<10}{np.mean(r['recall']):>8.3f}{np.mean(r['mrr']):>8.3f}"
+            f"{np.mean(latency) * 1000:>10.2f}"
+            f"{latency[int(len(latency) * 0.99)] * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--data", required=True, help="path to locomo10.json")
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--k", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
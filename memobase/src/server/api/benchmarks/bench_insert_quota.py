@@ -0,0 +1,94 @@
+"""
+Load test chat blob inserts with and without the billing quota gate.
+
+Sends `--requests` inserts through the ASGI app from `--concurrency` clients,
+spread over `--users` users. The buffer limit is raised so no insert triggers
+a flush and an LLM call, only the insert path itself is measured.
+`billing_gate_refresh_s: 0` reads the billing on every insert, like before
+the gate. Uses the root project, set ACCESS_TOKEN if the server uses one.
+
+    python -m benchmarks.bench_insert_quota --requests 2000 --concurrency 32
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import httpx
+from unittest.mock import patch
+from api import app
+from memobase_server.env import CONFIG
+from memobase_server.controllers import billing
+
+PREFIX = "/api/v1"
+MODES = {"every insert": 0, "gate": 5}
+
+
+async def run(client: httpx.AsyncClient, user_ids: list, args) -> dict:
+    durations = []
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(user_ids[i % len(user_ids)])
+
+    async def worker():
+        while not queue.empty():
+            user_id = queue.get_nowait()
+            start = time.perf_counter()
+            r = await client.post(
+                f"{PREFIX}/blobs/insert/{user_id}",
+                json={
+                    "blob_type": "chat",
+                    "blob_data": {
+                        "messages": [{"role": "user", "content": "I like cats"}]
+                    },
+                },
+            )
+            assert r.status_code == 200 and r.json()["errno"] == 0, r.text
+            durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    durations.sort()
+    return {
+        "inserts_s": len(durations) / elapsed,
+        "p50_ms": durations[len(durations) // 2] * 1000,
+        "p99_ms": durations[int(len(durations) * 0.99)] * 1000,
+    }
+
+
+async def main(args: argparse.Namespace):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        headers={"Authorization": f"Bearer {os.getenv('ACCESS_TOKEN')}"},
+    ) as client:
+        user_ids = []
+        for _ in range(args.users):
+            r = await client.post(f"{PREFIX}/users", json={})
+            user_ids.append(r.json()["data"]["id"])
+        try:
+            results = {}
+            with patch.object(CONFIG, "max_chat_blob_buffer_token_size", 10**9):
+                for mode, refresh_s in MODES.items():
+                    billing.PROJECT_ALLOWANCES.clear()
+                    with patch.object(CONFIG, "billing_gate_refresh_s", refresh_s):
+                        results[mode] = await run(client, user_ids, args)
+        finally:
+            for user_id in user_ids:
+                await client.delete(f"{PREFIX}/users/{user_id}")
+
+    print(f"{args.requests} inserts, {args.concurrency} concurrent clients")
+    print(f"{'billing check':<16}{'inserts/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<16}{r['inserts_s']:>10.0f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
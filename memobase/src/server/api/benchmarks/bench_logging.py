@@ -0,0 +1,145 @@
+"""
+Measure the per-request cost of logging on the event loop.
+
+Each mode runs in its own process (loggers are configured at import time) and
+sends requests through `global_wrapper_middleware` with a no-op endpoint that
+also writes two `TRACE_LOG.info` lines, like a flush does. Log output goes to
+/dev/null, so the numbers are the cost paid by the request, not by the terminal.
+`--sink-latency-us` makes every write block, like a slow pipe or log driver.
+
+    python -m benchmarks.bench_logging --requests 20000
+    python -m benchmarks.bench_logging --sink-latency-us 200
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+import tempfile
+
+MODES = {
+    "off": {"LOG_FORMAT": "json"},
+    "plain": {"LOG_FORMAT": "plain"},
+    "json": {"LOG_FORMAT": "json"},
+    "json+production": {"LOG_FORMAT": "json", "LOG_MODE": "production"},
+    "json+production(no sampling)": {
+        "LOG_FORMAT": "json",
+        "LOG_MODE": "production",
+        "LOG_SAMPLE_RATE": "1",
+    },
+}
+
+
+async def run_requests(requests: int) -> list[float]:
+    from fastapi import Request
+    from fastapi.responses import JSONResponse
+    from memobase_server.env import TRACE_LOG
+    from memobase_server.api_layer.middleware import global_wrapper_middleware
+
+    async def call_next(request):
+        TRACE_LOG.info("bench_project", "bench_user", "Flush 2 blobs")
+        TRACE_LOG.info("bench_project", "bench_user", "Adding 1, updating 2 profiles")
+        return JSONResponse({"data": None, "errno": 0, "errmsg": ""})
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/users/profile/bench_user",
+        "query_string": b"max_token_size=500",
+        "headers": [],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+        "scheme": "http",
+        "http_version": "1.1",
+        "root_path": "",
+    }
+    durations = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await global_wrapper_middleware(Request(scope), call_next)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class SlowSink:
+    def __init__(self, latency_us: float):
+        self.latency = latency_us / 1e6
+        self.sink = open(os.devnull, "w")
+
+    def write(self, data: str) -> int:
+        time.sleep(self.latency)
+        return self.sink.write(data)
+
+    def flush(self):
+        self.sink.flush()
+
+
+def child(mode: str, requests: int, output: str, sink_latency_us: float):
+    if sink_latency_us:
+        # before memobase_server is imported, its handlers keep these streams
+        sys.stdout = sys.stderr = SlowSink(sink_latency_us)
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    durations = asyncio.run(run_requests(requests))
+    durations.sort()
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "mean_us": sum(durations) / len(durations) * 1e6,
+                "p50_us": durations[len(durations) // 2] * 1e6,
+                "p99_us": durations[int(len(durations) * 0.99)] * 1e6,
+            },
+            f,
+        )
+
+
+def main(args: argparse.Namespace):
+    results = {}
+    for mode, env in MODES.items():
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_logging",
+                    "--child",
+                    mode,
+                    "--requests",
+                    str(args.requests),
+                    "--output",
+                    output.name,
+                    "--sink-latency-us",
+                    str(args.sink_latency_us),
+                ],
+                env={**os.environ, **env},
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+            with open(output.name) as f:
+                results[mode] = json.load(f)
+
+    baseline = results["off"]["mean_us"]
+    print(f"{'mode':<30}{'mean(us)':>10}{'p50(us)':>10}{'p99(us)':>10}{'logging(us)':>13}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<30}{r['mean_us']:>10.1f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}"
+            f"{r['mean_us'] - baseline:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--child", choices=list(MODES))
+    parser.add_argument("--sink-latency-us", type=float, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.requests, args.output, args.sink_latency_us)
+    else:
+        main(args)
@@ -0,0 +1,178 @@
+"""
+Compare offset and cursor pagination at increasing depths, and the export stream.
+
+Seeds `--users` users into the root project and `--blobs` doc blobs into one
+of them, then reads one page of project users (ordered by `updated_at`) and
+of that user's blobs at each depth in `--depths`, with `offset`/`page` and
+with the cursor of the row before. The cursor is built from the seeded rows,
+so its cost is only the page query. Finally the user is exported as NDJSON,
+reporting the throughput and the peak Python memory of consuming the stream.
+
+    python -m benchmarks.bench_pagination --users 100000 --blobs 100000
+"""
+
+import time
+import asyncio
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from sqlalchemy import insert, delete, text
+from memobase_server.connectors import Session
+from memobase_server.models.blob import BlobType
+from memobase_server.models.database import DEFAULT_PROJECT_ID, User, GeneralBlob
+from memobase_server.controllers import full as controllers
+from memobase_server.utils import encode_cursor
+
+BATCH = 5000
+
+
+def seed(users: int, blobs: int) -> tuple[list, list]:
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    user_rows = [
+        {
+            "id": uuid4(),
+            "project_id": DEFAULT_PROJECT_ID,
+            "updated_at": start + timedelta(milliseconds=i),
+        }
+        for i in range(users)
+    ]
+    blob_rows = [
+        {
+            "id": uuid4(),
+            "user_id": user_rows[0]["id"],
+            "project_id": DEFAULT_PROJECT_ID,
+            "blob_type": str(BlobType.doc),
+            "blob_data": {"content": f"document {i} " * 20},
+            "created_at": start + timedelta(milliseconds=i),
+        }
+        for i in range(blobs)
+    ]
+    with Session() as session:
+        for table, rows in ((User, user_rows), (GeneralBlob, blob_rows)):
+            for i in range(0, len(rows), BATCH):
+                session.execute(insert(table), rows[i : i + BATCH])
+        # plan the page queries with the seeded rows counted
+        session.execute(text("ANALYZE users, general_blobs"))
+        session.commit()
+    return user_rows, blob_rows
+
+
+async def timed_ms(call, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        p = await call()
+        assert p.ok(), p.msg()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+async def page_latency(user_rows, blob_rows, depths, args) -> list:
+    user_id = user_rows[0]["id"]
+    # users are listed newest first, blobs oldest first
+    users_desc = user_rows[::-1]
+    results = []
+    for depth in depths:
+        row = {}
+        if depth < len(users_desc):
+            last = users_desc[depth - 1] if depth else None
+            cursor = last and encode_cursor(
+                [last["updated_at"].isoformat(), str(last["id"])]
+            )
+            row["users offset"] = await timed_ms(
+                lambda: controllers.project.get_project_users(
+                    DEFAULT_PROJECT_ID, limit=args.page_size, offset=depth
+                ),
+                args.rounds,
+            )
+            row["users cursor"] = await timed_ms(
+                lambda: controllers.project.get_project_users(
+                    DEFAULT_PROJECT_ID, limit=args.page_size, cursor=cursor
+                ),
+                args.rounds,
+            )
+        if depth < len(blob_rows) and depth % args.page_size == 0:
+            last = blob_rows[depth - 1] if depth else None
+            cursor = last and encode_cursor(
+                [last["created_at"].isoformat(), str(last["id"])]
+            )
+            row["blobs page"] = await timed_ms(
+                lambda: controllers.user.get_user_all_blobs(
+                    user_id,
+                    DEFAULT_PROJECT_ID,
+                    BlobType.doc,
+                    page=depth // args.page_size,
+                    page_size=args.page_size,
+                ),
+                args.rounds,
+            )
+            row["blobs cursor"] = await timed_ms(
+                lambda: controllers.user.get_user_all_blobs(
+                    user_id,
+                    DEFAULT_PROJECT_ID,
+                    BlobType.doc,
+                    page_size=args.page_size,
+                    cursor=cursor,
+                ),
+                args.rounds,
+            )
+        results.append((depth, row))
+    return results
+
+
+async def export_stats(user_id) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    p = await controllers.user.export_user(user_id, DEFAULT_PROJECT_ID)
+    assert p.ok(), p.msg()
+    lines = size = 0
+    for line in p.data():
+        lines += 1
+        size += len(line)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "lines": lines,
+        "mb": size / 2**20,
+        "lines_s": lines / elapsed,
+        "peak_mb": peak / 2**20,
+    }
+
+
+async def main(args: argparse.Namespace):
+    depths = [int(d) for d in args.depths.split(",")]
+    user_rows, blob_rows = seed(args.users, args.blobs)
+    try:
+        results = await page_latency(user_rows, blob_rows, depths, args)
+        export = await export_stats(user_rows[0]["id"])
+    finally:
+        with Session() as session:
+            ids = [row["id"] for row in user_rows]
+            for i in range(0, len(ids), BATCH):
+                session.execute(delete(User).where(User.id.in_(ids[i : i + BATCH])))
+            session.commit()
+
+    columns = ["users offset", "users cursor", "blobs page", "blobs cursor"]
+    print(f"{args.users} users, {args.blobs} blobs, page size {args.page_size}")
+    print(f"{'depth':>10}" + "".join(f"{c + '(ms)':>18}" for c in columns))
+    for depth, row in results:
+        print(
+            f"{depth:>10}"
+            + "".join(f"{row[c]:>18.2f}" if c in row else f"{'-':>18}" for c in columns)
+        )
+    print(
+        f"export: {export['lines']} lines, {export['mb']:.1f}MB, "
+        f"{export['lines_s']:.0f} lines/s, peak Python memory {export['peak_mb']:.1f}MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--blobs", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--depths", default="0,1000,10000,50000,99980")
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,168 @@
+"""
+Measure the project users dashboard query with aggregated and maintained counts.
+
+Seeds `--users` users into a fresh project with 0 to 2 * `--profiles` profiles
+and 0 to 2 * `--events` events each, then loads the first page and the page at
+`--deep-offset` of `GET /project/users` for every order. `aggregate` is the
+query before the user counters, it groups all profiles and events of the
+project per user on every page load. `counters` reads `User.profile_count` and
+`User.event_count`, ordered through their indexes.
+
+    python -m benchmarks.bench_project_users --users 100000
+"""
+
+import time
+import random
+import asyncio
+import argparse
+from uuid import uuid4
+from sqlalchemy import insert, delete, text, func, desc
+from memobase_server.connectors import Session
+from memobase_server.models.database import User, UserProfile, UserEvent
+from memobase_server.controllers import full as controllers
+
+BATCH = 5000
+PROJECT_ID = "bench_project_users"
+ORDERS = ["updated_at", "profile_count", "event_count"]
+
+
+def seed(args: argparse.Namespace) -> None:
+    rng = random.Random(0)
+    users, profiles, events = [], [], []
+    for _ in range(args.users):
+        user = {"id": uuid4(), "project_id": PROJECT_ID}
+        user["profile_count"] = rng.randint(0, 2 * args.profiles)
+        user["event_count"] = rng.randint(0, 2 * args.events)
+        users.append(user)
+        profiles.extend(
+            {
+                "id": uuid4(),
+                "user_id": user["id"],
+                "project_id": PROJECT_ID,
+                "content": f"memo {i}",
+                "attributes": {"topic": "interest", "sub_topic": f"topic {i}"},
+            }
+            for i in range(user["profile_count"])
+        )
+        events.extend(
+            {
+                "id": uuid4(),
+                "user_id": user["id"],
+                "project_id": PROJECT_ID,
+                "event_data": {"event_tip": f"- event {i}", "profile_delta": []},
+            }
+            for i in range(user["event_count"])
+        )
+    with Session() as session:
+        # the projects table is read-only for the ORM
+        session.execute(
+            text(
+                "INSERT INTO projects (id, project_id, project_secret, status) "
+                "VALUES (gen_random_uuid(), :project_id, 'bench', 'active')"
+            ),
+            {"project_id": PROJECT_ID},
+        )
+        tables = [(User, users), (UserProfile, profiles), (UserEvent, events)]
+        for table, rows in tables:
+            for i in range(0, len(rows), BATCH):
+                session.execute(insert(table), rows[i : i + BATCH])
+        session.execute(text("ANALYZE users, user_profiles, user_events"))
+        session.commit()
+    print(f"seeded {len(users)} users, {len(profiles)} profiles, {len(events)} events")
+
+
+def aggregate_users(order_by: str, limit: int, offset: int) -> list:
+    with Session() as session:
+        profile_subq = (
+            session.query(
+                UserProfile.user_id.label("user_id"),
+                func.count(UserProfile.id).label("profile_count"),
+            )
+            .filter(UserProfile.project_id == PROJECT_ID)
+            .group_by(UserProfile.user_id)
+            .subquery()
+        )
+        event_subq = (
+            session.query(
+                UserEvent.user_id.label("user_id"),
+                func.count(UserEvent.id).label("event_count"),
+            )
+            .filter(UserEvent.project_id == PROJECT_ID)
+            .group_by(UserEvent.user_id)
+            .subquery()
+        )
+        query = (
+            session.query(
+                User,
+                func.coalesce(profile_subq.c.profile_count, 0).label("profile_count"),
+                func.coalesce(event_subq.c.event_count, 0).label("event_count"),
+            )
+            .filter(User.project_id == PROJECT_ID)
+            .outerjoin(profile_subq, profile_subq.c.user_id == User.id)
+            .outerjoin(event_subq, event_subq.c.user_id == User.id)
+        )
+        if order_by == "updated_at":
+            query = query.order_by(desc(User.updated_at))
+        else:
+            query = query.order_by(desc(order_by))
+        session.query(func.count()).filter(User.project_id == PROJECT_ID).scalar()
+        return query.limit(limit).offset(offset).all()
+
+
+async def counter_users(order_by: str, limit: int, offset: int) -> list:
+    p = await controllers.project.get_project_users(
+        PROJECT_ID, limit=limit, offset=offset, order_by=order_by
+    )
+    assert p.ok(), p.msg()
+    return p.data().users
+
+
+async def median_ms(call, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = call()
+        if asyncio.iscoroutine(result):
+            result = await result
+        assert len(result) > 0
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+async def main(args: argparse.Namespace):
+    seed(args)
+    results = []
+    try:
+        for order_by in ORDERS:
+            for offset in (0, args.deep_offset):
+                row = [order_by, offset]
+                for users in (aggregate_users, counter_users):
+                    row.append(
+                        await median_ms(
+                            lambda: users(order_by, args.limit, offset), args.rounds
+                        )
+                    )
+                results.append(row)
+    finally:
+        with Session() as session:
+            session.execute(delete(User).where(User.project_id == PROJECT_ID))
+            session.execute(
+                text("DELETE FROM projects WHERE project_id = :project_id"),
+                {"project_id": PROJECT_ID},
+            )
+            session.commit()
+
+    print(f"{'order_by':<16}{'offset':>8}{'aggregate(ms)':>16}{'counters(ms)':>16}")
+    for order_by, offset, aggregate_ms, counter_ms in results:
+        print(f"{order_by:<16}{offset:>8}{aggregate_ms:>16.2f}{counter_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--profiles", type=int, default=5)
+    parser.add_argument("--events", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--deep-offset", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,115 @@
+"""
+Measure prompt assembly time and allocated bytes per flush.
+
+A flush parses the project's config string, packs the user's profiles twice
+(entry summary and extract) and renders the entry summary, extract and event
+tagging system prompts. `uncached` parses the config and drops the project's
+prompts before every flush, which is what every flush paid before the cache.
+
+    python -m benchmarks.bench_prompt_cache --flushes 2000 --profiles 40
+"""
+
+import time
+import uuid
+import argparse
+import tracemalloc
+from memobase_server.env import ProfileConfig
+from memobase_server.controllers.project import parse_profile_config
+from memobase_server.models.response import ProfileData, UserProfilesData
+from memobase_server.controllers.modal.chat.utils import pack_current_user_profiles
+from memobase_server.controllers.modal.chat.prompt_cache import (
+    invalidate_project_prompts,
+)
+
+PROJECT_ID = "bench_project"
+CONFIG_STRING = """
+additional_user_profiles:
+  - topic: "gaming"
+    description: "games the user plays"
+    sub_topics:
+      - name: "platform"
+      - name: "favorite_games"
+        description: "titles and genres"
+  - topic: "pets"
+    sub_topics:
+      - name: "name"
+      - name: "breed"
+event_tags:
+  - name: "emotion"
+    description: "how the user feels"
+  - name: "goal"
+    description: "what the user wants to achieve"
+"""
+
+
+def user_profiles(n: int) -> UserProfilesData:
+    return UserProfilesData(
+        profiles=[
+            ProfileData(
+                id=uuid.uuid4(),
+                content=f"user memo number {i}, mentioned last week",
+                attributes={"topic": f"topic_{i % 8}", "sub_topic": f"sub_topic_{i}"},
+            )
+            for i in range(n)
+        ]
+    )
+
+
+def assemble_flush(profiles: UserProfilesData, cached: bool) -> list[str]:
+    if cached:
+        config = parse_profile_config(CONFIG_STRING)
+    else:
+        config = ProfileConfig.load_config_string(CONFIG_STRING)
+    summary_info = pack_current_user_profiles(PROJECT_ID, profiles, config)
+    extract_info = pack_current_user_profiles(PROJECT_ID, profiles, config)
+    return [
+        summary_info["project_prompts"].entry_summary_system_prompt,
+        extract_info["project_prompts"].extract_system_prompt,
+        extract_info["project_prompts"].event_tagging_system_prompt,
+    ]
+
+
+def run(cached: bool, flushes: int, profiles: UserProfilesData) -> dict:
+    assemble_flush(profiles, cached)
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(flushes):
+        if not cached:
+            invalidate_project_prompts(PROJECT_ID)
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        assemble_flush(profiles, cached)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    # tracemalloc slows allocations down, so time a separate pass without it
+    durations = []
+    for _ in range(flushes):
+        if not cached:
+            invalidate_project_prompts(PROJECT_ID)
+        start = time.perf_counter()
+        assemble_flush(profiles, cached)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return {
+        "mean_us": sum(durations) / len(durations) * 1e6,
+        "p99_us": durations[int(len(durations) * 0.99)] * 1e6,
+        "peak_kb": allocated / flushes / 1024,
+    }
+
+
+def main(args: argparse.Namespace):
+    profiles = user_profiles(args.profiles)
+    print(f"{'mode':<10}{'mean(us)':>10}{'p99(us)':>10}{'peak alloc(KB)':>16}")
+    for name, cached in [("uncached", False), ("cached", True)]:
+        r = run(cached, args.flushes, profiles)
+        print(
+            f"{name:<10}{r['mean_us']:>10.1f}{r['p99_us']:>10.1f}{r['peak_kb']:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--flushes", type=int, default=2000)
+    parser.add_argument("--profiles", type=int, default=40)
+    main(parser.parse_args())
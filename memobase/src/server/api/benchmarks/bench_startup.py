@@ -0,0 +1,106 @@
+"""
+Measure the time from starting a server process to its first 200 response.
+
+Each run starts `uvicorn api:app` like the Dockerfile, polls the healthcheck
+until it returns 200, and records the time since the process was spawned.
+`import` is the time to import `api` alone in a fresh process.
+Modes set `migrate_on_startup` and `startup_sanity_check`, `blocking` calls the
+configured LLM and embedding APIs, so it is only included with `--blocking`.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+
+MODES = {
+    "migrate+background": {
+        "MEMOBASE_MIGRATE_ON_STARTUP": "true",
+        "MEMOBASE_STARTUP_SANITY_CHECK": "background",
+    },
+    "no-migrate+background": {
+        "MEMOBASE_MIGRATE_ON_STARTUP": "false",
+        "MEMOBASE_STARTUP_SANITY_CHECK": "background",
+    },
+    "no-migrate+off": {
+        "MEMOBASE_MIGRATE_ON_STARTUP": "false",
+        "MEMOBASE_STARTUP_SANITY_CHECK": "off",
+    },
+}
+BLOCKING_MODE = {
+    "migrate+blocking": {
+        "MEMOBASE_MIGRATE_ON_STARTUP": "true",
+        "MEMOBASE_STARTUP_SANITY_CHECK": "blocking",
+    },
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import api"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def time_to_first_200(env: dict, timeout: float) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/api/v1/healthcheck"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port)],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"no 200 from {url} in {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args: argparse.Namespace):
+    modes = {**MODES, **(BLOCKING_MODE if args.blocking else {})}
+    timings = {"import": [import_time() for _ in range(args.runs)]}
+    for mode, env in modes.items():
+        timings[mode] = [time_to_first_200(env, args.timeout) for _ in range(args.runs)]
+
+    print(f"{'mode':<24}{'median(ms)':>12}{'min(ms)':>10}{'max(ms)':>10}")
+    for mode, t in timings.items():
+        print(
+            f"{mode:<24}{statistics.median(t) * 1000:>12.0f}"
+            f"{min(t) * 1000:>10.0f}{max(t) * 1000:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--blocking", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,95 @@
+"""
+Compare blocking and streaming profile extraction against a stub LLM.
+
+The stub emits the extract completion line by line (time to first token, then a
+fixed time per line) and answers merge calls after a fixed latency plus a time
+per merged memo, so the numbers only show how much merge work overlaps with
+generation, not real model speed.
+
+    python -m benchmarks.bench_stream_extract --facts 12 --batch-size 4
+"""
+
+import re
+import time
+import asyncio
+import argparse
+from unittest.mock import patch
+
+from memobase_server import llms
+from memobase_server.env import CONFIG, ProfileConfig
+from memobase_server.models.response import UserProfilesData
+from memobase_server.controllers.modal.chat import process_profile_res
+
+
+class StubLLM:
+    def __init__(self, facts: int, ttft_ms: float, line_ms: float, merge_ms: float):
+        self.facts = facts
+        self.ttft = ttft_ms / 1000
+        self.line = line_ms / 1000
+        self.merge = merge_ms / 1000
+        self.tab = CONFIG.llm_tab_separator
+
+    def extract_lines(self) -> list[str]:
+        lines = ["thinking about the memo...", "---"]
+        for i in range(self.facts):
+            lines.append(f"- topic_{i}{self.tab}sub_topic_{i}{self.tab}memo {i}")
+        return [f"{line}\n" for line in lines]
+
+    async def stream(self, model, prompt, **kwargs):
+        await asyncio.sleep(self.ttft)
+        for line in self.extract_lines():
+            await asyncio.sleep(self.line)
+            yield line
+
+    async def complete(self, model, prompt, **kwargs):
+        if kwargs.get("prompt_id") == "merge_profile_yolo":
+            memos = len(re.findall(r"'memo_id'", prompt))
+            await asyncio.sleep(self.merge + self.line * memos)
+            actions = [f"{i + 1}. APPEND{self.tab}APPEND" for i in range(memos)]
+            return "thinking\n---\n" + "\n".join(actions)
+        return "".join([line async for line in self.stream(model, prompt)])
+
+
+async def noop_billing(*args, **kwargs):
+    return None
+
+
+async def run_once(stream: bool) -> float:
+    CONFIG.stream_profile_extract = stream
+    start = time.perf_counter()
+    p = await process_profile_res(
+        "bench_user",
+        "bench_project",
+        "user memo",
+        ProfileConfig(),
+        UserProfilesData(profiles=[]),
+    )
+    assert p.ok(), p.msg()
+    return (time.perf_counter() - start) * 1000
+
+
+async def main(args: argparse.Namespace):
+    stub = StubLLM(args.facts, args.ttft_ms, args.line_ms, args.merge_ms)
+    CONFIG.stream_merge_batch_size = args.batch_size
+    with patch.dict(llms.FACTORIES, {CONFIG.llm_style: stub.complete}), patch.dict(
+        llms.STREAM_FACTORIES, {CONFIG.llm_style: stub.stream}
+    ), patch.object(llms, "project_cost_token_billing", noop_billing), patch.object(
+        llms, "get_response_cache", return_value=None
+    ):
+        for name, stream in [("blocking", False), ("streaming", True)]:
+            runs = [await run_once(stream) for _ in range(args.rounds)]
+            print(
+                f"{name:<10} facts={args.facts} batch={args.batch_size} "
+                f"mean={sum(runs) / len(runs):.0f}ms min={min(runs):.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--facts", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--line-ms", type=float, default=80)
+    parser.add_argument("--merge-ms", type=float, default=400)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
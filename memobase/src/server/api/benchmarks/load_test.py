@@ -0,0 +1,272 @@
+"""
+Load test the server with a mixed workload against stubbed LLM and embeddings.
+
+Boots the ASGI app with its lifespan on the configured Postgres and Redis, and
+replaces the LLM and embedding providers with deterministic stubs: each call
+sleeps `--llm-latency-ms` (or `--embedding-latency-ms`) plus a jitter of up to
+`--jitter-ms`, and answers from the prompt alone, so the same run gives the
+same memories. The LLM stub answers in the format of the chat modal module
+that called it, so flushes run the whole extract, merge and event pipeline.
+`--requests` operations are drawn with `--seed` from the weights in `MIX` over
+`--users` users and sent by `--concurrency` clients. The stub embeddings are
+random, so searches use a similarity threshold of 0 to return events.
+Reports throughput and p50/p95/p99 per endpoint, `--json` prints them for
+comparing runs.
+Uses the root project, set ACCESS_TOKEN if the server uses one.
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 32
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import httpx
+import numpy as np
+from contextlib import ExitStack
+from unittest.mock import patch
+from api import app
+from memobase_server.env import CONFIG
+from memobase_server import llms
+from memobase_server.llms import embeddings
+
+PREFIX = "/api/v1"
+MIX = {"insert": 50, "flush": 5, "context": 20, "search": 15, "profile": 10}
+MESSAGES = [
+    "I like cats, I have two of them",
+    "I moved to Berlin last month for a new job",
+    "My sister is getting married in June",
+    "I'm learning to play the piano",
+    "I'm a software engineer and I mostly write Python",
+    "I feel tired, work has been busy this week",
+    "We went hiking in the Alps on the weekend",
+    "I'm vegetarian, but I still love Chinese food",
+]
+FACTS = [
+    "- basic_info::name::Gus",
+    "- interest::foods::Chinese food",
+    "- interest::pets::two cats",
+    "- education::level::High School",
+    "- work::title::software engineer",
+    "- psychological::emotional_state::Feels tired at work",
+]
+ANSWERS = {
+    "modal.chat.entry_summary": lambda rng: "Gus talked about daily life",
+    "modal.chat.extract": lambda rng: "\n".join(rng.sample(FACTS, 2)),
+    "modal.chat.stream_extract": lambda rng: "\n".join(rng.sample(FACTS, 2)),
+    "modal.chat.merge_yolo": lambda rng: "TTTT\n---\n"
+    + "\n".join(f"{i}. APPEND::" for i in range(1, len(FACTS) + 1)),
+    "modal.chat.merge": lambda rng: "UPDATE::Gus",
+    "modal.chat.organize": lambda rng: "- foods::Chinese food",
+    "modal.chat.summary": lambda rng: "Gus likes Chinese food",
+    "modal.chat.event_summary": lambda rng: "- emotion::happy",
+    "modal.chat.fast_extract": lambda rng: json.dumps(
+        {
+            "summary": "Gus talked about daily life",
+            "facts": [
+                dict(zip(["topic", "sub_topic", "memo"], f[2:].split("::")))
+                for f in rng.sample(FACTS, 2)
+            ],
+            "event_tags": [{"tag": "emotion", "value": "happy"}],
+        }
+    ),
+}
+
+
+def calling_controller() -> str:
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("memobase_server.controllers."):
+            return module[len("memobase_server.controllers.") :]
+        frame = frame.f_back
+    return "other"
+
+
+def stub_providers(args: argparse.Namespace) -> ExitStack:
+    async def sleep(rng: random.Random, latency_ms: float):
+        jitter_ms = rng.uniform(-args.jitter_ms, args.jitter_ms)
+        await asyncio.sleep(max(latency_ms + jitter_ms, 0) / 1000)
+
+    def answer(prompt: str) -> tuple[random.Random, str]:
+        rng = random.Random(zlib.crc32(prompt.encode()) ^ args.seed)
+        return rng, ANSWERS.get(calling_controller(), lambda rng: "ok")(rng)
+
+    async def complete(model, prompt, **kwargs) -> str:
+        rng, results = answer(prompt)
+        await sleep(rng, args.llm_latency_ms)
+        return results
+
+    async def stream_complete(model, prompt, **kwargs):
+        rng, results = answer(prompt)
+        await sleep(rng, args.llm_latency_ms)
+        for line in results.split("\n"):
+            yield line + "\n"
+
+    async def embedding(model, texts, phase) -> np.ndarray:
+        rng = random.Random(zlib.crc32("\n".join(texts).encode()) ^ args.seed)
+        await sleep(rng, args.embedding_latency_ms)
+        vectors = np.stack(
+            [
+                np.random.default_rng(zlib.crc32(t.encode())).standard_normal(
+                    CONFIG.embedding_dim
+                )
+                for t in texts
+            ]
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    stack = ExitStack()
+    stack.enter_context(patch.dict(llms.FACTORIES, {CONFIG.llm_style: complete}))
+    stack.enter_context(
+        patch.dict(llms.STREAM_FACTORIES, {CONFIG.llm_style: stream_complete})
+    )
+    stack.enter_context(
+        patch.dict(embeddings.FACTORIES, {CONFIG.embedding_provider: embedding})
+    )
+    return stack
+
+
+def operation(client: httpx.AsyncClient, op: str, user_id: str, text: str):
+    if op == "insert":
+        return client.post(
+            f"{PREFIX}/blobs/insert/{user_id}",
+            json={
+                "blob_type": "chat",
+                "blob_data": {
+                    "messages": [
+                        {"role": "user", "content": text},
+                        {"role": "assistant", "content": "Tell me more!"},
+                    ]
+                },
+            },
+        )
+    if op == "flush":
+        return client.post(
+            f"{PREFIX}/users/buffer/{user_id}/chat", params={"wait_process": True}
+        )
+    if op == "context":
+        return client.get(
+            f"{PREFIX}/users/context/{user_id}",
+            params={
+                "chats_str": json.dumps([{"role": "user", "content": text}]),
+                "event_similarity_threshold": 0,
+            },
+        )
+    if op == "search":
+        return client.get(
+            f"{PREFIX}/users/event/search/{user_id}",
+            params={"query": text, "similarity_threshold": 0},
+        )
+    return client.get(f"{PREFIX}/users/profile/{user_id}")
+
+
+def percentile(durations: list, q: float) -> float:
+    return durations[min(int(len(durations) * q), len(durations) - 1)] * 1000
+
+
+async def run(client: httpx.AsyncClient, user_ids: list, args) -> dict:
+    rng = random.Random(args.seed)
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(
+            (
+                rng.choices(list(MIX), weights=list(MIX.values()))[0],
+                rng.choice(user_ids),
+                rng.choice(MESSAGES),
+            )
+        )
+    durations = {op: [] for op in MIX}
+    errors = {op: 0 for op in MIX}
+
+    async def worker():
+        while not queue.empty():
+            op, user_id, text = queue.get_nowait()
+            start = time.perf_counter()
+            r = await operation(client, op, user_id, text)
+            durations[op].append(time.perf_counter() - start)
+            if r.status_code != 200 or r.json()["errno"] != 0:
+                errors[op] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    results = {}
+    for op in MIX:
+        if not durations[op]:
+            continue
+        d = sorted(durations[op])
+        results[op] = {
+            "requests": len(d),
+            "errors": errors[op],
+            "rps": len(d) / elapsed,
+            "p50_ms": percentile(d, 0.5),
+            "p95_ms": percentile(d, 0.95),
+            "p99_ms": percentile(d, 0.99),
+        }
+    results["total"] = {
+        "requests": args.requests,
+        "errors": sum(errors.values()),
+        "rps": args.requests / elapsed,
+    }
+    return results
+
+
+async def main(args: argparse.Namespace):
+    with stub_providers(args):
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+            headers={"Authorization": f"Bearer {os.getenv('ACCESS_TOKEN')}"},
+            timeout=None,
+        ) as client:
+            user_ids = []
+            try:
+                for _ in range(args.users):
+                    r = await client.post(f"{PREFIX}/users", json={})
+                    user_ids.append(r.json()["data"]["id"])
+                results = await run(client, user_ids, args)
+            finally:
+                for user_id in user_ids:
+                    await client.delete(f"{PREFIX}/users/{user_id}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{args.requests} requests, {args.concurrency} concurrent clients, "
+        f"{args.users} users, LLM {args.llm_latency_ms:.0f}ms, "
+        f"embedding {args.embedding_latency_ms:.0f}ms, jitter {args.jitter_ms:.0f}ms"
+    )
+    print(
+        f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>10}"
+        f"{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+    )
+    for op, r in results.items():
+        if op == "total":
+            continue
+        print(
+            f"{op:<10}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10.1f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        )
+    total = results["total"]
+    print(
+        f"{'total':<10}{total['requests']:>10}{total['errors']:>8}{total['rps']:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -25,7 +25,7 @@ async def insert_blob(
         capture_int_key, TelemetryKeyName.insert_blob_request, project_id=project_id
     )
 
-    p = await controllers.billing.get_project_billing(project_id)
+    p = await controllers.billing.check_project_quota(project_id)
     if not p.ok():
         return p.to_response(res.IdResponse)
     billing = p.data()
@@ -1,7 +1,8 @@
 import traceback
 from fastapi import HTTPException, Request
 from ..env import LOG
-from ..models.response import BaseResponse, CODE
+from ..controllers import full as controllers
+from ..models.response import BaseResponse, CODE, ReadinessResponse
 from ..models.database import DEFAULT_PROJECT_ID
 from ..connectors import db_health_check, redis_health_check
 from ..llms.embeddings import check_embedding_sanity
@@ -10,17 +11,25 @@ from ..llms import llm_sanity_check
 
 async def healthcheck() -> BaseResponse:
     """Check if your memobase is set up correctly"""
-    if not db_health_check():
-        raise HTTPException(
-            status_code=CODE.INTERNAL_SERVER_ERROR.value,
-            detail="Database not available",
-        )
-    if not await redis_health_check():
+    probes = await controllers.health.get_liveness()
+    for name, description in (("db", "Database"), ("redis", "Redis")):
+        if not probes[name].ok:
+            raise HTTPException(
+                status_code=CODE.INTERNAL_SERVER_ERROR.value,
+                detail=f"{description} not available",
+            )
+    return BaseResponse()
+
+
+async def readiness() -> ReadinessResponse:
+    """The last probes of the server's dependencies and its connection pools"""
+    data = await controllers.health.get_readiness()
+    if not data.ready:
         raise HTTPException(
-            status_code=CODE.INTERNAL_SERVER_ERROR.value,
-            detail="Redis not available",
+            status_code=CODE.SERVICE_UNAVAILABLE.value,
+            detail=data.model_dump(mode="json"),
         )
-    return BaseResponse()
+    return ReadinessResponse(data=data)
 
 
 async def root_running_status_check(request: Request) -> BaseResponse:
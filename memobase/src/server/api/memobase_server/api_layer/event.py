@@ -1,11 +1,29 @@
 from ..controllers import full as controllers
 from ..controllers import event_gist
 from ..models import response as res
-from ..models.response import UUID
+from ..models.response import UUID, CODE
+from ..models.utils import Promise
 from fastapi import Request
 from fastapi import Path, Query, Body
 
 
+def parse_event_tag_filters(
+    tags: str = None, tag_values: str = None
+) -> tuple[list[str] | None, dict[str, str] | None]:
+    has_event_tag = None
+    if tags:
+        has_event_tag = [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+    event_tag_equal = None
+    if tag_values:
+        event_tag_equal = {}
+        for pair in tag_values.split(","):
+            if "=" in pair:
+                tag_name, tag_value = pair.split("=", 1)
+                event_tag_equal[tag_name.strip()] = tag_value.strip()
+    return has_event_tag, event_tag_equal
+
+
 async def get_user_events(
     request: Request,
     user_id: UUID = Path(..., description="The ID of the user"),
@@ -66,17 +84,37 @@ async def search_user_events(
     use_gists: bool = Query(
         True, description="Whether to search event gists (default) or event tip"
     ),
+    tags: str = Query(
+        None,
+        description="Comma-separated tag names that events must have, needs use_gists=false",
+    ),
+    tag_values: str = Query(
+        None,
+        description="Comma-separated tag=value pairs that must match, needs use_gists=false",
+    ),
 ) -> res.UserEventGistsDataResponse |res.UserEventsDataResponse:
     project_id = request.state.memobase_project_id
-    
+    has_event_tag, event_tag_equal = parse_event_tag_filters(tags, tag_values)
+
     if use_gists:
+        if has_event_tag or event_tag_equal:
+            return Promise.reject(
+                CODE.BAD_REQUEST, "Tag filters need use_gists=false"
+            ).to_response(res.UserEventGistsDataResponse)
         p = await controllers.event_gist.search_user_event_gists(
             user_id, project_id, query, topk, similarity_threshold, time_range_in_days
         )
         return p.to_response(res.UserEventGistsDataResponse)
     else:
         p = await controllers.event.search_user_events(
-            user_id, project_id, query, topk, similarity_threshold, time_range_in_days
+            user_id,
+            project_id,
+            query,
+            topk,
+            similarity_threshold,
+            time_range_in_days,
+            has_event_tag,
+            event_tag_equal,
         )
         return p.to_response(res.UserEventsDataResponse)
 
@@ -108,19 +146,8 @@ async def search_user_events_by_tags(
     topk: int = Query(10, description="Number of events to retrieve, default is 10"),
 ) -> res.UserEventsDataResponse:
     project_id = request.state.memobase_project_id
-    
-    has_event_tag = None
-    if tags:
-        has_event_tag = [tag.strip() for tag in tags.split(",") if tag.strip()]
-    
-    event_tag_equal = None
-    if tag_values:
-        event_tag_equal = {}
-        for pair in tag_values.split(","):
-            if "=" in pair:
-                tag_name, tag_value = pair.split("=", 1)
-                event_tag_equal[tag_name.strip()] = tag_value.strip()
-    
+    has_event_tag, event_tag_equal = parse_event_tag_filters(tags, tag_values)
+
     p = await controllers.event.filter_user_events(
         user_id, project_id, has_event_tag, event_tag_equal, topk
     )
@@ -1,4 +1,5 @@
 import os
+import re
 import time
 import uuid
 import structlog
@@ -9,6 +10,7 @@ from fastapi.responses import JSONResponse
 from uvicorn.protocols.utils import get_path_with_query_string
 from ..env import ProjectStatus, LOG
 from ..models.database import DEFAULT_PROJECT_ID
+from ..connectors import ReadSession, mark_user_write
 from ..models.response import BaseResponse
 from ..models.utils import Promise
 from ..telemetry import (
@@ -25,6 +27,12 @@ from ..auth.token import (
 )
 
 
+UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+HEALTHCHECK_COUNTER = telemetry_manager.bind(CounterMetricName.HEALTHCHECK)
+
 PATH_MAPPINGS = [
     "/api/v1/admin/status_check",
     "/api/v1/users/blobs",
@@ -33,6 +41,7 @@ PATH_MAPPINGS = [
     "/api/v1/users/buffer",
     "/api/v1/users/event",
     "/api/v1/users/context",
+    "/api/v1/users/export",
     "/api/v1/users",
     "/api/v1/blobs/insert",
     "/api/v1/blobs",
@@ -43,6 +52,8 @@ async def global_wrapper_middleware(request: Request, call_next):
     req_id = request.headers.get("X-Request-ID")
     if req_id is None:
         req_id = str(uuid.uuid4())
+    # for the latency exemplars recorded by the outer AuthMiddleware
+    request.state.request_id = req_id
     project_id = getattr(request.state, "memobase_project_id", None)
     structlog.contextvars.clear_contextvars()
     structlog.contextvars.bind_contextvars(
@@ -117,10 +128,9 @@ class AuthMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
 
         if request.url.path.startswith("/api/v1/healthcheck"):
-            telemetry_manager.increment_counter_metric(
-                CounterMetricName.HEALTHCHECK,
-                1,
-            )
+            HEALTHCHECK_COUNTER.record()
+            return await call_next(request)
+        if request.url.path.startswith("/api/v1/readiness"):
             return await call_next(request)
 
         auth_token = request.headers.get("Authorization")
@@ -161,8 +171,19 @@ class AuthMiddleware(BaseHTTPMiddleware):
             },
         )
 
+        # the first id of a user API path is the user, mark it before and
+        # after the write so replica reads can't see the write half done
+        written_user = None
+        if ReadSession is not None and request.method not in READ_METHODS:
+            match = UUID_PATTERN.search(request.url.path)
+            written_user = match.group(0) if match else None
+        if written_user is not None:
+            await mark_user_write(request.state.memobase_project_id, written_user)
+
         start_time = time.time()
         response = await call_next(request)
+        if written_user is not None:
+            await mark_user_write(request.state.memobase_project_id, written_user)
 
         telemetry_manager.record_histogram_metric(
             HistogramMetricName.REQUEST_LATENCY_MS,
@@ -172,6 +193,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
                 "path": normalized_path,
                 "method": request.method,
             },
+            request_id=getattr(request.state, "request_id", None),
         )
         return response
 
@@ -53,7 +53,9 @@ async def get_user_profile(
         return Promise.reject(
             CODE.BAD_REQUEST, f"Invalid JSON requests: {e}"
         ).to_response(res.UserProfileResponse)
-    p = await controllers.profile.get_user_profiles(user_id, project_id)
+    p = await controllers.profile.get_user_profiles(
+        user_id, project_id, use_replica=True
+    )
     if not p.ok():
         return p.to_response(res.UserProfileResponse)
     total_profiles = p.data()
@@ -136,7 +138,7 @@ async def import_user_context(
     ),
 ) -> res.BaseResponse:
     project_id = request.state.memobase_project_id
-    p = await controllers.billing.get_project_billing(project_id)
+    p = await controllers.billing.check_project_quota(project_id)
     if not p.ok():
         return p.to_response(res.IdResponse)
     billing = p.data()
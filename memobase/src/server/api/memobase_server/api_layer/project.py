@@ -48,13 +48,16 @@ async def get_project_users(
     order_desc: bool = Query(True, description="Order descending or ascending"),
     limit: int = Query(10, description="Limit the number of results returned"),
     offset: int = Query(0, description="Offset the starting point for pagination"),
+    cursor: str = Query(
+        None, description="The `next_cursor` of the previous page, `offset` is ignored"
+    ),
 ) -> res.ProjectUsersDataResponse:
     """
     Get the users of a project in different orders
     """
     project_id = request.state.memobase_project_id
     users = await controllers.project.get_project_users(
-        project_id, search, limit, offset, order_by, order_desc
+        project_id, search, limit, offset, order_by, order_desc, cursor
     )
     return users.to_response(res.ProjectUsersDataResponse)
 
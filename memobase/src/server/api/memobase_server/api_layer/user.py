@@ -5,6 +5,8 @@ from ..models.blob import BlobType
 from ..models import response as res
 from fastapi import Request
 from fastapi import Path, Query, Body
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 
 async def create_user(
@@ -53,9 +55,29 @@ async def get_user_all_blobs(
     blob_type: BlobType = Path(..., description="The type of blobs to retrieve"),
     page: int = Query(0, description="Page number for pagination, starting from 0"),
     page_size: int = Query(10, description="Number of items per page, default is 10"),
+    cursor: str = Query(
+        None, description="The `next_cursor` of the previous page, `page` is ignored"
+    ),
 ) -> res.IdsResponse:
     project_id = request.state.memobase_project_id
     p = await controllers.user.get_user_all_blobs(
-        user_id, project_id, blob_type, page, page_size
+        user_id, project_id, blob_type, page, page_size, cursor
     )
     return p.to_response(res.IdsResponse)
+
+
+async def export_user(
+    request: Request,
+    user_id: UUID = Path(..., description="The ID of the user to export"),
+):
+    """Export the user, its blobs, profiles and events as newline-delimited JSON"""
+    project_id = request.state.memobase_project_id
+    p = await controllers.user.export_user(user_id, project_id)
+    if not p.ok():
+        return p.to_response(BaseResponse)
+    export = p.data()
+    return StreamingResponse(
+        export,
+        media_type="application/x-ndjson",
+        background=BackgroundTask(export.close),
+    )
@@ -1,15 +1,29 @@
 import os
+import time
 import asyncio
 import redis.exceptions as redis_exceptions
 import redis.asyncio as redis
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, text, event, Engine
+from sqlalchemy.orm import sessionmaker, Session as SessionType
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex, DropIndex
 from uuid import uuid4
-from .env import LOG
-from .models.database import REG, Project, UserEvent, UserEventGist
+from .env import LOG, CONFIG
+from .telemetry import telemetry_manager, GaugeMetricName, HistogramMetricName
+from .telemetry.open_telemetry import calling_module
+from .telemetry.flush_trace import record_db_statement
+from .models.database import (
+    REG,
+    Project,
+    UserEvent,
+    UserEventGist,
+    check_embedding_storage_supported,
+    migrate_user_counters,
+)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# optional read replica for read-only endpoints
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 REDIS_URL = os.getenv("REDIS_URL")
 PROJECT_ID = os.getenv("PROJECT_ID")
 ADMIN_URL = os.getenv("ADMIN_URL")
@@ -20,22 +34,70 @@ if PROJECT_ID is None:
     PROJECT_ID = "default"
 LOG.info(f"Project ID: {PROJECT_ID}")
 LOG.info(f"Database URL: {DATABASE_URL}")
+if DATABASE_READ_URL is not None:
+    LOG.info(f"Database read URL: {DATABASE_READ_URL}")
 LOG.info(f"Redis URL: {REDIS_URL}")
 
+
+
+def create_db_engine(url: str, name: str) -> Engine:
+    engine = create_engine(
+        url,
+        pool_size=75,  # Increased from 50 to handle more concurrent operations
+        max_overflow=50,  # Increased from 30 to provide more buffer
+        pool_recycle=300,  # Reduced from 600 to recycle connections more frequently
+        pool_pre_ping=True,  # Verify connections before using
+        pool_timeout=45,  # Increased from 30 seconds for better handling under load
+        pool_reset_on_return="commit",  # Clean state when connections are returned
+        echo_pool=False,  # Set to True for debugging pool issues
+    )
+    checked_out = telemetry_manager.bind(
+        GaugeMetricName.DB_POOL_CHECKED_OUT, {"engine": name}
+    )
+
+    @event.listens_for(engine.pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.record(engine.pool.checkedout())
+
+    @event.listens_for(engine.pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        # dispatched before the connection is returned to the pool
+        checked_out.record(engine.pool.checkedout() - 1)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def on_before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def on_after_execute(conn, cursor, statement, parameters, context, executemany):
+        latency_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        record_db_statement()
+        telemetry_manager.record_histogram_metric(
+            HistogramMetricName.DB_QUERY_LATENCY_MS,
+            latency_ms,
+            {"engine": name, "module": calling_module()},
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def on_execute_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    return engine
+
+
 # Create an engine
-DB_ENGINE = create_engine(
-    DATABASE_URL,
-    pool_size=75,  # Increased from 50 to handle more concurrent operations
-    max_overflow=50,  # Increased from 30 to provide more buffer
-    pool_recycle=300,  # Reduced from 600 to recycle connections more frequently
-    pool_pre_ping=True,  # Verify connections before using
-    pool_timeout=45,  # Increased from 30 seconds for better handling under load
-    pool_reset_on_return="commit",  # Ensure clean state when connections are returned
-    echo_pool=False,  # Set to True for debugging pool issues
+DB_ENGINE = create_db_engine(DATABASE_URL, "primary")
+DB_READ_ENGINE = (
+    create_db_engine(DATABASE_READ_URL, "replica")
+    if DATABASE_READ_URL is not None
+    else None
 )
 REDIS_POOL = None
 
 Session = sessionmaker(bind=DB_ENGINE)
+ReadSession = sessionmaker(bind=DB_READ_ENGINE) if DB_READ_ENGINE else None
 
 
 def create_pgvector_extension():
@@ -48,10 +110,74 @@ def create_pgvector_extension():
         LOG.error(f"Failed to create pgvector extension: {e}")
 
 
-def create_tables():
+def missing_indexes(conn) -> list:
+    """Indexes of the models that are not built, or left invalid by a failed build"""
+    valid = set(
+        conn.execute(
+            text(
+                """
+            SELECT pg_class.relname
+            FROM pg_index
+            JOIN pg_class ON pg_index.indexrelid = pg_class.oid
+            JOIN pg_namespace ON pg_class.relnamespace = pg_namespace.oid
+            WHERE pg_index.indisvalid
+            AND pg_namespace.nspname = current_schema();
+            """
+            )
+        ).scalars()
+    )
+    return [
+        index
+        for table in REG.metadata.sorted_tables
+        for index in table.indexes
+        if index.name not in valid
+    ]
+
+
+def create_indexes():
+    """Build the missing indexes concurrently, without locking out writes.
+
+    `CREATE INDEX CONCURRENTLY` can't run in a transaction, so each statement
+    is committed on its own.
+    """
+    with DB_ENGINE.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index in missing_indexes(conn):
+            options = index.dialect_options["postgresql"]
+            options["concurrently"] = True
+            try:
+                # a failed concurrent build leaves an invalid index behind
+                conn.execute(DropIndex(index, if_exists=True))
+                conn.execute(CreateIndex(index, if_not_exists=True))
+            finally:
+                options["concurrently"] = False
+            LOG.info(f"Index `{index.name}` created")
+
+
+def create_tables(build_indexes: bool = False):
+    """Create the missing tables, with their indexes.
+
+    `create_all` skips existing tables, indexes added to them since are built
+    with `build_indexes` by `python -m memobase_server.migrate`, and only
+    reported on server startup so workers don't race to build them.
+    """
     create_pgvector_extension()
+    with Session() as session:
+        check_embedding_storage_supported(session)
 
     REG.metadata.create_all(DB_ENGINE)
+    with Session() as session:
+        migrate_user_counters(session)
+        session.commit()
+    if build_indexes:
+        create_indexes()
+    else:
+        with DB_ENGINE.connect() as conn:
+            missing = [index.name for index in missing_indexes(conn)]
+        if missing:
+            LOG.warning(
+                f"Indexes {', '.join(missing)} are missing, "
+                "run `python -m memobase_server.migrate` to build them"
+            )
     with Session() as session:
         Project.initialize_root_project(session)
         UserEvent.check_legal_embedding_dim(session)
@@ -59,12 +185,9 @@ def create_tables():
     LOG.info("Database tables created successfully")
 
 
-create_tables()
-
-
-def db_health_check() -> bool:
+def db_health_check(engine: Engine = DB_ENGINE) -> bool:
     try:
-        conn = DB_ENGINE.connect()
+        conn = engine.connect()
     except OperationalError as e:
         LOG.error(f"Database connection failed: {e}")
         return False
@@ -86,6 +209,8 @@ async def redis_health_check() -> bool:
 
 async def close_connection():
     DB_ENGINE.dispose()
+    if DB_READ_ENGINE is not None:
+        DB_READ_ENGINE.dispose()
     if REDIS_POOL is not None:
         await REDIS_POOL.aclose()
     LOG.info("Connections closed")
@@ -96,16 +221,62 @@ def init_redis_pool():
     REDIS_POOL = redis.ConnectionPool.from_url(REDIS_URL, decode_responses=True)
 
 
+class TimedRedis(redis.Redis):
+    async def execute_command(self, *args, **options):
+        # the caller is only on the stack before the first await
+        module = calling_module()
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            telemetry_manager.record_histogram_metric(
+                HistogramMetricName.REDIS_LATENCY_MS,
+                (time.perf_counter() - start) * 1000,
+                {"command": str(args[0]), "module": module},
+            )
+
+
 def get_redis_client() -> redis.Redis:
     if REDIS_POOL is not None:
-        return redis.Redis(connection_pool=REDIS_POOL, decode_responses=True)
+        return TimedRedis(connection_pool=REDIS_POOL, decode_responses=True)
     else:
-        return redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        return TimedRedis.from_url(REDIS_URL, decode_responses=True)
+
+
+def get_recent_write_key(project_id: str, user_id: str) -> str:
+    return f"memobase:recent_write:{PROJECT_ID}:{project_id}:{user_id}"
+
+
+async def mark_user_write(project_id: str, user_id: str):
+    """Keep the user's reads on the primary until the replica has the write"""
+    if ReadSession is None:
+        return
+    async with get_redis_client() as redis_client:
+        await redis_client.set(
+            get_recent_write_key(project_id, user_id),
+            "1",
+            ex=CONFIG.read_your_writes_window_s,
+        )
+
+
+async def read_session(project_id: str, user_id: str = None) -> SessionType:
+    """Session for read-only queries, on the replica unless the user wrote recently.
+
+    Without `user_id` the replica is always used, so project-wide reads can
+    miss writes of the last `read_your_writes_window_s`.
+    """
+    if ReadSession is None:
+        return Session()
+    if user_id is not None:
+        async with get_redis_client() as redis_client:
+            if await redis_client.exists(get_recent_write_key(project_id, user_id)):
+                return Session()
+    return ReadSession()
 
 
-def get_pool_status() -> dict:
+def get_pool_status(engine: Engine = DB_ENGINE) -> dict:
     """Get current connection pool status for monitoring."""
-    pool = DB_ENGINE.pool
+    pool = engine.pool
     return {
         "size": pool.size(),
         "checked_in": pool.checkedin(),
@@ -130,7 +301,7 @@ def log_pool_status(operation: str = "unknown"):
             f"({status['utilization_percent']}%) - "
             f"Available: {status['checked_in']}, Overflow: {status['overflow']}"
         )
-    LOG.info(f"[DB pool status] {operation}: {status}")
+    LOG.debug(f"[DB pool status] {operation}: {status}")
 
 
 if __name__ == "__main__":
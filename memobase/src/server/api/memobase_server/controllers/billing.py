@@ -1,3 +1,6 @@
+import time
+import asyncio
+from typing import Optional
 from pydantic import ValidationError
 from ..models.utils import Promise
 from ..models.database import (
@@ -9,6 +12,8 @@ from ..models.response import CODE, IdData, IdsData, UserProfilesData, BillingDa
 from ..connectors import Session, ADMIN_URL
 from ..telemetry.capture_key import get_int_key, capture_int_key
 from ..env import (
+    CONFIG,
+    LOG,
     TelemetryKeyName,
     USAGE_TOKEN_LIMIT_MAP,
     BILLING_REFILL_AMOUNT_MAP,
@@ -105,9 +110,96 @@ async def fallback_billing_data(project_id: str) -> Promise[BillingData]:
     )
 
 
+class ProjectAllowance:
+    """Last billing read of a project, minus the tokens this process spent since"""
+
+    def __init__(self, billing: BillingData):
+        self.billing = billing
+        self.spent = 0
+        self.reconciled_at = time.monotonic()
+        self.refresh: Optional[asyncio.Task] = None
+
+    def estimate(self) -> BillingData:
+        token_left = self.billing.token_left
+        return BillingData(
+            token_left=None if token_left is None else token_left - self.spent,
+            next_refill_at=self.billing.next_refill_at,
+            project_token_cost_month=self.billing.project_token_cost_month
+            + self.spent,
+        )
+
+    def near_limit(self) -> bool:
+        # other workers spend too, keep a margin for what this one can't see
+        token_left = self.estimate().token_left
+        return (
+            token_left is not None and token_left < CONFIG.billing_gate_margin_tokens
+        )
+
+
+PROJECT_ALLOWANCES: dict[str, ProjectAllowance] = {}
+
+
+async def reconcile_project_allowance(project_id: str) -> Promise[ProjectAllowance]:
+    allowance = PROJECT_ALLOWANCES.get(project_id)
+    spent = allowance.spent if allowance is not None else 0
+    p = await get_project_billing(project_id)
+    if not p.ok():
+        return p
+    allowance = PROJECT_ALLOWANCES.get(project_id)
+    if allowance is None:
+        allowance = PROJECT_ALLOWANCES[project_id] = ProjectAllowance(p.data())
+    else:
+        # tokens spent during the read may be counted twice until the next one
+        allowance.billing = p.data()
+        allowance.spent -= spent
+        allowance.reconciled_at = time.monotonic()
+    return Promise.resolve(allowance)
+
+
+async def refresh_project_allowance(project_id: str):
+    try:
+        p = await reconcile_project_allowance(project_id)
+        if not p.ok():
+            LOG.warning(f"Failed to refresh billing of {project_id}: {p.msg()}")
+    except Exception as e:
+        LOG.warning(f"Failed to refresh billing of {project_id}: {e}")
+
+
+async def check_project_quota(project_id: str) -> Promise[BillingData]:
+    """Billing of the project for the insert gate.
+
+    Estimated from the local allowance, which is reconciled in the background
+    every `billing_gate_refresh_s`. Reads the billing first when there is no
+    allowance yet or it is within `billing_gate_margin_tokens` of the limit.
+    """
+    allowance = PROJECT_ALLOWANCES.get(project_id)
+    if (
+        CONFIG.billing_gate_refresh_s <= 0
+        or allowance is None
+        or allowance.near_limit()
+    ):
+        p = await reconcile_project_allowance(project_id)
+        if not p.ok():
+            return p
+        allowance = p.data()
+    elif time.monotonic() - allowance.reconciled_at > CONFIG.billing_gate_refresh_s:
+        if allowance.refresh is None or allowance.refresh.done():
+            allowance.refresh = asyncio.create_task(
+                refresh_project_allowance(project_id)
+            )
+    return Promise.resolve(allowance.estimate())
+
+
+def spend_project_allowance(project_id: str, tokens: int):
+    allowance = PROJECT_ALLOWANCES.get(project_id)
+    if allowance is not None:
+        allowance.spent += tokens
+
+
 async def project_cost_token_billing(
     project_id: str, input_tokens: int, output_tokens: int
 ) -> Promise[None]:
+    spend_project_allowance(project_id, input_tokens + output_tokens)
     await capture_int_key(
         TelemetryKeyName.llm_input_tokens, input_tokens, project_id=project_id
     )
@@ -1,3 +1,4 @@
+import asyncio
 from sqlalchemy import func
 from pydantic import BaseModel
 from ..env import CONFIG, BufferStatus, TRACE_LOG
@@ -9,7 +10,7 @@ from ..models.utils import Promise
 from ..models.response import CODE, ChatModalResponse, IdsData
 from ..models.database import BufferZone, GeneralBlob
 from ..models.blob import BlobType, Blob
-from ..connectors import Session, log_pool_status
+from ..connectors import Session, log_pool_status, mark_user_write
 from .modal import BLOBS_PROCESS
 
 
@@ -114,6 +115,23 @@ async def get_unprocessed_buffer_ids(
         return Promise.resolve(IdsData(ids=[row.id for row in buffer_ids]))
 
 
+class FlushFlight:
+    """The in-flight flush of one (project, user, blob_type) and the next one.
+
+    Requests for buffers the running job already covers await its result,
+    other buffers are merged into a single follow-up job per select status.
+    """
+
+    def __init__(self):
+        self.running_ids: set[str] = set()
+        self.running: asyncio.Future | None = None
+        self.pending: dict[str, tuple[set[str], asyncio.Future]] = {}
+        self.task: asyncio.Task | None = None
+
+
+FLUSH_FLIGHTS: dict[tuple[str, str, str], FlushFlight] = {}
+
+
 async def flush_buffer_by_ids(
     user_id: str,
     project_id: str,
@@ -121,7 +139,73 @@ async def flush_buffer_by_ids(
     buffer_ids: list[str],
     select_status: str = BufferStatus.idle,
 ) -> Promise[ChatModalResponse | None]:
-    # FIXME: parallel calling will cause duplicated flush
+    """Flush the buffers, coalescing with concurrent flushes of the same user"""
+    if blob_type not in BLOBS_PROCESS:
+        return Promise.reject(CODE.BAD_REQUEST, f"Blob type {blob_type} not supported")
+    if not len(buffer_ids):
+        return Promise.resolve(None)
+
+    key = (project_id, str(user_id), str(blob_type))
+    flight = FLUSH_FLIGHTS.get(key)
+    if flight is None:
+        flight = FLUSH_FLIGHTS[key] = FlushFlight()
+        flight.task = asyncio.create_task(
+            drive_flush_flight(key, flight, user_id, blob_type)
+        )
+
+    buffer_ids = {str(bid) for bid in buffer_ids}
+    if flight.running is not None and buffer_ids <= flight.running_ids:
+        TRACE_LOG.debug(project_id, user_id, f"Join in-flight {blob_type} flush")
+        # shield: a cancelled caller must not cancel the flush for everyone
+        return await asyncio.shield(flight.running)
+    new_ids = buffer_ids - flight.running_ids
+    if select_status not in flight.pending:
+        flight.pending[select_status] = (
+            set(),
+            asyncio.get_running_loop().create_future(),
+        )
+    pending_ids, future = flight.pending[select_status]
+    pending_ids.update(new_ids)
+    return await asyncio.shield(future)
+
+
+async def drive_flush_flight(
+    key: tuple[str, str, str], flight: FlushFlight, user_id: str, blob_type: BlobType
+):
+    project_id = key[0]
+    try:
+        # let the callers of this loop iteration join the first job
+        await asyncio.sleep(0)
+        while flight.pending:
+            select_status = next(iter(flight.pending))
+            ids, future = flight.pending.pop(select_status)
+            flight.running_ids, flight.running = ids, future
+            try:
+                # covers the flush too, so reads of half-written results stay
+                # on the primary and never land in the profile cache
+                await mark_user_write(project_id, user_id)
+                p = await _flush_buffer_by_ids(
+                    user_id, project_id, blob_type, list(ids), select_status
+                )
+                await mark_user_write(project_id, user_id)
+                future.set_result(p)
+            except Exception as e:
+                future.set_exception(e)
+    finally:
+        FLUSH_FLIGHTS.pop(key, None)
+        futures = [flight.running] + [f for _, f in flight.pending.values()]
+        for future in futures:
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("Flush coordinator stopped"))
+
+
+async def _flush_buffer_by_ids(
+    user_id: str,
+    project_id: str,
+    blob_type: BlobType,
+    buffer_ids: list[str],
+    select_status: str = BufferStatus.idle,
+) -> Promise[ChatModalResponse | None]:
     if blob_type not in BLOBS_PROCESS:
         return Promise.reject(CODE.BAD_REQUEST, f"Blob type {blob_type} not supported")
     if not len(buffer_ids):
@@ -152,6 +236,9 @@ async def flush_buffer_by_ids(
                 BufferZone.id.in_(buffer_ids),
             )
             .order_by(BufferZone.created_at)
+            # another worker flushing the same buffers keeps them locked until
+            # they are marked processing, skip them instead of flushing twice
+            .with_for_update(of=BufferZone, skip_locked=True)
             .all()
         )
         # Update buffer status to processing
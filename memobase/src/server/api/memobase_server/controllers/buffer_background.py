@@ -57,6 +57,7 @@ async def flush_buffer_by_ids_in_background(
                 BufferZone.id.in_(buffer_ids),
             )
             .order_by(BufferZone.created_at)
+            .with_for_update(skip_locked=True)
             .all()
         )
         actual_buffer_ids = [row.id for row in buffer_blob_data]
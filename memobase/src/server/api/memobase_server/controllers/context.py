@@ -13,6 +13,7 @@ from .event_gist import (
     get_user_event_gists,
     truncate_event_gists,
     search_user_event_gists,
+    get_event_search_mode,
 )
 
 
@@ -40,7 +41,7 @@ async def get_user_profiles_data(
     full_profile_and_only_search_event: bool,
 ) -> Promise[tuple[str, list]]:
     """Retrieve and process user profiles."""
-    p = await get_user_profiles(user_id, project_id)
+    p = await get_user_profiles(user_id, project_id, use_replica=True)
     if not p.ok():
         return p
     total_profiles = p.data()
@@ -92,24 +93,41 @@ async def get_user_event_gists_data(
     time_range_in_days: int,
 ) -> Promise[UserEventGistsData]:
     """Retrieve user events data."""
-    if chats and CONFIG.enable_event_embedding:
-        search_query = pack_latest_chat(chats)
-        p = await search_user_event_gists(
+    if not chats:
+        return await get_user_event_gists(
             user_id,
             project_id,
-            query=search_query,
             topk=60,
-            similarity_threshold=event_similarity_threshold,
             time_range_in_days=time_range_in_days,
         )
-    else:
-        p = await get_user_event_gists(
-            user_id,
-            project_id,
-            topk=60,
-            time_range_in_days=time_range_in_days,
-        )
-    return p
+    search_query = pack_latest_chat(chats)
+    p = await search_user_event_gists(
+        user_id,
+        project_id,
+        query=search_query,
+        topk=60,
+        similarity_threshold=event_similarity_threshold,
+        time_range_in_days=time_range_in_days,
+    )
+    if not p.ok() or get_event_search_mode() != "lexical":
+        return p
+    # full-text search only finds shared words, fill up with the latest gists
+    searched = p.data()
+    p = await get_user_event_gists(
+        user_id,
+        project_id,
+        topk=60,
+        time_range_in_days=time_range_in_days,
+    )
+    if not p.ok():
+        return p
+    searched_ids = {g.id for g in searched.gists}
+    for g in p.data().gists:
+        if len(searched.gists) >= 60:
+            break
+        if g.id not in searched_ids:
+            searched.gists.append(g)
+    return Promise.resolve(searched)
 
 
 async def get_user_context(
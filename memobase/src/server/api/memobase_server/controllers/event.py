@@ -1,13 +1,15 @@
 from pydantic import ValidationError
-from ..models.database import UserEvent, UserEventGist
+from ..models.database import User, UserEvent, UserEventGist, EVENT_TAGS_JSONB
 from ..models.response import UserEventData, UserEventsData, EventData
 from ..models.utils import Promise, CODE
 from ..connectors import Session
 from ..utils import get_encoded_tokens, event_str_repr, event_embedding_str
 
 from ..llms.embeddings import get_embedding
+from ..telemetry.flush_trace import trace_stage
 from datetime import timedelta
-from sqlalchemy import desc, select
+from sqlalchemy import desc, select, literal_column, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from ..env import TRACE_LOG, CONFIG
 
@@ -83,12 +85,13 @@ async def append_user_event(
 
     if CONFIG.enable_event_embedding:
         event_data_str = event_embedding_str(validated_event)
-        embedding = await get_embedding(
-            project_id,
-            [event_data_str],
-            phase="document",
-            model=CONFIG.embedding_model,
-        )
+        with trace_stage("event_embedding"):
+            embedding = await get_embedding(
+                project_id,
+                [event_data_str],
+                phase="document",
+                model=CONFIG.embedding_model,
+            )
         if not embedding.ok():
             TRACE_LOG.error(
                 project_id,
@@ -159,6 +162,7 @@ async def append_user_event(
                     embedding=event_gist_data["embedding"],
                 )
             )
+        User.adjust_counters(session, user_id, project_id, events=1)
         session.commit()
         eid = user_event.id
     return Promise.resolve(eid)
@@ -179,6 +183,7 @@ async def delete_user_event(
                 f"User event {event_id} not found",
             )
         session.delete(user_event)
+        User.adjust_counters(session, user_id, project_id, events=-1)
         session.commit()
     return Promise.resolve(None)
 
@@ -213,6 +218,23 @@ async def update_user_event(
     return Promise.resolve(None)
 
 
+def event_tags_filter(
+    has_event_tag: list[str] = None, event_tag_equal: dict[str, str] = None
+):
+    """One containment test for all tag filters, served by the event tags index.
+
+    Returns None without any tag filter.
+    """
+    tags = [{"tag": tag_name} for tag_name in has_event_tag or []]
+    tags += [
+        {"tag": tag_name, "value": tag_value}
+        for tag_name, tag_value in (event_tag_equal or {}).items()
+    ]
+    if not tags:
+        return None
+    return literal_column(EVENT_TAGS_JSONB, JSONB).op("@>")(type_coerce(tags, JSONB))
+
+
 async def search_user_events(
     user_id: str,
     project_id: str,
@@ -220,6 +242,8 @@ async def search_user_events(
     topk: int = 10,
     similarity_threshold: float = 0.2,
     time_range_in_days: int = 21,
+    has_event_tag: list[str] = None,
+    event_tag_equal: dict[str, str] = None,
 ) -> Promise[UserEventsData]:
     if not CONFIG.enable_event_embedding:
         TRACE_LOG.warning(
@@ -260,6 +284,9 @@ async def search_user_events(
         .order_by(desc("similarity"))
         .limit(topk)
     )
+    tags_filter = event_tags_filter(has_event_tag, event_tag_equal)
+    if tags_filter is not None:
+        stmt = stmt.where(tags_filter)
 
     with Session() as session:
         # Use .all() instead of .scalars().all() to get both columns
@@ -314,31 +341,9 @@ async def filter_user_events(
             user_id=user_id, project_id=project_id
         )
 
-        # Apply tag filters if provided
-        if has_event_tag or event_tag_equal:
-            # Build filter conditions for events that have event_tags
-            query = query.filter(UserEvent.event_data.has_key("event_tags"))
-            query = query.filter(UserEvent.event_data["event_tags"].isnot(None))
-
-            # Filter by tag existence (has_event_tag)
-            if has_event_tag:
-                for tag_name in has_event_tag:
-                    # Check if any event_tag in the array has the specified tag name
-                    query = query.filter(
-                        UserEvent.event_data["event_tags"].op("@>")(
-                            f'[{{"tag": "{tag_name}"}}]'
-                        )
-                    )
-
-            # Filter by exact tag-value pairs (event_tag_equal)
-            if event_tag_equal:
-                for tag_name, tag_value in event_tag_equal.items():
-                    # Check if any event_tag in the array has both the tag name and value
-                    query = query.filter(
-                        UserEvent.event_data["event_tags"].op("@>")(
-                            f'[{{"tag": "{tag_name}", "value": "{tag_value}"}}]'
-                        )
-                    )
+        tags_filter = event_tags_filter(has_event_tag, event_tag_equal)
+        if tags_filter is not None:
+            query = query.filter(tags_filter)
 
         user_events = query.order_by(UserEvent.created_at.desc()).limit(topk).all()
 
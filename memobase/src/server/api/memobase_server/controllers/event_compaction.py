@@ -0,0 +1,318 @@
+import asyncio
+import traceback
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, delete, text
+from sqlalchemy.orm import Session as SessionType
+from ..env import CONFIG, LOG, TRACE_LOG
+from ..models.database import (
+    User,
+    UserEvent,
+    UserEventGist,
+    UserEventArchive,
+    UserEventGistArchive,
+)
+from ..models.utils import Promise
+from ..connectors import Session, PROJECT_ID, get_redis_client
+from ..llms.embeddings import get_embedding
+from ..telemetry import telemetry_manager, GaugeMetricName
+from ..utils import truncate_string
+
+# summary events carry this key in `event_data`, so they are never compacted again
+COMPACTION_KEY = "compaction"
+# a Monday, so 7-day periods are calendar weeks
+PERIOD_EPOCH = datetime(1970, 1, 5, tzinfo=timezone.utc)
+EVENT_TABLES = [
+    UserEvent.__tablename__,
+    UserEventGist.__tablename__,
+    UserEventArchive.__tablename__,
+    UserEventGistArchive.__tablename__,
+]
+
+
+def get_compaction_lock_key() -> str:
+    return f"memobase:event_compaction_lock:{PROJECT_ID}"
+
+
+def period_of(created_at: datetime, period_days: int) -> tuple[datetime, datetime]:
+    period = timedelta(days=period_days)
+    start = PERIOD_EPOCH + (created_at - PERIOD_EPOCH) // period * period
+    return start, start + period
+
+
+def ensure_month_partitions(
+    session: SessionType, table_name: str, timestamps: list[datetime]
+):
+    utc_timestamps = [t.astimezone(timezone.utc) for t in timestamps]
+    for year, month in sorted({(t.year, t.month) for t in utc_timestamps}):
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+        session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {table_name}_{year}{month:02d} "
+                f"PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+
+
+def event_table_sizes() -> dict[str, int]:
+    with Session() as session:
+        sizes = {
+            # archive tables are partitioned, sum up their partitions
+            table: int(
+                session.execute(
+                    text(
+                        "SELECT COALESCE("
+                        "(SELECT SUM(pg_total_relation_size(relid)) "
+                        "FROM pg_partition_tree(CAST(:table AS regclass))), "
+                        "pg_total_relation_size(CAST(:table AS regclass)))"
+                    ),
+                    {"table": table},
+                ).scalar()
+            )
+            for table in EVENT_TABLES
+        }
+    for table, size in sizes.items():
+        telemetry_manager.set_gauge_metric(
+            GaugeMetricName.EVENT_TABLE_SIZE_BYTES, size, {"table": table}
+        )
+    return sizes
+
+
+def pack_period_summaries(gists: list, period_days: int) -> list[dict]:
+    periods: dict[datetime, dict] = {}
+    for gist_data, created_at in gists:
+        start, end = period_of(created_at, period_days)
+        summary = periods.setdefault(
+            start, {"start": start, "end": end, "last": created_at, "lines": []}
+        )
+        summary["last"] = max(summary["last"], created_at)
+        line = (gist_data or {}).get("content", "").strip()
+        if line and line not in summary["lines"]:
+            summary["lines"].append(line)
+    return [s for s in periods.values() if s["lines"]]
+
+
+async def compact_user_events(
+    user_id: str, project_id: str, cutoff: datetime
+) -> Promise[dict]:
+    """Roll the user's events before `cutoff` into one summary event per period,
+    then move the original events and gists to the archive tables."""
+    with Session() as session:
+        cold_events = session.execute(
+            select(UserEvent.id, UserEvent.created_at)
+            .where(
+                UserEvent.user_id == user_id,
+                UserEvent.project_id == project_id,
+                UserEvent.created_at < cutoff,
+                ~UserEvent.event_data.has_key(COMPACTION_KEY),
+            )
+            .order_by(UserEvent.created_at)
+        ).all()
+        event_ids = [row.id for row in cold_events]
+        if not event_ids:
+            return Promise.resolve({"events": 0, "gists": 0, "summaries": 0})
+        cold_gists = session.execute(
+            select(UserEventGist.gist_data, UserEventGist.created_at)
+            .where(
+                UserEventGist.project_id == project_id,
+                UserEventGist.event_id.in_(event_ids),
+            )
+            .order_by(UserEventGist.created_at)
+        ).all()
+
+    summaries = pack_period_summaries(cold_gists, CONFIG.event_compaction_period_days)
+    for s in summaries:
+        s["gist"] = (
+            f"- [{s['start']:%Y/%m/%d} ~ {s['end'] - timedelta(days=1):%Y/%m/%d}] "
+            + "; ".join(line.lstrip("- ") for line in s["lines"])
+        )
+        s["embedding"] = None
+    if CONFIG.enable_event_embedding and summaries:
+        embeddings = await get_embedding(
+            project_id,
+            [
+                truncate_string(s["gist"], CONFIG.embedding_max_token_size)
+                for s in summaries
+            ],
+            phase="document",
+            model=CONFIG.embedding_model,
+        )
+        if embeddings.ok():
+            for s, e in zip(summaries, embeddings.data()):
+                s["embedding"] = e
+        else:
+            TRACE_LOG.error(
+                project_id,
+                user_id,
+                f"Failed to embed compacted events: {embeddings.msg()}",
+            )
+
+    with Session() as session:
+        ensure_month_partitions(
+            session,
+            UserEventArchive.__tablename__,
+            [row.created_at for row in cold_events],
+        )
+        ensure_month_partitions(
+            session,
+            UserEventGistArchive.__tablename__,
+            [row.created_at for row in cold_gists],
+        )
+        for s in summaries:
+            summary_event = UserEvent(
+                user_id=user_id,
+                project_id=project_id,
+                event_data={
+                    "profile_delta": [],
+                    "event_tip": "\n".join(s["lines"]),
+                    "event_tags": None,
+                    COMPACTION_KEY: {
+                        "period_start": s["start"].isoformat(),
+                        "period_end": s["end"].isoformat(),
+                        "gists": len(s["lines"]),
+                    },
+                },
+                embedding=s["embedding"],
+            )
+            # keep the summary where its period is in the timeline
+            summary_event.created_at = s["last"]
+            session.add(summary_event)
+            summary_gist = UserEventGist(
+                user_id=user_id,
+                project_id=project_id,
+                event_id=summary_event.id,
+                gist_data={"content": s["gist"]},
+                embedding=s["embedding"],
+            )
+            summary_gist.created_at = s["last"]
+            session.add(summary_gist)
+        session.flush()
+
+        gist_columns = [
+            "id",
+            "project_id",
+            "user_id",
+            "event_id",
+            "gist_data",
+            "created_at",
+            "updated_at",
+        ]
+        session.execute(
+            insert(UserEventGistArchive).from_select(
+                gist_columns,
+                select(*[getattr(UserEventGist, c) for c in gist_columns]).where(
+                    UserEventGist.project_id == project_id,
+                    UserEventGist.event_id.in_(event_ids),
+                ),
+            )
+        )
+        moved_gists = session.execute(
+            delete(UserEventGist).where(
+                UserEventGist.project_id == project_id,
+                UserEventGist.event_id.in_(event_ids),
+            )
+        ).rowcount
+        event_columns = [
+            "id",
+            "project_id",
+            "user_id",
+            "event_data",
+            "created_at",
+            "updated_at",
+        ]
+        session.execute(
+            insert(UserEventArchive).from_select(
+                event_columns,
+                select(*[getattr(UserEvent, c) for c in event_columns]).where(
+                    UserEvent.project_id == project_id,
+                    UserEvent.id.in_(event_ids),
+                ),
+            )
+        )
+        moved_events = session.execute(
+            delete(UserEvent).where(
+                UserEvent.project_id == project_id,
+                UserEvent.id.in_(event_ids),
+            )
+        ).rowcount
+        User.adjust_counters(
+            session, user_id, project_id, events=len(summaries) - moved_events
+        )
+        session.commit()
+
+    TRACE_LOG.info(
+        project_id,
+        user_id,
+        f"Compacted {moved_events} events and {moved_gists} gists into {len(summaries)} summaries",
+    )
+    return Promise.resolve(
+        {"events": moved_events, "gists": moved_gists, "summaries": len(summaries)}
+    )
+
+
+async def compact_events(
+    project_id: str | None = None, hot_retention_days: int | None = None
+) -> Promise[dict]:
+    hot_retention_days = hot_retention_days or CONFIG.event_hot_retention_days
+    if hot_retention_days is None:
+        return Promise.resolve({"users": 0, "events": 0, "gists": 0, "summaries": 0})
+    cutoff = datetime.now(timezone.utc) - timedelta(days=hot_retention_days)
+
+    sizes_before = event_table_sizes()
+    with Session() as session:
+        query = (
+            select(UserEvent.project_id, UserEvent.user_id)
+            .where(
+                UserEvent.created_at < cutoff,
+                ~UserEvent.event_data.has_key(COMPACTION_KEY),
+            )
+            .distinct()
+        )
+        if project_id is not None:
+            query = query.where(UserEvent.project_id == project_id)
+        users = session.execute(query).all()
+
+    total = {"users": 0, "events": 0, "gists": 0, "summaries": 0}
+    for row in users:
+        try:
+            p = await compact_user_events(row.user_id, row.project_id, cutoff)
+        except Exception as e:
+            TRACE_LOG.error(
+                row.project_id,
+                row.user_id,
+                f"Failed to compact events: {e}\n{traceback.format_exc()}",
+            )
+            continue
+        if not p.ok():
+            continue
+        total["users"] += 1
+        for key, value in p.data().items():
+            total[key] += value
+
+    sizes_after = event_table_sizes()
+    LOG.info(
+        f"Event compaction: {total}, table sizes before {sizes_before}, after {sizes_after}"
+    )
+    return Promise.resolve(
+        {**total, "sizes_before": sizes_before, "sizes_after": sizes_after}
+    )
+
+
+async def run_event_compaction_periodically():
+    """Run `compact_events` on one worker per `event_compaction_interval_s`"""
+    while True:
+        try:
+            async with get_redis_client() as redis_client:
+                # never released, the expiry spaces the runs across all workers
+                acquired = await redis_client.set(
+                    get_compaction_lock_key(),
+                    "1",
+                    nx=True,
+                    ex=CONFIG.event_compaction_interval_s,
+                )
+            if acquired:
+                await compact_events()
+        except Exception as e:
+            LOG.error(f"Event compaction failed: {e}\n{traceback.format_exc()}")
+        await asyncio.sleep(CONFIG.event_compaction_interval_s)
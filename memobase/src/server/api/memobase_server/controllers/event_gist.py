@@ -1,16 +1,21 @@
+import re
 from pydantic import ValidationError
-from ..models.database import UserEventGist
+from ..models.database import UserEventGist, GIST_CONTENT_TSVECTOR
 from ..models.response import UserEventGistsData, UserEventGistData
-from ..models.utils import Promise, CODE
-from ..connectors import Session
+from ..models.utils import Promise
+from ..connectors import read_session
 from ..utils import get_encoded_tokens, event_str_repr, event_embedding_str
 
 from ..llms.embeddings import get_embedding
 from datetime import timedelta
-from sqlalchemy import desc, select
+from sqlalchemy import desc, select, literal_column
+from sqlalchemy.orm import Session as SessionType
 from sqlalchemy.sql import func
 from ..env import TRACE_LOG, CONFIG
 
+# rank offset of reciprocal rank fusion, from Cormack et al. 2009
+RRF_K = 60
+
 
 async def get_user_event_gists(
     user_id: str,
@@ -18,7 +23,7 @@ async def get_user_event_gists(
     topk: int = 10,
     time_range_in_days: int = 21,
 ) -> Promise[UserEventGistsData]:
-    with Session() as session:
+    with await read_session(project_id, user_id) as session:
         query = (
             session.query(UserEventGist)
             .filter_by(user_id=user_id, project_id=project_id)
@@ -62,42 +67,65 @@ async def truncate_event_gists(
     return Promise.resolve(events)
 
 
-async def search_user_event_gists(
+def get_event_search_mode() -> str:
+    if not CONFIG.enable_event_embedding:
+        return "lexical"
+    return CONFIG.event_search_mode
+
+
+def pack_tsquery(query: str, max_terms: int = 64) -> str:
+    # OR the terms, a chat rarely shares all its words with one gist
+    terms = list(dict.fromkeys(re.findall(r"[^\W_]+", query.lower())))
+    return " | ".join(terms[:max_terms])
+
+
+def reciprocal_rank_fusion(rankings: list[list], k: int = RRF_K) -> list:
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0) + 1 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def lexical_gist_candidates(
+    session: SessionType,
     user_id: str,
     project_id: str,
     query: str,
-    topk: int = 10,
-    similarity_threshold: float = 0.2,
-    time_range_in_days: int = 21,
-) -> Promise[UserEventGistsData]:
-    if not CONFIG.enable_event_embedding:
-        TRACE_LOG.warning(
-            project_id,
-            user_id,
-            "Event embedding is not enabled, skip search",
-        )
-        return Promise.reject(
-            CODE.NOT_IMPLEMENTED,
-            "Event embedding is not enabled",
+    limit: int,
+    time_cutoff,
+) -> list[tuple[UserEventGist, float]]:
+    tsquery = pack_tsquery(query)
+    if not tsquery:
+        return []
+    tsquery_expr = func.to_tsquery(literal_column("'english'::regconfig"), tsquery)
+    tsvector_expr = literal_column(GIST_CONTENT_TSVECTOR)
+    rank_expr = func.ts_rank(tsvector_expr, tsquery_expr)
+    stmt = (
+        select(UserEventGist, rank_expr.label("rank"))
+        .where(
+            UserEventGist.user_id == user_id,
+            UserEventGist.project_id == project_id,
+            UserEventGist.created_at > time_cutoff,
+            tsvector_expr.op("@@")(tsquery_expr),
         )
-    query_embeddings = await get_embedding(
-        project_id, [query], phase="query", model=CONFIG.embedding_model
+        .order_by(desc("rank"))
+        .limit(limit)
     )
-    if not query_embeddings.ok():
-        TRACE_LOG.error(
-            project_id,
-            user_id,
-            f"Failed to get embeddings: {query_embeddings.msg()}",
-        )
-        return query_embeddings
-    query_embedding = query_embeddings.data()[0]
+    return [tuple(row) for row in session.execute(stmt).all()]
 
-    # Calculate the time cutoff once
-    time_cutoff = func.now() - timedelta(days=time_range_in_days)
 
+def vector_gist_candidates(
+    session: SessionType,
+    user_id: str,
+    project_id: str,
+    query_embedding,
+    similarity_threshold: float,
+    limit: int,
+    time_cutoff,
+) -> list[tuple[UserEventGist, float]]:
     # Store the similarity expression to avoid recomputation
     similarity_expr = 1 - UserEventGist.embedding.cosine_distance(query_embedding)
-
     stmt = (
         select(
             UserEventGist,
@@ -111,23 +139,78 @@ async def search_user_event_gists(
             UserEventGist.embedding.is_not(None),  # Skip null embeddings
         )
         .order_by(desc("similarity"))
-        .limit(topk)
+        .limit(limit)
     )
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+
+async def search_user_event_gists(
+    user_id: str,
+    project_id: str,
+    query: str,
+    topk: int = 10,
+    similarity_threshold: float = 0.2,
+    time_range_in_days: int = 21,
+) -> Promise[UserEventGistsData]:
+    """Rank the gists by full-text and/or vector search, see `event_search_mode`.
+
+    Hybrid search fuses both rankings with reciprocal rank fusion. `similarity`
+    is the cosine similarity, None for gists only found by full-text search.
+    """
+    search_mode = get_event_search_mode()
+    query_embedding = None
+    if search_mode != "lexical":
+        query_embeddings = await get_embedding(
+            project_id, [query], phase="query", model=CONFIG.embedding_model
+        )
+        if not query_embeddings.ok():
+            TRACE_LOG.error(
+                project_id,
+                user_id,
+                f"Failed to get embeddings: {query_embeddings.msg()}",
+            )
+            return query_embeddings
+        query_embedding = query_embeddings.data()[0]
+
+    # Calculate the time cutoff once
+    time_cutoff = func.now() - timedelta(days=time_range_in_days)
+    # fusion needs deeper rankings than the final topk
+    candidates = topk if search_mode == "vector" else topk * 2
+
+    with await read_session(project_id, user_id) as session:
+        rankings = []
+        gists: dict = {}
+        similarities: dict = {}
+        if search_mode != "vector":
+            lexical = lexical_gist_candidates(
+                session, user_id, project_id, query, candidates, time_cutoff
+            )
+            gists.update({g.id: g for g, _ in lexical})
+            rankings.append([g.id for g, _ in lexical])
+        if query_embedding is not None:
+            vector = vector_gist_candidates(
+                session,
+                user_id,
+                project_id,
+                query_embedding,
+                similarity_threshold,
+                candidates,
+                time_cutoff,
+            )
+            gists.update({g.id: g for g, _ in vector})
+            similarities.update({g.id: s for g, s in vector})
+            rankings.append([g.id for g, _ in vector])
 
-    with Session() as session:
-        # Use .all() instead of .scalars().all() to get both columns
-        result = session.execute(stmt).all()
         user_event_gists: list[UserEventGistData] = []
-        for row in result:
-            user_event: UserEventGist = row[0]  # UserEventGist object
-            similarity: float = row[1]  # similarity value
+        for gist_id in reciprocal_rank_fusion(rankings)[:topk]:
+            user_event = gists[gist_id]
             user_event_gists.append(
                 UserEventGistData(
                     id=user_event.id,
                     gist_data=user_event.gist_data,
                     created_at=user_event.created_at,
                     updated_at=user_event.updated_at,
-                    similarity=similarity,
+                    similarity=similarities.get(gist_id),
                 )
             )
 
@@ -136,7 +219,8 @@ async def search_user_event_gists(
         TRACE_LOG.info(
             project_id,
             user_id,
-            f"Event Query: {query}",
+            # the query is user content, keep the log line short
+            f"Event Query ({search_mode}): {query[:64]}, {len(user_event_gists)} hits",
         )
 
     return Promise.resolve(user_event_gists_data)
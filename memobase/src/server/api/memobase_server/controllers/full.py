@@ -8,3 +8,5 @@ from . import event
 from . import event_gist
 from . import context
 from . import billing
+from . import event_compaction
+from . import health
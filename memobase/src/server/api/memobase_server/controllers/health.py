@@ -0,0 +1,118 @@
+import time
+import asyncio
+import traceback
+from datetime import datetime, timezone
+from ..env import CONFIG, LOG
+from ..models.response import ProbeData, ReadinessData
+from ..connectors import (
+    DB_ENGINE,
+    DB_READ_ENGINE,
+    db_health_check,
+    redis_health_check,
+    get_pool_status,
+)
+from ..llms.embeddings import check_embedding_sanity
+from ..llms import llm_sanity_check
+
+# the last result of each probe in this process
+PROBES: dict[str, ProbeData] = {}
+
+
+async def check_db() -> bool:
+    return await asyncio.to_thread(db_health_check)
+
+
+async def check_read_db() -> bool:
+    return await asyncio.to_thread(db_health_check, DB_READ_ENGINE)
+
+
+async def check_provider(sanity_check) -> bool:
+    await sanity_check()
+    return True
+
+
+def infra_checks() -> dict:
+    checks = {"db": check_db, "redis": redis_health_check}
+    if DB_READ_ENGINE is not None:
+        checks["read_db"] = check_read_db
+    return checks
+
+
+def provider_checks() -> dict:
+    checks = {"llm": lambda: check_provider(llm_sanity_check)}
+    if CONFIG.enable_event_embedding:
+        checks["embedding"] = lambda: check_provider(check_embedding_sanity)
+    return checks
+
+
+async def probe(name: str, check) -> ProbeData:
+    start = time.perf_counter()
+    error = None
+    try:
+        ok = await asyncio.wait_for(check(), CONFIG.health_probe_timeout_s)
+        if not ok:
+            error = f"{name} not available"
+    except asyncio.TimeoutError:
+        ok, error = False, f"{name} probe timed out"
+    except Exception as e:
+        ok, error = False, str(e)
+    PROBES[name] = ProbeData(
+        ok=ok,
+        latency_ms=round((time.perf_counter() - start) * 1000, 2),
+        checked_at=datetime.now(timezone.utc),
+        error=error,
+    )
+    return PROBES[name]
+
+
+async def probe_all(checks: dict):
+    await asyncio.gather(*(probe(name, check) for name, check in checks.items()))
+
+
+async def run_health_probe_periodically():
+    """Probe DB and Redis every `health_probe_interval_s`, the providers less often"""
+    last_provider_probe = None
+    while True:
+        try:
+            checks = infra_checks()
+            interval = CONFIG.health_probe_providers_interval_s
+            if interval > 0 and (
+                last_provider_probe is None
+                or time.monotonic() - last_provider_probe >= interval
+            ):
+                checks.update(provider_checks())
+                last_provider_probe = time.monotonic()
+            await probe_all(checks)
+        except Exception as e:
+            LOG.error(f"Health probe failed: {e}\n{traceback.format_exc()}")
+        await asyncio.sleep(CONFIG.health_probe_interval_s)
+
+
+def is_stale(probe_data: ProbeData) -> bool:
+    age = (datetime.now(timezone.utc) - probe_data.checked_at).total_seconds()
+    return age > 3 * CONFIG.health_probe_interval_s
+
+
+async def get_liveness() -> dict[str, ProbeData]:
+    """The cached DB and Redis probes, probed now if the prober isn't running"""
+    checks = infra_checks()
+    if any(name not in PROBES or is_stale(PROBES[name]) for name in checks):
+        await probe_all(checks)
+    return {name: PROBES[name] for name in checks}
+
+
+async def get_readiness() -> ReadinessData:
+    """Ready if the DB and Redis probes pass.
+
+    Provider failures are reported without failing readiness, moving traffic
+    to another server doesn't fix them.
+    """
+    infra = await get_liveness()
+    return ReadinessData(
+        ready=all(probe_data.ok for probe_data in infra.values()),
+        probes=dict(PROBES),
+        db_pool=get_pool_status(DB_ENGINE),
+        read_db_pool=(
+            get_pool_status(DB_READ_ENGINE) if DB_READ_ENGINE is not None else None
+        ),
+    )
@@ -6,6 +6,7 @@ from ....utils import get_blob_str, get_encoded_tokens
 from ....models.blob import Blob
 from ....models.utils import Promise, CODE
 from ....models.response import IdsData, ChatModalResponse, UserProfilesData
+from ....telemetry.flush_trace import trace_flush, trace_stage
 from ...profile import add_update_delete_user_profiles
 from ...event import append_user_event
 from ...profile import get_user_profiles
@@ -18,6 +19,8 @@ from .organize import organize_profiles
 from .types import MergeAddResult
 from .event_summary import tag_event
 from .entry_summary import entry_chat_summary
+from .fast_extract import fast_extract, merge_new_memos_locally
+from .stream_extract import stream_extract_and_merge
 
 
 def truncate_chat_blobs(
@@ -37,6 +40,16 @@ def truncate_chat_blobs(
 
 async def process_blobs(
     user_id: str, project_id: str, blobs: list[Blob]
+) -> Promise[ChatModalResponse]:
+    async with trace_flush(user_id, project_id, "chat") as stages:
+        p = await process_blob_stages(user_id, project_id, blobs)
+    if p.ok():
+        p.data().stages = stages
+    return p
+
+
+async def process_blob_stages(
+    user_id: str, project_id: str, blobs: list[Blob]
 ) -> Promise[ChatModalResponse]:
     # 1. Extract patch profiles
     blobs = truncate_chat_blobs(blobs, CONFIG.max_chat_blob_buffer_process_token_size)
@@ -45,24 +58,28 @@ async def process_blobs(
             CODE.SERVER_PARSE_ERROR, "No blobs to process after truncating"
         )
 
-    p = await get_project_profile_config(project_id)
-    if not p.ok():
-        return p
-    project_profiles = p.data()
+    with trace_stage("load_profiles"):
+        p = await get_project_profile_config(project_id)
+        if not p.ok():
+            return p
+        project_profiles = p.data()
 
-    p = await get_user_profiles(user_id, project_id)
-    if not p.ok():
-        return p
-    current_user_profiles = p.data()
+        p = await get_user_profiles(user_id, project_id)
+        if not p.ok():
+            return p
+        current_user_profiles = p.data()
 
-    p = await entry_chat_summary(
-        user_id, project_id, blobs, project_profiles, current_user_profiles
-    )
+    if use_fast_process_mode(blobs, project_profiles):
+        p = await process_fast_res(
+            user_id, project_id, blobs, project_profiles, current_user_profiles
+        )
+    else:
+        p = await process_standard_res(
+            user_id, project_id, blobs, project_profiles, current_user_profiles
+        )
     if not p.ok():
         return p
-    user_memo_str = p.data().strip()
-
-    if not user_memo_str:
+    if p.data() is None:
         return Promise.resolve(
             ChatModalResponse(
                 event_id=None,
@@ -71,6 +88,59 @@ async def process_blobs(
                 delete_profiles=[],
             )
         )
+    user_memo_str, intermediate_profile, delta_profile_data, event_tags = p.data()
+
+    p = await handle_session_event(
+        user_id,
+        project_id,
+        user_memo_str,
+        delta_profile_data,
+        event_tags,
+        project_profiles,
+    )
+    if not p.ok():
+        return p
+    eid = p.data()
+
+    with trace_stage("handle_user_profile_db"):
+        p = await handle_user_profile_db(user_id, project_id, intermediate_profile)
+    if not p.ok():
+        return p
+    return Promise.resolve(
+        ChatModalResponse(
+            event_id=eid,
+            add_profiles=p.data().ids,
+            update_profiles=[up["profile_id"] for up in intermediate_profile["update"]],
+            delete_profiles=intermediate_profile["delete"],
+        )
+    )
+
+
+def use_fast_process_mode(blobs: list[Blob], project_profiles: ProfileConfig) -> bool:
+    process_mode = project_profiles.process_mode or CONFIG.process_mode
+    if process_mode != "fast":
+        return False
+    blob_token_size = sum(len(get_encoded_tokens(get_blob_str(b))) for b in blobs)
+    return blob_token_size <= CONFIG.fast_mode_max_token_size
+
+
+async def process_standard_res(
+    user_id: str,
+    project_id: str,
+    blobs: list[Blob],
+    project_profiles: ProfileConfig,
+    current_user_profiles: UserProfilesData,
+) -> Promise[tuple[str, MergeAddResult, list[dict], list | None] | None]:
+    with trace_stage("entry_chat_summary"):
+        p = await entry_chat_summary(
+            user_id, project_id, blobs, project_profiles, current_user_profiles
+        )
+    if not p.ok():
+        return p
+    user_memo_str = p.data().strip()
+
+    if not user_memo_str:
+        return Promise.resolve(None)
 
     processing_results = await asyncio.gather(
         process_profile_res(
@@ -92,28 +162,55 @@ async def process_blobs(
 
     intermediate_profile, delta_profile_data = profile_results.data()
     event_tags = event_results.data()
-
-    p = await handle_session_event(
-        user_id,
-        project_id,
-        user_memo_str,
-        delta_profile_data,
-        event_tags,
-        project_profiles,
+    return Promise.resolve(
+        (user_memo_str, intermediate_profile, delta_profile_data, event_tags)
     )
+
+
+async def process_fast_res(
+    user_id: str,
+    project_id: str,
+    blobs: list[Blob],
+    project_profiles: ProfileConfig,
+    current_user_profiles: UserProfilesData,
+) -> Promise[tuple[str, MergeAddResult, list[dict], list | None] | None]:
+    with trace_stage("fast_extract"):
+        p = await fast_extract(
+            user_id, project_id, blobs, project_profiles, current_user_profiles
+        )
     if not p.ok():
         return p
-    eid = p.data()
+    extracted_data = p.data()
+    user_memo_str = extracted_data["memo"]
+
+    if not user_memo_str:
+        return Promise.resolve(None)
 
-    p = await handle_user_profile_db(user_id, project_id, intermediate_profile)
+    with trace_stage("merge_new_memos_locally"):
+        p = await merge_new_memos_locally(
+            user_id,
+            project_id,
+            fact_contents=extracted_data["fact_contents"],
+            fact_attributes=extracted_data["fact_attributes"],
+            current_user_profiles=current_user_profiles,
+            config=project_profiles,
+        )
     if not p.ok():
         return p
+    intermediate_profile = p.data()
+    delta_profile_data = [
+        p for p in (intermediate_profile["add"] + intermediate_profile["update_delta"])
+    ]
+
+    await post_process_profiles(
+        user_id, project_id, intermediate_profile, project_profiles
+    )
     return Promise.resolve(
-        ChatModalResponse(
-            event_id=eid,
-            add_profiles=p.data().ids,
-            update_profiles=[up["profile_id"] for up in intermediate_profile["update"]],
-            delete_profiles=intermediate_profile["delete"],
+        (
+            user_memo_str,
+            intermediate_profile,
+            delta_profile_data,
+            extracted_data["event_tags"],
         )
     )
 
@@ -126,38 +223,70 @@ async def process_profile_res(
     current_user_profiles: UserProfilesData,
 ) -> Promise[tuple[MergeAddResult, list[dict]]]:
 
-    p = await extract_topics(
-        user_id, project_id, user_memo_str, project_profiles, current_user_profiles
-    )
-    if not p.ok():
-        return p
-    extracted_data = p.data()
-
-    # 2. Merge it to thw whole profile
-    p = await merge_or_valid_new_memos(
-        user_id,
-        project_id,
-        fact_contents=extracted_data["fact_contents"],
-        fact_attributes=extracted_data["fact_attributes"],
-        profiles=extracted_data["profiles"],
-        config=project_profiles,
-        total_profiles=extracted_data["total_profiles"],
-    )
-    if not p.ok():
-        return p
+    if CONFIG.stream_profile_extract:
+        # 1+2. Merge the first facts while the rest are still being extracted
+        with trace_stage("stream_extract_and_merge"):
+            p = await stream_extract_and_merge(
+                user_id,
+                project_id,
+                user_memo_str,
+                project_profiles,
+                current_user_profiles,
+            )
+        if not p.ok():
+            return p
+    else:
+        with trace_stage("extract_topics"):
+            p = await extract_topics(
+                user_id,
+                project_id,
+                user_memo_str,
+                project_profiles,
+                current_user_profiles,
+            )
+        if not p.ok():
+            return p
+        extracted_data = p.data()
+
+        # 2. Merge it to thw whole profile
+        with trace_stage("merge_or_valid_new_memos"):
+            p = await merge_or_valid_new_memos(
+                user_id,
+                project_id,
+                fact_contents=extracted_data["fact_contents"],
+                fact_attributes=extracted_data["fact_attributes"],
+                profiles=extracted_data["profiles"],
+                config=project_profiles,
+                total_profiles=extracted_data["total_profiles"],
+            )
+        if not p.ok():
+            return p
 
     intermediate_profile = p.data()
     delta_profile_data = [
         p for p in (intermediate_profile["add"] + intermediate_profile["update_delta"])
     ]
 
-    # 3. Check if we need to organize profiles
-    p = await organize_profiles(
-        user_id,
-        project_id,
-        intermediate_profile,
-        config=project_profiles,
+    await post_process_profiles(
+        user_id, project_id, intermediate_profile, project_profiles
     )
+    return Promise.resolve((intermediate_profile, delta_profile_data))
+
+
+async def post_process_profiles(
+    user_id: str,
+    project_id: str,
+    intermediate_profile: MergeAddResult,
+    project_profiles: ProfileConfig,
+):
+    # 3. Check if we need to organize profiles
+    with trace_stage("organize_profiles"):
+        p = await organize_profiles(
+            user_id,
+            project_id,
+            intermediate_profile,
+            config=project_profiles,
+        )
     if not p.ok():
         TRACE_LOG.error(
             project_id,
@@ -166,12 +295,13 @@ async def process_profile_res(
         )
 
     # 4. Re-summary profiles if any slot is too big
-    p = await re_summary(
-        user_id,
-        project_id,
-        add_profile=intermediate_profile["add"],
-        update_profile=intermediate_profile["update"],
-    )
+    with trace_stage("re_summary"):
+        p = await re_summary(
+            user_id,
+            project_id,
+            add_profile=intermediate_profile["add"],
+            update_profile=intermediate_profile["update"],
+        )
     if not p.ok():
         TRACE_LOG.error(
             project_id,
@@ -179,8 +309,6 @@ async def process_profile_res(
             f"Failed to re-summary profiles: {p.msg()}",
         )
 
-    return Promise.resolve((intermediate_profile, delta_profile_data))
-
 
 async def process_event_res(
     user_id: str,
@@ -189,7 +317,8 @@ async def process_event_res(
     config: ProfileConfig,
     current_user_profiles: UserProfilesData,
 ) -> Promise[list | None]:
-    p = await tag_event(project_id, config, memo_str)
+    with trace_stage("tag_event"):
+        p = await tag_event(project_id, config, memo_str)
     if not p.ok():
         TRACE_LOG.error(
             project_id,
@@ -210,15 +339,16 @@ async def handle_session_event(
     config: ProfileConfig,
 ) -> Promise[str]:
 
-    eid = await append_user_event(
-        user_id,
-        project_id,
-        {
-            "event_tip": memo_str,
-            "event_tags": event_tags,
-            "profile_delta": delta_profile_data,
-        },
-    )
+    with trace_stage("append_user_event"):
+        eid = await append_user_event(
+            user_id,
+            project_id,
+            {
+                "event_tip": memo_str,
+                "event_tags": event_tags,
+                "profile_delta": delta_profile_data,
+            },
+        )
 
     return eid
 
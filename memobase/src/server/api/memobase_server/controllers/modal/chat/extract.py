@@ -6,7 +6,6 @@ from ....prompts.utils import (
     attribute_unify,
     parse_string_into_profiles,
 )
-from ....prompts.profile_init_utils import read_out_profile_config, UserProfileTopic
 from ...project import ProfileConfig
 from .types import FactResponse, PROMPTS
 from .utils import pack_current_user_profiles
@@ -33,7 +32,7 @@ async def extract_topics(
 
     profiles = current_user_profiles.profiles
     CURRENT_PROFILE_INFO = pack_current_user_profiles(
-        current_user_profiles, project_profiles
+        project_id, current_user_profiles, project_profiles
     )
     USE_LANGUAGE = CURRENT_PROFILE_INFO["use_language"]
     STRICT_MODE = CURRENT_PROFILE_INFO["strict_mode"]
@@ -47,9 +46,7 @@ async def extract_topics(
             user_memo,
             strict_mode=STRICT_MODE,
         ),
-        system_prompt=PROMPTS[USE_LANGUAGE]["extract"].get_prompt(
-            PROMPTS[USE_LANGUAGE]["profile"].get_prompt(project_profiles_slots)
-        ),
+        system_prompt=CURRENT_PROFILE_INFO["project_prompts"].extract_system_prompt,
         temperature=0.2,  # precise
         **PROMPTS[USE_LANGUAGE]["extract"].get_kwargs(),
     )
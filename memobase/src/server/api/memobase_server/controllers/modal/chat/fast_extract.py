@@ -0,0 +1,204 @@
+from typing import Optional, TypedDict
+from ....env import CONFIG, ContanstTable, TRACE_LOG
+from ....models.utils import Promise
+from ....models.blob import Blob, BlobType
+from ....models.response import UserProfilesData
+from ....llms import llm_complete
+from ....prompts.utils import (
+    attribute_unify,
+    meaningless_profile_memo,
+    tag_chat_blobs_in_order_xml,
+)
+from ....types import SubTopic
+from ...project import ProfileConfig
+from .types import FactResponse, MergeAddResult, PROMPTS
+from .utils import pack_current_user_profiles
+from .extract import merge_by_topic_sub_topics
+from .merge_yolo import merge_or_valid_new_memos
+
+
+class FastExtractResult(TypedDict):
+    memo: str
+    fact_contents: list[str]
+    fact_attributes: list[dict]
+    event_tags: Optional[list[dict]]
+
+
+def parse_fast_extract_response(
+    response: dict, available_event_tags: set[str]
+) -> tuple[str, list[FactResponse], list[dict]]:
+    summary = response.get("summary") or ""
+    if isinstance(summary, list):
+        summary = "\n".join(str(s) for s in summary)
+
+    facts = []
+    for f in response.get("facts") or []:
+        if not isinstance(f, dict):
+            continue
+        topic, sub_topic, memo = f.get("topic"), f.get("sub_topic"), f.get("memo")
+        if not (topic and sub_topic and isinstance(memo, str) and memo.strip()):
+            continue
+        if meaningless_profile_memo(memo):
+            continue
+        facts.append(
+            {
+                ContanstTable.topic: attribute_unify(topic),
+                ContanstTable.sub_topic: attribute_unify(sub_topic),
+                "memo": memo.strip(),
+            }
+        )
+
+    event_tags = []
+    for et in response.get("event_tags") or []:
+        if not isinstance(et, dict) or not et.get("tag") or not et.get("value"):
+            continue
+        tag = attribute_unify(et["tag"])
+        if tag in available_event_tags:
+            event_tags.append({"tag": tag, "value": str(et["value"]).strip()})
+    return summary.strip(), merge_by_topic_sub_topics(facts), event_tags
+
+
+async def fast_extract(
+    user_id: str,
+    project_id: str,
+    blobs: list[Blob],
+    project_profiles: ProfileConfig,
+    current_user_profiles: UserProfilesData,
+) -> Promise[FastExtractResult]:
+    """Summarize, extract profiles and tag the event in one structured call"""
+    assert all(b.type == BlobType.chat for b in blobs), "All blobs must be chat blobs"
+    CURRENT_PROFILE_INFO = pack_current_user_profiles(
+        project_id, current_user_profiles, project_profiles
+    )
+    project_prompts = CURRENT_PROFILE_INFO["project_prompts"]
+    USE_LANGUAGE = CURRENT_PROFILE_INFO["use_language"]
+    prompt = PROMPTS[USE_LANGUAGE]["fast_extract"]
+    event_tags = project_prompts.event_tags
+    p = await llm_complete(
+        project_id,
+        prompt.pack_input(
+            CURRENT_PROFILE_INFO["already_topics_prompt"],
+            tag_chat_blobs_in_order_xml(blobs),
+            strict_mode=CURRENT_PROFILE_INFO["strict_mode"],
+        ),
+        system_prompt=project_prompts.fast_extract_system_prompt,
+        json_mode=True,
+        temperature=0.2,  # precise
+        **prompt.get_kwargs(),
+    )
+    if not p.ok():
+        return p
+    memo, new_facts, parsed_event_tags = parse_fast_extract_response(
+        p.data(), set([et.name for et in event_tags])
+    )
+
+    fact_contents = []
+    fact_attributes = []
+    for nf in new_facts:
+        if CURRENT_PROFILE_INFO["allowed_topic_subtopics"] is not None:
+            if (
+                nf[ContanstTable.topic],
+                nf[ContanstTable.sub_topic],
+            ) not in CURRENT_PROFILE_INFO["allowed_topic_subtopics"]:
+                continue
+        fact_contents.append(nf["memo"])
+        fact_attributes.append(
+            {
+                ContanstTable.topic: nf[ContanstTable.topic],
+                ContanstTable.sub_topic: nf[ContanstTable.sub_topic],
+            }
+        )
+    return Promise.resolve(
+        {
+            "memo": memo,
+            "fact_contents": fact_contents,
+            "fact_attributes": fact_attributes,
+            "event_tags": parsed_event_tags if len(event_tags) else None,
+        }
+    )
+
+
+async def merge_new_memos_locally(
+    user_id: str,
+    project_id: str,
+    fact_contents: list[str],
+    fact_attributes: list[dict],
+    current_user_profiles: UserProfilesData,
+    config: ProfileConfig,
+) -> Promise[MergeAddResult]:
+    """Add facts for new slots and drop already-known ones without an LLM call.
+
+    Only facts that may conflict with an existing profile, or that need value
+    validation (`profile_validate_mode` or the sub-topic's `validate_value`),
+    go through `merge_or_valid_new_memos`.
+    """
+    profiles = current_user_profiles.profiles
+    PROFILE_VALIDATE_MODE = (
+        config.profile_validate_mode
+        if config.profile_validate_mode is not None
+        else CONFIG.profile_validate_mode
+    )
+    CURRENT_PROFILE_INFO = pack_current_user_profiles(
+        project_id, current_user_profiles, config
+    )
+    DEFINE_MAPS = {
+        (p.topic, sp.name): sp
+        for p in CURRENT_PROFILE_INFO["project_profile_slots"]
+        for sp in p.sub_topics
+    }
+    RUNTIME_MAPS = {
+        (p.attributes[ContanstTable.topic], p.attributes[ContanstTable.sub_topic]): p
+        for p in profiles
+    }
+
+    profile_session_results: MergeAddResult = {
+        "add": [],
+        "update": [],
+        "delete": [],
+        "update_delta": [],
+        "before_profiles": profiles,
+    }
+    conflict_contents = []
+    conflict_attributes = []
+    for f_c, f_a in zip(fact_contents, fact_attributes):
+        KEY = (f_a[ContanstTable.topic], f_a[ContanstTable.sub_topic])
+        runtime_profile = RUNTIME_MAPS.get(KEY, None)
+        define_sub_topic = DEFINE_MAPS.get(KEY, SubTopic(name=""))
+        if (
+            not PROFILE_VALIDATE_MODE
+            and not define_sub_topic.validate_value
+            and runtime_profile is None
+        ):
+            profile_session_results["add"].append({"content": f_c, "attributes": f_a})
+        elif (
+            runtime_profile is not None
+            and f_c.lower() in runtime_profile.content.lower()
+        ):
+            TRACE_LOG.info(project_id, user_id, f"Skip known memo: {KEY}")
+        else:
+            conflict_contents.append(f_c)
+            conflict_attributes.append(f_a)
+
+    if not conflict_contents:
+        return Promise.resolve(profile_session_results)
+
+    TRACE_LOG.info(
+        project_id,
+        user_id,
+        f"Fast mode merges {len(conflict_contents)} conflicting memos with LLM",
+    )
+    p = await merge_or_valid_new_memos(
+        user_id,
+        project_id,
+        fact_contents=conflict_contents,
+        fact_attributes=conflict_attributes,
+        profiles=profiles,
+        config=config,
+        total_profiles=CURRENT_PROFILE_INFO["project_profile_slots"],
+    )
+    if not p.ok():
+        return p
+    merged = p.data()
+    for key in ("add", "update", "delete", "update_delta"):
+        profile_session_results[key].extend(merged[key])
+    return Promise.resolve(profile_session_results)
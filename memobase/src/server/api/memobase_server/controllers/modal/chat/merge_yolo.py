@@ -84,6 +84,8 @@ async def merge_or_valid_new_memos(
                 f_a,
             )
         )
+    if not new_memos:
+        return Promise.resolve(profile_session_results)
     new_memos_input = [{"memo_id": i + 1, **m[0]} for i, m in enumerate(new_memos)]
     r = await llm_complete(
         project_id,
@@ -0,0 +1,119 @@
+import json
+import hashlib
+from collections import OrderedDict
+from functools import cached_property
+from ....env import CONFIG, ProfileConfig
+from ....types import UserProfileTopic
+from ....prompts import event_tagging as event_tagging_prompt
+from ....prompts.profile_init_utils import read_out_profile_config, read_out_event_tags
+from ....prompts.utils import attribute_unify
+from .types import PROMPTS
+
+PROMPT_CACHE_SIZE = 1024
+
+
+def profile_config_hash(config: ProfileConfig) -> str:
+    payload = {
+        "config": vars(config),
+        "global": [
+            CONFIG.language,
+            CONFIG.profile_strict_mode,
+            CONFIG.event_tags,
+            CONFIG.event_theme_requirement,
+            CONFIG.system_prompt,
+            CONFIG.llm_tab_separator,
+        ],
+    }
+    return hashlib.sha1(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ProjectPrompts:
+    """Prompt pieces that only depend on the project's ProfileConfig.
+
+    System prompts are rendered on first use and then reused byte for byte,
+    so providers with prefix caching see the same prefix on every flush.
+    """
+
+    def __init__(self, config: ProfileConfig, config_hash: str):
+        self.config = config
+        self.config_hash = config_hash
+        self.use_language = config.language or CONFIG.language
+        self.strict_mode = (
+            config.profile_strict_mode
+            if config.profile_strict_mode is not None
+            else CONFIG.profile_strict_mode
+        )
+        self.project_profile_slots: list[UserProfileTopic] = read_out_profile_config(
+            config, PROMPTS[self.use_language]["profile"].CANDIDATE_PROFILE_TOPICS
+        )
+        if self.strict_mode:
+            self.allowed_topic_subtopics = {
+                (attribute_unify(p.topic), attribute_unify(st["name"]))
+                for p in self.project_profile_slots
+                for st in p.sub_topics
+            }
+        else:
+            self.allowed_topic_subtopics = None
+        self.event_tags = read_out_event_tags(config)
+        self.event_theme_requirement = (
+            config.event_theme_requirement or CONFIG.event_theme_requirement
+        )
+
+    @cached_property
+    def event_tags_str(self) -> str:
+        return "\n".join([f"- {et.name}({et.description})" for et in self.event_tags])
+
+    @cached_property
+    def profile_topics_str(self) -> str:
+        return PROMPTS[self.use_language]["profile"].get_prompt(
+            self.project_profile_slots
+        )
+
+    @cached_property
+    def extract_system_prompt(self) -> str:
+        return PROMPTS[self.use_language]["extract"].get_prompt(self.profile_topics_str)
+
+    @cached_property
+    def entry_summary_system_prompt(self) -> str:
+        return PROMPTS[self.use_language]["entry_summary"].get_prompt(
+            self.profile_topics_str,
+            self.event_tags_str,
+            additional_requirements=self.event_theme_requirement,
+        )
+
+    @cached_property
+    def fast_extract_system_prompt(self) -> str:
+        return PROMPTS[self.use_language]["fast_extract"].get_prompt(
+            self.profile_topics_str,
+            self.event_tags_str,
+            additional_requirements=self.event_theme_requirement,
+        )
+
+    @cached_property
+    def event_tagging_system_prompt(self) -> str:
+        return event_tagging_prompt.get_prompt(self.event_tags_str)
+
+
+_PROJECT_PROMPTS: OrderedDict[str, ProjectPrompts] = OrderedDict()
+
+
+def get_project_prompts(project_id: str, config: ProfileConfig) -> ProjectPrompts:
+    prompts = _PROJECT_PROMPTS.get(project_id)
+    # parsed configs are cached by `get_project_profile_config`, so the same
+    # object means the same config and the hash can be skipped
+    if prompts is None or prompts.config is not config:
+        config_hash = profile_config_hash(config)
+        if prompts is None or prompts.config_hash != config_hash:
+            # another worker may have updated the config, the hash catches that too
+            prompts = ProjectPrompts(config, config_hash)
+            _PROJECT_PROMPTS[project_id] = prompts
+    _PROJECT_PROMPTS.move_to_end(project_id)
+    while len(_PROJECT_PROMPTS) > PROMPT_CACHE_SIZE:
+        _PROJECT_PROMPTS.popitem(last=False)
+    return prompts
+
+
+def invalidate_project_prompts(project_id: str):
+    _PROJECT_PROMPTS.pop(project_id, None)
@@ -0,0 +1,132 @@
+import asyncio
+from ....env import CONFIG, ContanstTable, TRACE_LOG
+from ....models.utils import Promise, CODE
+from ....models.response import UserProfilesData
+from ....llms import llm_stream_complete
+from ....prompts.utils import parse_line_into_profile
+from ...project import ProfileConfig
+from .types import MergeAddResult, PROMPTS
+from .utils import pack_current_user_profiles
+from .merge_yolo import merge_or_valid_new_memos
+
+
+def _fold_late_fact(
+    results: MergeAddResult, content: str, attributes: dict
+) -> bool:
+    """Append a repeated topic/sub_topic to its already merged profile"""
+    key = (attributes[ContanstTable.topic], attributes[ContanstTable.sub_topic])
+    folded = False
+    for kind in ("add", "update", "update_delta"):
+        for profile in results[kind]:
+            if (
+                profile["attributes"][ContanstTable.topic],
+                profile["attributes"][ContanstTable.sub_topic],
+            ) == key:
+                profile["content"] += f"; {content}"
+                folded = True
+    return folded
+
+
+async def stream_extract_and_merge(
+    user_id: str,
+    project_id: str,
+    user_memo: str,
+    project_profiles: ProfileConfig,
+    current_user_profiles: UserProfilesData,
+) -> Promise[MergeAddResult]:
+    """Start merging the first extracted facts while the model is still generating.
+
+    Facts are merged in batches of `stream_merge_batch_size`. A topic/sub_topic
+    repeated after its batch was dispatched is appended to the merged result,
+    like `merge_by_topic_sub_topics` does for the non-streaming path.
+    """
+    profiles = current_user_profiles.profiles
+    CURRENT_PROFILE_INFO = pack_current_user_profiles(
+        project_id, current_user_profiles, project_profiles
+    )
+    USE_LANGUAGE = CURRENT_PROFILE_INFO["use_language"]
+    project_profiles_slots = CURRENT_PROFILE_INFO["project_profile_slots"]
+    project_prompts = CURRENT_PROFILE_INFO["project_prompts"]
+
+    tasks: list[asyncio.Task] = []
+    batch: dict[tuple[str, str], str] = {}
+    dispatched_keys = set()
+    late_facts = []
+
+    def dispatch_batch():
+        keys = list(batch.keys())
+        tasks.append(
+            asyncio.create_task(
+                merge_or_valid_new_memos(
+                    user_id,
+                    project_id,
+                    fact_contents=[batch[k] for k in keys],
+                    fact_attributes=[
+                        {ContanstTable.topic: k[0], ContanstTable.sub_topic: k[1]}
+                        for k in keys
+                    ],
+                    profiles=profiles,
+                    config=project_profiles,
+                    total_profiles=project_profiles_slots,
+                )
+            )
+        )
+        dispatched_keys.update(keys)
+        batch.clear()
+
+    try:
+        async for line in llm_stream_complete(
+            project_id,
+            PROMPTS[USE_LANGUAGE]["extract"].pack_input(
+                CURRENT_PROFILE_INFO["already_topics_prompt"],
+                user_memo,
+                strict_mode=CURRENT_PROFILE_INFO["strict_mode"],
+            ),
+            system_prompt=project_prompts.extract_system_prompt,
+            temperature=0.2,  # precise
+            **PROMPTS[USE_LANGUAGE]["extract"].get_kwargs(),
+        ):
+            fact = parse_line_into_profile(line.strip())
+            if fact is None:
+                continue
+            key = (fact.topic, fact.sub_topic)
+            if CURRENT_PROFILE_INFO["allowed_topic_subtopics"] is not None:
+                if key not in CURRENT_PROFILE_INFO["allowed_topic_subtopics"]:
+                    continue
+            if key in batch:
+                batch[key] += f"; {fact.memo}"
+            elif key in dispatched_keys:
+                late_facts.append((fact.memo, key))
+            else:
+                batch[key] = fact.memo
+            if len(batch) >= CONFIG.stream_merge_batch_size:
+                dispatch_batch()
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        return Promise.reject(
+            CODE.SERVICE_UNAVAILABLE, f"Error in llm_stream_complete: {e}"
+        )
+    if batch:
+        dispatch_batch()
+    if not tasks:
+        TRACE_LOG.info(project_id, user_id, f"No new facts extracted")
+
+    profile_session_results: MergeAddResult = {
+        "add": [],
+        "update": [],
+        "delete": [],
+        "update_delta": [],
+        "before_profiles": profiles,
+    }
+    for p in await asyncio.gather(*tasks):
+        if not p.ok():
+            return p
+        for kind in ("add", "update", "delete", "update_delta"):
+            profile_session_results[kind].extend(p.data()[kind])
+
+    for memo, key in late_facts:
+        attributes = {ContanstTable.topic: key[0], ContanstTable.sub_topic: key[1]}
+        if not _fold_late_fact(profile_session_results, memo, attributes):
+            TRACE_LOG.info(project_id, user_id, f"Drop late fact of aborted {key}")
+    return Promise.resolve(profile_session_results)
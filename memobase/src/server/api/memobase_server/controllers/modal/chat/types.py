@@ -11,6 +11,8 @@ from ....prompts import (
     zh_merge_profile,
     zh_summary_entry_chats,
     zh_merge_profile_yolo,
+    fast_extract,
+    zh_fast_extract,
 )
 from ....models.response import ProfileData
 
@@ -43,6 +45,7 @@ PROMPTS = {
         "merge": merge_profile,
         "merge_yolo": merge_profile_yolo,
         "organize": organize_profile,
+        "fast_extract": fast_extract,
     },
     "zh": {
         "entry_summary": zh_summary_entry_chats,
@@ -51,5 +54,6 @@ PROMPTS = {
         "merge": zh_merge_profile,
         "merge_yolo": zh_merge_profile_yolo,
         "organize": organize_profile,
+        "fast_extract": zh_fast_extract,
     },
 }
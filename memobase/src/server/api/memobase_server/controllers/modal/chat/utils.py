@@ -2,12 +2,11 @@ from typing import TypedDict
 from ....env import CONFIG
 from ....models.response import UserProfilesData
 from ...project import ProfileConfig
-from ....prompts.profile_init_utils import read_out_profile_config
-from .types import PROMPTS
 from ....types import UserProfileTopic
 from ....env import ContanstTable
 from ....utils import truncate_string
 from ....prompts.utils import attribute_unify
+from .prompt_cache import ProjectPrompts, get_project_prompts
 
 
 class PackCurrentUserProfilesResult(TypedDict):
@@ -17,31 +16,20 @@ class PackCurrentUserProfilesResult(TypedDict):
     project_profile_slots: list[UserProfileTopic]
     use_language: str
     strict_mode: bool
+    project_prompts: ProjectPrompts
 
 
 def pack_current_user_profiles(
-    current_user_profiles: UserProfilesData, project_profiles: ProfileConfig
+    project_id: str,
+    current_user_profiles: UserProfilesData,
+    project_profiles: ProfileConfig,
 ) -> PackCurrentUserProfilesResult:
     profiles = current_user_profiles.profiles
-    USE_LANGUAGE = project_profiles.language or CONFIG.language
-    STRICT_MODE = (
-        project_profiles.profile_strict_mode
-        if project_profiles.profile_strict_mode is not None
-        else CONFIG.profile_strict_mode
-    )
-
-    project_profiles_slots = read_out_profile_config(
-        project_profiles, PROMPTS[USE_LANGUAGE]["profile"].CANDIDATE_PROFILE_TOPICS
-    )
-    if STRICT_MODE:
-        allowed_topic_subtopics = set()
-        for p in project_profiles_slots:
-            for st in p.sub_topics:
-                allowed_topic_subtopics.add(
-                    (attribute_unify(p.topic), attribute_unify(st["name"]))
-                )
-    else:
-        allowed_topic_subtopics = None
+    project_prompts = get_project_prompts(project_id, project_profiles)
+    USE_LANGUAGE = project_prompts.use_language
+    STRICT_MODE = project_prompts.strict_mode
+    project_profiles_slots = project_prompts.project_profile_slots
+    allowed_topic_subtopics = project_prompts.allowed_topic_subtopics
 
     if len(profiles):
         already_topics_subtopics = set(
@@ -85,4 +73,5 @@ def pack_current_user_profiles(
         "project_profile_slots": project_profiles_slots,
         "use_language": USE_LANGUAGE,
         "strict_mode": STRICT_MODE,
+        "project_prompts": project_prompts,
     }
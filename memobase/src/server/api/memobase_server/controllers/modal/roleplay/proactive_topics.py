@@ -1,16 +1,20 @@
-from ....env import ContanstTable, CONFIG, LOG
+import time
+import asyncio
+from ....env import ContanstTable, CONFIG, LOG, TRACE_LOG
 from ...status import append_user_status, get_user_statuses
 from ...profile import get_user_profiles, truncate_profiles
 from ...project import get_project_profile_config
 from ....models.blob import OpenAICompatibleMessage
 from ....models.utils import Promise
 from ....models.response import ProactiveTopicData
-from ...profile import get_user_profiles, truncate_profiles
 from .detect_interest import detect_chat_interest
 from .predict_new_topics import predict_new_topics
 
 # from .types import
 
+# status writes run after the response, keep them referenced until done
+PENDING_STATUS_WRITES: set[asyncio.Task] = set()
+
 
 def pack_timeline_prompt(timeline: str, language: str) -> str:
     if language == "zh":
@@ -19,6 +23,48 @@ def pack_timeline_prompt(timeline: str, language: str) -> str:
         return f"## Here is your script, if I don't provide a topic, please refer to the following plot to drive our conversation: \n{timeline}##"
 
 
+async def timed(latency: dict[str, float], stage: str, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        latency[stage] = round((time.perf_counter() - start) * 1000, 2)
+
+
+async def get_user_context(user_id: str, project_id: str, **truncate_kwargs):
+    p = await get_user_profiles(user_id, project_id)
+    if not p.ok():
+        return p
+    p = await truncate_profiles(p.data(), **truncate_kwargs)
+    if not p.ok():
+        return p
+    return Promise.resolve(
+        "\n".join(
+            [
+                f"{up.attributes.get('topic')}::{up.attributes.get('sub_topic')}: {up.content}"
+                for up in p.data().profiles
+            ]
+        )
+    )
+
+
+async def write_user_status(user_id: str, project_id: str, attributes: dict):
+    try:
+        p = await append_user_status(
+            user_id, project_id, ContanstTable.roleplay_plot_status, attributes
+        )
+        if not p.ok():
+            TRACE_LOG.error(project_id, user_id, f"Failed to save status: {p.msg()}")
+    except Exception as e:
+        TRACE_LOG.error(project_id, user_id, f"Failed to save status: {e}")
+
+
+def write_user_status_in_background(user_id: str, project_id: str, attributes: dict):
+    task = asyncio.create_task(write_user_status(user_id, project_id, attributes))
+    PENDING_STATUS_WRITES.add(task)
+    task.add_done_callback(PENDING_STATUS_WRITES.discard)
+
+
 async def process_messages(
     user_id: str,
     project_id: str,
@@ -31,86 +77,108 @@ async def process_messages(
     max_subtopic_size: int = None,
     topic_limits: dict[str, int] = None,
 ) -> Promise[ProactiveTopicData]:
-    p = await get_project_profile_config(project_id)
-    if not p.ok():
-        return p
-    project_profiles = p.data()
-    USE_LANGUAGE = "zh"
-    # USE_LANGUAGE = project_profiles.language or CONFIG.language
+    """Statuses and profiles are prefetched while the interest is detected.
 
-    interest = await detect_chat_interest(
-        project_id,
-        messages,
-        profile_config=project_profiles,
+    They are only needed for a new topic, so the prefetch is cancelled otherwise.
+    """
+    start = time.perf_counter()
+    latency = {}
+    statuses_task = asyncio.create_task(
+        timed(
+            latency,
+            "user_statuses",
+            get_user_statuses(
+                user_id, project_id, type=ContanstTable.roleplay_plot_status
+            ),
+        )
     )
-    if not interest.ok():
-        return interest
-    interest_data = interest.data()
-    if interest_data["action"] != "new_topic":
-        await append_user_status(
-            user_id,
-            project_id,
-            ContanstTable.roleplay_plot_status,
-            {
-                "interest": interest_data,
-            },
+    context_task = asyncio.create_task(
+        timed(
+            latency,
+            "user_profiles",
+            get_user_context(
+                user_id,
+                project_id,
+                prefer_topics=prefer_topics,
+                topk=topk,
+                max_token_size=max_token_size,
+                only_topics=only_topics,
+                max_subtopic_size=max_subtopic_size,
+                topic_limits=topic_limits,
+            ),
         )
-        return Promise.resolve(ProactiveTopicData(action="continue"))
-    latests_statuses = await get_user_statuses(
-        user_id, project_id, type=ContanstTable.roleplay_plot_status
     )
-    if not latests_statuses.ok():
-        return latests_statuses
-    latests_statuses_data = latests_statuses.data()
+    try:
+        p = await timed(
+            latency, "project_config", get_project_profile_config(project_id)
+        )
+        if not p.ok():
+            return p
+        project_profiles = p.data()
+        USE_LANGUAGE = "zh"
+        # USE_LANGUAGE = project_profiles.language or CONFIG.language
 
-    p = await get_user_profiles(user_id, project_id)
-    if not p.ok():
-        return p
-    p = await truncate_profiles(
-        p.data(),
-        prefer_topics=prefer_topics,
-        topk=topk,
-        max_token_size=max_token_size,
-        only_topics=only_topics,
-        max_subtopic_size=max_subtopic_size,
-        topic_limits=topic_limits,
-    )
-    if not p.ok():
-        return p
-    user_profiles_data = p.data()
-    use_user_profiles = user_profiles_data.profiles
-    user_context = "\n".join(
-        [
-            f"{p.attributes.get('topic')}::{p.attributes.get('sub_topic')}: {p.content}"
-            for p in use_user_profiles
-        ]
-    )
+        interest = await timed(
+            latency,
+            "detect_interest",
+            detect_chat_interest(
+                project_id,
+                messages,
+                profile_config=project_profiles,
+            ),
+        )
+        if not interest.ok():
+            return interest
+        interest_data = interest.data()
+        if interest_data["action"] != "new_topic":
+            write_user_status_in_background(
+                user_id, project_id, {"interest": interest_data}
+            )
+            latency["total"] = round((time.perf_counter() - start) * 1000, 2)
+            return Promise.resolve(
+                ProactiveTopicData(action="continue", latency_ms=latency)
+            )
 
-    p = await predict_new_topics(
-        project_id,
-        messages,
-        latests_statuses_data,
-        user_context,
-        agent_context,
-        project_profiles,
-    )
-    if not p.ok():
-        return p
-    plot = p.data()
-    await append_user_status(
+        latests_statuses, user_context = await asyncio.gather(
+            statuses_task, context_task
+        )
+        if not latests_statuses.ok():
+            return latests_statuses
+        if not user_context.ok():
+            return user_context
+
+        p = await timed(
+            latency,
+            "predict_topics",
+            predict_new_topics(
+                project_id,
+                messages,
+                latests_statuses.data(),
+                user_context.data(),
+                agent_context,
+                project_profiles,
+            ),
+        )
+        if not p.ok():
+            return p
+        plot = p.data()
+    finally:
+        statuses_task.cancel()
+        context_task.cancel()
+    write_user_status_in_background(
         user_id,
         project_id,
-        ContanstTable.roleplay_plot_status,
         {
             "interest": interest_data,
             "new_topic": plot,
             "chats": [m.model_dump() for m in messages],
         },
     )
-
+    latency["total"] = round((time.perf_counter() - start) * 1000, 2)
     return Promise.resolve(
         ProactiveTopicData(
             action="new_topic",
             topic_prompt=pack_timeline_prompt(plot["timeline"], USE_LANGUAGE),
+            latency_ms=latency,
         )
     )
@@ -1,8 +1,8 @@
 from pydantic import ValidationError
 from ..models.utils import Promise
-from ..models.database import GeneralBlob, UserProfile
+from ..models.database import GeneralBlob, User, UserProfile
 from ..models.response import CODE, IdData, IdsData, UserProfilesData, ProfileAttributes
-from ..connectors import Session, get_redis_client
+from ..connectors import Session, get_redis_client, read_session
 from ..utils import get_encoded_tokens
 from ..env import CONFIG, TRACE_LOG
 
@@ -72,7 +72,10 @@ async def truncate_profiles(
     return Promise.resolve(profiles)
 
 
-async def get_user_profiles(user_id: str, project_id: str) -> Promise[UserProfilesData]:
+async def get_user_profiles(
+    user_id: str, project_id: str, use_replica: bool = False
+) -> Promise[UserProfilesData]:
+    """`use_replica` is for API reads, flushes merge into what the primary has"""
     async with get_redis_client() as redis_client:
         user_profiles = await redis_client.get(
             f"user_profiles::{project_id}::{user_id}"
@@ -89,7 +92,11 @@ async def get_user_profiles(user_id: str, project_id: str) -> Promise[UserProfil
                     f"Invalid user profiles: {e}",
                 )
                 await redis_client.delete(f"user_profiles::{project_id}::{user_id}")
-    with Session() as session:
+    if use_replica:
+        session = await read_session(project_id, user_id)
+    else:
+        session = Session()
+    with session:
         user_profiles = (
             session.query(UserProfile)
             .filter_by(user_id=user_id, project_id=project_id)
@@ -141,6 +148,7 @@ async def add_user_profiles(
             for content, attr in zip(profiles, attributes)
         ]
         session.add_all(db_profiles)
+        User.adjust_counters(session, user_id, project_id, profiles=len(db_profiles))
         session.commit()
         profile_ids = [profile.id for profile in db_profiles]
     await refresh_user_profile_cache(user_id, project_id)
@@ -198,6 +206,7 @@ async def delete_user_profile(
                 CODE.NOT_FOUND, f"Profile {profile_id} not found for user {user_id}"
             )
         session.delete(db_profile)
+        User.adjust_counters(session, user_id, project_id, profiles=-1)
         session.commit()
     await refresh_user_profile_cache(user_id, project_id)
     return Promise.resolve(None)
@@ -207,11 +216,16 @@ async def delete_user_profiles(
     user_id: str, project_id: str, profile_ids: list[str]
 ) -> Promise[IdsData]:
     with Session() as session:
-        session.query(UserProfile).filter(
-            UserProfile.id.in_(profile_ids),
-            UserProfile.user_id == user_id,
-            UserProfile.project_id == project_id,
-        ).delete(synchronize_session=False)
+        deleted = (
+            session.query(UserProfile)
+            .filter(
+                UserProfile.id.in_(profile_ids),
+                UserProfile.user_id == user_id,
+                UserProfile.project_id == project_id,
+            )
+            .delete(synchronize_session=False)
+        )
+        User.adjust_counters(session, user_id, project_id, profiles=-deleted)
         session.commit()
     await refresh_user_profile_cache(user_id, project_id)
     return Promise.resolve(IdsData(ids=profile_ids))
@@ -294,12 +308,19 @@ async def add_update_delete_user_profiles(
                 update_db_profiles.append(profile_id)
 
             # 3. delete profiles
-            session.query(UserProfile).filter(
-                UserProfile.id.in_(delete_profile_ids),
-                UserProfile.user_id == user_id,
-                UserProfile.project_id == project_id,
-            ).delete(synchronize_session=False)
+            deleted = (
+                session.query(UserProfile)
+                .filter(
+                    UserProfile.id.in_(delete_profile_ids),
+                    UserProfile.user_id == user_id,
+                    UserProfile.project_id == project_id,
+                )
+                .delete(synchronize_session=False)
+            )
 
+            User.adjust_counters(
+                session, user_id, project_id, profiles=len(add_profile_ids) - deleted
+            )
             session.commit()
         except Exception as e:
             TRACE_LOG.error(
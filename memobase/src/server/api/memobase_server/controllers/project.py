@@ -1,10 +1,14 @@
-from sqlalchemy import cast, String, func, desc
-from ..models.database import Project, User, UserProfile, UserEvent
+from uuid import UUID
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import cast, String, func, desc, tuple_
+from ..models.database import Project, User
 from ..models.utils import Promise, CODE
 from ..models.response import IdData, ProfileConfigData, ProjectUsersData, DailyUsage
-from ..connectors import Session
+from ..connectors import Session, read_session
 from ..env import ProfileConfig, TelemetryKeyName
 from ..telemetry.capture_key import get_int_key, date_past_key
+from ..utils import encode_cursor, decode_cursor
 
 
 async def get_project_secret(project_id: str) -> Promise[str]:
@@ -31,6 +35,12 @@ async def get_project_status(project_id: str) -> Promise[str]:
         return Promise.resolve(p.status)
 
 
+@lru_cache(maxsize=1024)
+def parse_profile_config(profile_config: str) -> ProfileConfig:
+    # the parsed config is shared between flushes, never mutate it
+    return ProfileConfig.load_config_string(profile_config)
+
+
 async def get_project_profile_config(project_id: str) -> Promise[ProfileConfig]:
     with Session() as session:
         p = (
@@ -42,13 +52,15 @@ async def get_project_profile_config(project_id: str) -> Promise[ProfileConfig]:
             return Promise.reject(CODE.NOT_FOUND, "Project not found")
         if not p.profile_config:
             return Promise.resolve(ProfileConfig())
-        p_parse = ProfileConfig.load_config_string(p.profile_config)
+        p_parse = parse_profile_config(p.profile_config)
     return Promise.resolve(p_parse)
 
 
 async def update_project_profile_config(
     project_id: str, profile_config: str | None
 ) -> Promise[None]:
+    from .modal.chat.prompt_cache import invalidate_project_prompts
+
     with Session() as session:
         p = (
             session.query(Project)
@@ -59,6 +71,7 @@ async def update_project_profile_config(
             return Promise.reject(CODE.NOT_FOUND, "Project not found")
         p.profile_config = profile_config
         session.commit()
+    invalidate_project_prompts(project_id)
     return Promise.resolve(None)
 
 
@@ -83,69 +96,61 @@ async def get_project_users(
     offset: int = 0,
     order_by: str = "updated_at",
     order_desc: bool = True,
+    cursor: str = None,
 ) -> Promise[ProjectUsersData]:
-    with Session() as session:
-        profile_subq = (
-            session.query(
-                UserProfile.user_id.label("user_id"),
-                func.count(UserProfile.id).label("profile_count"),
-            )
-            .filter(UserProfile.project_id == project_id)
-            .group_by(UserProfile.user_id)
-            .subquery()
-        )
-
-        event_subq = (
-            session.query(
-                UserEvent.user_id.label("user_id"),
-                func.count(UserEvent.id).label("event_count"),
-            )
-            .filter(UserEvent.project_id == project_id)
-            .group_by(UserEvent.user_id)
-            .subquery()
-        )
-
-        query = (
-            session.query(
-                User,
-                func.coalesce(profile_subq.c.profile_count, 0).label("profile_count"),
-                func.coalesce(event_subq.c.event_count, 0).label("event_count"),
-            )
-            .filter(User.project_id == project_id)
-            .filter(cast(User.id, String).like(f"%{search}%"))
-            .outerjoin(profile_subq, profile_subq.c.user_id == User.id)
-            .outerjoin(event_subq, event_subq.c.user_id == User.id)
-        )
+    with await read_session(project_id) as session:
+        query = session.query(User).filter(User.project_id == project_id)
+        if search:
+            query = query.filter(cast(User.id, String).like(f"%{search}%"))
 
         if order_by == "profile_count":
-            query = query.order_by(
-                desc("profile_count") if order_desc else "profile_count"
-            )
+            order_column, parse_value = User.profile_count, int
         elif order_by == "event_count":
-            query = query.order_by(desc("event_count") if order_desc else "event_count")
+            order_column, parse_value = User.event_count, int
         else:
-            query = query.order_by(
-                desc(User.updated_at) if order_desc else User.updated_at
-            )
+            order_column, parse_value = User.updated_at, datetime.fromisoformat
 
-        count = (
-            session.query(func.count())
-            .filter(User.project_id == project_id)
-            .filter(cast(User.id, String).like(f"%{search}%"))
-            .scalar()
-        )
+        if order_desc:
+            query = query.order_by(desc(order_column), desc(User.id))
+        else:
+            query = query.order_by(order_column, User.id)
+
+        # keyset on (order column, id), so a page costs the same at any depth
+        count = None
+        if cursor is not None:
+            p = decode_cursor(cursor, [parse_value, UUID])
+            if not p.ok():
+                return p
+            key, last_key = tuple_(order_column, User.id), tuple_(*p.data())
+            query = query.filter(key < last_key if order_desc else key > last_key)
+        else:
+            count_query = session.query(func.count(User.id)).filter(
+                User.project_id == project_id
+            )
+            if search:
+                count_query = count_query.filter(
+                    cast(User.id, String).like(f"%{search}%")
+                )
+            count = count_query.scalar()
+            query = query.offset(offset)
 
-        users_with_counts = query.limit(limit).offset(offset).all()
+        users = query.limit(limit).all()
 
         user_dicts = []
-        for user, profile_count, event_count in users_with_counts:
+        for user in users:
             user_data = user.__dict__.copy()
             user_data.pop("_sa_instance_state", None)
-            user_data["profile_count"] = profile_count
-            user_data["event_count"] = event_count
             user_dicts.append(user_data)
 
-        return Promise.resolve(ProjectUsersData(users=user_dicts, count=count))
+        next_cursor = None
+        if users and len(users) == limit:
+            last_key = getattr(users[-1], order_column.key)
+            if isinstance(last_key, datetime):
+                last_key = last_key.isoformat()
+            next_cursor = encode_cursor([last_key, str(users[-1].id)])
+        return Promise.resolve(
+            ProjectUsersData(users=user_dicts, count=count, next_cursor=next_cursor)
+        )
 
 
 async def get_project_usage(
@@ -1,9 +1,22 @@
+import json
+from uuid import UUID
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import tuple_, select, Row
+from sqlalchemy.orm import Session as SessionType
 from ..models.utils import Promise
-from ..models.database import User, GeneralBlob, UserProfile
+from ..models.database import (
+    User,
+    GeneralBlob,
+    UserProfile,
+    UserEvent,
+    UserEventArchive,
+)
 from ..models.response import CODE, UserData, IdData, IdsData, UserProfilesData
-from ..connectors import Session
+from ..connectors import Session, read_session
 from .profile import refresh_user_profile_cache
 from ..models.blob import BlobType
+from ..utils import encode_cursor, decode_cursor
 
 
 async def create_user(data: UserData, project_id: str) -> Promise[IdData]:
@@ -69,16 +82,120 @@ async def get_user_all_blobs(
     blob_type: BlobType,
     page: int = 0,
     page_size: int = 10,
+    cursor: str = None,
 ) -> Promise[IdsData]:
-    with Session() as session:
-        user_blobs = (
-            session.query(GeneralBlob.id)
+    with await read_session(project_id, user_id) as session:
+        query = (
+            session.query(GeneralBlob.id, GeneralBlob.created_at)
             .filter_by(user_id=user_id, blob_type=str(blob_type), project_id=project_id)
-            .order_by(GeneralBlob.created_at)
-            .offset(page * page_size)
-            .limit(page_size)
-            .all()
+            .order_by(GeneralBlob.created_at, GeneralBlob.id)
         )
-        if user_blobs is None:
-            return Promise.reject(CODE.NOT_FOUND, f"User {user_id} not found")
-        return Promise.resolve(IdsData(ids=[blob.id for blob in user_blobs]))
+        if cursor is not None:
+            p = decode_cursor(cursor, [datetime.fromisoformat, UUID])
+            if not p.ok():
+                return p
+            query = query.filter(
+                tuple_(GeneralBlob.created_at, GeneralBlob.id) > tuple_(*p.data())
+            )
+        else:
+            query = query.offset(page * page_size)
+        user_blobs = query.limit(page_size).all()
+        next_cursor = None
+        if user_blobs and len(user_blobs) == page_size:
+            last = user_blobs[-1]
+            next_cursor = encode_cursor([last.created_at.isoformat(), str(last.id)])
+        return Promise.resolve(
+            IdsData(ids=[blob.id for blob in user_blobs], next_cursor=next_cursor)
+        )
+
+
+# rows fetched per round trip of the server-side export cursors
+EXPORT_BATCH_SIZE = 500
+EXPORT_TABLES = {
+    "blob": (
+        GeneralBlob.id,
+        GeneralBlob.blob_type,
+        GeneralBlob.blob_data,
+        GeneralBlob.additional_fields,
+        GeneralBlob.created_at,
+    ),
+    "profile": (
+        UserProfile.id,
+        UserProfile.content,
+        UserProfile.attributes,
+        UserProfile.created_at,
+        UserProfile.updated_at,
+    ),
+    "event": (
+        UserEvent.id,
+        UserEvent.event_data,
+        UserEvent.created_at,
+        UserEvent.updated_at,
+    ),
+    "archived_event": (
+        UserEventArchive.id,
+        UserEventArchive.event_data,
+        UserEventArchive.created_at,
+        UserEventArchive.updated_at,
+    ),
+}
+
+
+def export_json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class UserExport:
+    """NDJSON lines of a user export, read in the session of the user check.
+
+    The session is closed once the lines are read, or by `close` when the
+    response ends before they are, e.g. the client disconnected first.
+    """
+
+    def __init__(self, session: SessionType, user: Row, user_id: str, project_id: str):
+        self.session = session
+        self.user = user
+        self.user_id = user_id
+        self.project_id = project_id
+
+    def __iter__(self) -> Iterator[str]:
+        with self.session:
+            yield json.dumps(
+                {"type": "user", **self.user._asdict()},
+                ensure_ascii=False,
+                default=export_json_default,
+            ) + "\n"
+            for row_type, columns in EXPORT_TABLES.items():
+                table = columns[0].class_
+                rows = self.session.execute(
+                    select(*columns)
+                    .filter_by(user_id=self.user_id, project_id=self.project_id)
+                    .order_by(table.created_at, table.id)
+                    .execution_options(yield_per=EXPORT_BATCH_SIZE)
+                )
+                for row in rows:
+                    yield json.dumps(
+                        {"type": row_type, **row._asdict()},
+                        ensure_ascii=False,
+                        default=export_json_default,
+                    ) + "\n"
+
+    def close(self):
+        self.session.close()
+
+
+async def export_user(user_id: str, project_id: str) -> Promise[UserExport]:
+    """Stream a user with all its blobs, profiles and events as NDJSON lines"""
+    # the stream reads in the session of the check, if the user is deleted in
+    # between it only ends early instead of failing after the 200 status
+    session = await read_session(project_id, user_id)
+    user = session.execute(
+        select(User.id, User.additional_fields, User.created_at, User.updated_at)
+        .filter_by(id=user_id, project_id=project_id)
+    ).one_or_none()
+    if user is None:
+        session.close()
+        return Promise.reject(CODE.NOT_FOUND, f"User {user_id} not found")
+    return Promise.resolve(UserExport(session, user, user_id, project_id))
@@ -7,8 +7,8 @@ import datetime
 import json
 import yaml
 import logging
-import tiktoken
 import dataclasses
+from functools import cache
 from dataclasses import dataclass, field
 from typing import Optional, Literal, Union
 from dotenv import load_dotenv
@@ -17,7 +17,12 @@ from datetime import timezone
 from typeguard import check_type
 import structlog
 from .types import UserProfileTopic
-from .struct_logger import ProjectStructLogger, configure_logger
+from .struct_logger import (
+    ProjectStructLogger,
+    LogSettings,
+    attach_handler,
+    configure_logger,
+)
 
 load_dotenv()
 
@@ -87,8 +92,18 @@ class Config:
     max_chat_blob_buffer_process_token_size: int = 16384
     max_profile_subtopics: int = 15
     max_pre_profile_token_size: int = 128
+    process_mode: Literal["standard", "fast"] = "standard"
+    fast_mode_max_token_size: int = 1024
+    stream_profile_extract: bool = False
+    stream_merge_batch_size: int = 4
     llm_tab_separator: str = "::"
     cache_user_profiles_ttl: int = 60 * 20  # 20 minutes
+    # with DATABASE_READ_URL, reads of a user stay on the primary this long after a write
+    read_your_writes_window_s: int = 10
+    # inserts check a local token allowance reconciled this often, 0 reads every time
+    billing_gate_refresh_s: int = 5
+    # with fewer tokens left than this, inserts always read the billing first
+    billing_gate_margin_tokens: int = 10000
 
     # LLM
     language: Literal["en", "zh"] = "en"
@@ -100,6 +115,10 @@ class Config:
     best_llm_model: str = "gpt-4o-mini"
     thinking_llm_model: str = "o4-mini"
     summary_llm_model: str = None
+    llm_cache_backend: Literal["none", "redis", "disk"] = "none"
+    llm_cache_ttl: int = 60 * 60 * 24 * 7  # 7 days
+    llm_cache_max_entries: int = 100000
+    llm_cache_dir: str = "./.llm_cache"
 
     enable_event_embedding: bool = True
     embedding_provider: Literal["openai", "jina"] = "openai"
@@ -108,6 +127,10 @@ class Config:
     embedding_dim: int = 1536
     embedding_model: str = "text-embedding-jina-embeddings-v4-text-retrieval"
     embedding_max_token_size: int = 8192
+    # "halfvec" stores event embeddings in float16, needs pgvector >= 0.7.0
+    embedding_storage: Literal["vector", "halfvec"] = "vector"
+    # "hybrid" fuses full-text and vector ranks, "lexical" skips the query embedding
+    event_search_mode: Literal["vector", "lexical", "hybrid"] = "vector"
 
     additional_user_profiles: list[dict] = field(default_factory=list)
     overwrite_user_profiles: Optional[list[dict]] = None
@@ -119,8 +142,32 @@ class Config:
 
     minimum_chats_token_size_for_event_summary: int = 256
     event_tags: list[dict] = field(default_factory=list)
+    # events older than this are rolled up and archived, None keeps them all
+    event_hot_retention_days: Optional[int] = None
+    event_compaction_period_days: int = 7
+    event_compaction_interval_s: int = 60 * 60 * 6
     # Telemetry
     telemetry_deployment_environment: str = "local"
+    # projects labelled by id in metrics, later projects are labelled "other"
+    telemetry_max_project_labels: int = 20
+    telemetry_project_allowlist: list[str] = field(default_factory=list)
+    # also export metrics to this OTLP/HTTP endpoint, with request_id exemplars
+    telemetry_otlp_endpoint: Optional[str] = None
+    telemetry_otlp_interval_s: int = 15
+    # append one JSON line per buffer flush with its stages to a daily file here
+    flush_trace_dir: Optional[str] = None
+
+    # Startup
+    # create tables and indexes on startup, turn off if deploys run
+    # `python -m memobase_server.migrate` instead
+    migrate_on_startup: bool = True
+    # "background" checks the LLM and embedding APIs after the server is ready
+    startup_sanity_check: Literal["blocking", "background", "off"] = "background"
+    # DB and Redis are probed in the background, `/healthcheck` reads the result
+    health_probe_interval_s: int = 10
+    # the LLM and embedding probes spend tokens, 0 turns them off
+    health_probe_providers_interval_s: int = 300
+    health_probe_timeout_s: int = 5
 
     @classmethod
     def _process_env_vars(cls, config_dict):
@@ -230,6 +277,7 @@ class ProfileConfig:
     language: Literal["en", "zh"] = None
     profile_strict_mode: bool | None = None
     profile_validate_mode: bool | None = None
+    process_mode: Literal["standard", "fast"] | None = None
     additional_user_profiles: list[dict] = field(default_factory=list)
     overwrite_user_profiles: Optional[list[dict]] = None
     event_theme_requirement: Optional[str] = None
@@ -239,6 +287,8 @@ class ProfileConfig:
     def __post_init__(self):
         if self.language not in ["en", "zh"]:
             self.language = None
+        if self.process_mode not in ["standard", "fast"]:
+            self.process_mode = None
         if self.additional_user_profiles:
             [UserProfileTopic(**up) for up in self.additional_user_profiles]
         if self.overwrite_user_profiles:
@@ -270,8 +320,9 @@ for _log in ["uvicorn", "uvicorn.error", "uvicorn.access"]:
     # logging.getLogger(_log).propagate = True
 
 log_format = os.getenv("LOG_FORMAT", "plain")
+log_settings = LogSettings.from_env()
 if log_format == "json":
-    configure_logger()
+    configure_logger(log_settings)
     logger = structlog.get_logger()
     LOG = logger.bind(app_name="memobase_server")
 else:
@@ -283,10 +334,15 @@ else:
     )
     handler = logging.StreamHandler()
     handler.setFormatter(formatter)
-    LOG.addHandler(handler)
+    attach_handler(LOG, handler, log_settings)
 
 
-ENCODER = tiktoken.encoding_for_model("gpt-4o")
+@cache
+def get_encoder() -> "tiktoken.Encoding":
+    # loading the BPE ranks takes a few hundred ms, only pay it on first use
+    import tiktoken
+
+    return tiktoken.encoding_for_model("gpt-4o")
 
 CONFIG = Config.load_config()
 
@@ -0,0 +1,101 @@
+"""
+Aggregate one day of buffer flush traces from `flush_trace_dir`.
+
+    python -m memobase_server.flush_report --date 2026-10-19
+
+Prints the wall time percentiles, LLM tokens and DB statements of each stage.
+Concurrent stages overlap, so their share of the flush time can sum above 100%.
+"""
+
+import json
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from .env import CONFIG
+from .telemetry.flush_trace import flush_trace_path
+
+COUNTERS = ["llm_calls", "llm_input_tokens", "llm_output_tokens", "db_statements"]
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def aggregate(records: list[dict]) -> dict:
+    stages = defaultdict(lambda: {"wall_ms": [], **{c: 0 for c in COUNTERS}})
+    for record in records:
+        for stage in record["stages"]:
+            stat = stages[stage["name"]]
+            stat["wall_ms"].append(stage["wall_ms"])
+            for c in COUNTERS:
+                stat[c] += stage[c]
+    total_ms = sum(record["wall_ms"] for record in records)
+    return {
+        "flushes": len(records),
+        "wall_ms_p50": percentile([r["wall_ms"] for r in records], 0.5),
+        "wall_ms_p95": percentile([r["wall_ms"] for r in records], 0.95),
+        "stages": {
+            name: {
+                "count": len(stat["wall_ms"]),
+                "wall_ms_p50": percentile(stat["wall_ms"], 0.5),
+                "wall_ms_p95": percentile(stat["wall_ms"], 0.95),
+                "wall_ms_max": max(stat["wall_ms"]),
+                "share": sum(stat["wall_ms"]) / total_ms if total_ms else 0,
+                **{c: stat[c] for c in COUNTERS},
+            }
+            for name, stat in sorted(
+                stages.items(), key=lambda item: -sum(item[1]["wall_ms"])
+            )
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--date",
+        default=datetime.now(timezone.utc).date().isoformat(),
+        help="the UTC day to read, default today",
+    )
+    parser.add_argument(
+        "--dir", default=CONFIG.flush_trace_dir, help="default `flush_trace_dir`"
+    )
+    parser.add_argument("--project", help="only the flushes of this project")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    if args.dir is None:
+        parser.error("set `flush_trace_dir` or pass --dir")
+
+    with open(flush_trace_path(args.date, args.dir)) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if args.project is not None:
+        records = [r for r in records if r["project_id"] == args.project]
+    if not records:
+        parser.exit(message=f"No flushes on {args.date}\n")
+    report = aggregate(records)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{report['flushes']} flushes on {args.date}, "
+        f"p50 {report['wall_ms_p50']:.0f}ms, p95 {report['wall_ms_p95']:.0f}ms"
+    )
+    print(
+        f"{'stage':<26}{'count':>7}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}"
+        f"{'share':>8}{'llm calls':>11}{'in tokens':>11}{'out tokens':>11}"
+        f"{'db stmts':>10}"
+    )
+    for name, stat in report["stages"].items():
+        print(
+            f"{name:<26}{stat['count']:>7}{stat['wall_ms_p50']:>10.1f}"
+            f"{stat['wall_ms_p95']:>10.1f}{stat['wall_ms_max']:>10.1f}"
+            f"{stat['share']:>8.0%}{stat['llm_calls']:>11}"
+            f"{stat['llm_input_tokens']:>11}{stat['llm_output_tokens']:>11}"
+            f"{stat['db_statements']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
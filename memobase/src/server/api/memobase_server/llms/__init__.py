@@ -1,5 +1,6 @@
 import asyncio
 import time
+from typing import AsyncIterator
 from ..prompts.utils import convert_response_to_json
 from ..utils import get_encoded_tokens
 from ..env import CONFIG, LOG
@@ -8,11 +9,15 @@ from ..models.utils import Promise
 from ..models.response import CODE
 from ..models.database import DEFAULT_PROJECT_ID
 from ..telemetry import telemetry_manager, CounterMetricName, HistogramMetricName
+from ..telemetry.flush_trace import record_llm_usage
 
-from .openai_model_llm import openai_complete
+from .openai_model_llm import openai_complete, openai_stream_complete
 from .doubao_cache_llm import doubao_cache_complete
+from .response_cache import get_response_cache, compute_cache_key
 
 FACTORIES = {"openai": openai_complete, "doubao_cache": doubao_cache_complete}
+# Styles without a streaming factory fall back to FACTORIES and yield once
+STREAM_FACTORIES = {"openai": openai_stream_complete}
 assert CONFIG.llm_style in FACTORIES, f"Unsupported LLM style: {CONFIG.llm_style}"
 
 
@@ -30,6 +35,21 @@ async def llm_complete(
     use_model = model or CONFIG.best_llm_model
     if json_mode:
         kwargs["response_format"] = {"type": "json_object"}
+
+    cache = None if kwargs.get("no_cache", None) else get_response_cache()
+    if cache is not None:
+        cache_key, cached = await _cache_lookup(
+            cache,
+            use_model,
+            prompt,
+            system_prompt,
+            history_messages,
+            max_tokens,
+            kwargs,
+        )
+        if cached is not None:
+            return _parse_results(cached, json_mode)
+
     try:
         start_time = time.time()
         results = await FACTORIES[CONFIG.llm_style](
@@ -45,6 +65,100 @@ async def llm_complete(
         LOG.error(f"Error in llm_complete: {e}")
         return Promise.reject(CODE.SERVICE_UNAVAILABLE, f"Error in llm_complete: {e}")
 
+    _record_usage(
+        project_id, prompt, system_prompt, history_messages, results, latency
+    )
+
+    parsed = _parse_results(results, json_mode)
+    if cache is not None and parsed.ok():
+        # only well-formed responses are cached, a bad one should be retried
+        await _cache_set(cache, cache_key, results)
+    return parsed
+
+
+async def llm_stream_complete(
+    project_id,
+    prompt,
+    system_prompt=None,
+    history_messages=[],
+    model=None,
+    max_tokens=1024,
+    **kwargs,
+) -> AsyncIterator[str]:
+    """Yield the completion line by line as soon as each line is finished.
+
+    Same accounting and caching as `llm_complete`, but errors are raised
+    instead of returned, since part of the lines may be consumed already.
+    """
+    use_model = model or CONFIG.best_llm_model
+    cache = None if kwargs.get("no_cache", None) else get_response_cache()
+    if cache is not None:
+        cache_key, cached = await _cache_lookup(
+            cache,
+            use_model,
+            prompt,
+            system_prompt,
+            history_messages,
+            max_tokens,
+            kwargs,
+        )
+        if cached is not None:
+            for line in cached.split("\n"):
+                yield line
+            return
+
+    start_time = time.time()
+    if CONFIG.llm_style in STREAM_FACTORIES:
+        deltas = STREAM_FACTORIES[CONFIG.llm_style](
+            use_model,
+            prompt,
+            system_prompt=system_prompt,
+            history_messages=history_messages,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+    else:
+        deltas = _single_delta(
+            use_model,
+            prompt,
+            system_prompt=system_prompt,
+            history_messages=history_messages,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+    chunks = []
+    pending = ""
+    try:
+        async for delta in deltas:
+            chunks.append(delta)
+            pending += delta
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line
+    except Exception as e:
+        LOG.error(f"Error in llm_stream_complete: {e}")
+        raise
+    latency = (time.time() - start_time) * 1000
+    yield pending
+
+    results = "".join(chunks)
+    _record_usage(project_id, prompt, system_prompt, history_messages, results, latency)
+    if cache is not None:
+        await _cache_set(cache, cache_key, results)
+
+
+async def _single_delta(*args, **kwargs) -> AsyncIterator[str]:
+    yield await FACTORIES[CONFIG.llm_style](*args, **kwargs)
+
+
+def _record_usage(
+    project_id,
+    prompt: str,
+    system_prompt: str | None,
+    history_messages: list,
+    results: str,
+    latency: float,
+):
     in_tokens = len(
         get_encoded_tokens(
             prompt
@@ -53,6 +167,7 @@ async def llm_complete(
         )
     )
     out_tokens = len(get_encoded_tokens(results))
+    record_llm_usage(in_tokens, out_tokens)
 
     # await project_cost_token_billing(project_id, in_tokens, out_tokens)
     asyncio.create_task(project_cost_token_billing(project_id, in_tokens, out_tokens))
@@ -78,6 +193,8 @@ async def llm_complete(
         {"project_id": project_id},
     )
 
+
+def _parse_results(results: str, json_mode: bool) -> Promise[str | dict]:
     if not json_mode:
         return Promise.resolve(results)
     parse_dict = convert_response_to_json(results)
@@ -89,9 +206,57 @@ async def llm_complete(
         )
 
 
+async def _cache_lookup(
+    cache,
+    model: str,
+    prompt: str,
+    system_prompt: str | None,
+    history_messages: list,
+    max_tokens: int,
+    kwargs: dict,
+) -> tuple[str, str | None]:
+    sampling_kwargs = {
+        k: v for k, v in kwargs.items() if k not in ("prompt_id", "no_cache")
+    }
+    sampling_kwargs["max_tokens"] = max_tokens
+    cache_key = compute_cache_key(
+        model,
+        prompt,
+        system_prompt=system_prompt,
+        history_messages=history_messages,
+        kwargs=sampling_kwargs,
+    )
+    cached = await _cache_get(cache, cache_key)
+    telemetry_manager.increment_counter_metric(
+        (
+            CounterMetricName.LLM_CACHE_HITS
+            if cached is not None
+            else CounterMetricName.LLM_CACHE_MISSES
+        ),
+        1,
+        {"prompt_id": str(kwargs.get("prompt_id", None))},
+    )
+    return cache_key, cached
+
+
+async def _cache_get(cache, cache_key: str) -> str | None:
+    try:
+        return await cache.get(cache_key)
+    except Exception as e:
+        LOG.warning(f"LLM response cache read failed: {e}")
+        return None
+
+
+async def _cache_set(cache, cache_key: str, results: str):
+    try:
+        await cache.set(cache_key, results)
+    except Exception as e:
+        LOG.warning(f"LLM response cache write failed: {e}")
+
+
 async def llm_sanity_check():
     r = await llm_complete(
-        DEFAULT_PROJECT_ID, "Test", max_tokens=1, prompt_id="__test__"
+        DEFAULT_PROJECT_ID, "Test", max_tokens=1, prompt_id="__test__", no_cache=True
     )
     if not r.ok():
         raise ValueError(f"LLM sanity check failed: {r.msg()}")
@@ -1,15 +1,21 @@
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING
 from httpx import AsyncClient
 from ...env import CONFIG
 
+# the SDK takes most of the import time, load it with the first client
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 _global_openai_async_client = None
 _global_jina_async_client = None
 _global_lmstudio_async_client = None
 
 
-def get_openai_async_client_instance() -> AsyncOpenAI:
+def get_openai_async_client_instance() -> "AsyncOpenAI":
     global _global_openai_async_client
     if _global_openai_async_client is None:
+        from openai import AsyncOpenAI
+
         _global_openai_async_client = AsyncOpenAI(
             base_url=CONFIG.embedding_base_url,
             api_key=CONFIG.embedding_api_key,
@@ -1,3 +1,4 @@
+from typing import AsyncIterator
 from .utils import exclude_special_kwargs, get_openai_async_client_instance
 from ..env import LOG
 
@@ -23,3 +24,36 @@ async def openai_complete(
         f"Cached {prompt_id} {model} {cached_tokens}/{response.usage.prompt_tokens}"
     )
     return response.choices[0].message.content
+
+
+async def openai_stream_complete(
+    model, prompt, system_prompt=None, history_messages=[], **kwargs
+) -> AsyncIterator[str]:
+    sp_args, kwargs = exclude_special_kwargs(kwargs)
+    prompt_id = sp_args.get("prompt_id", None)
+
+    openai_async_client = get_openai_async_client_instance()
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history_messages)
+    messages.append({"role": "user", "content": prompt})
+
+    response = await openai_async_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        timeout=120,
+        stream=True,
+        stream_options={"include_usage": True},
+        **kwargs,
+    )
+    async for chunk in response:
+        if chunk.usage is not None:
+            cached_tokens = getattr(
+                chunk.usage.prompt_tokens_details, "cached_tokens", None
+            )
+            LOG.info(
+                f"Cached {prompt_id} {model} {cached_tokens}/{chunk.usage.prompt_tokens}"
+            )
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
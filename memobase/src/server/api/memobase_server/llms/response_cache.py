@@ -0,0 +1,146 @@
+"""
+Provider-agnostic cache of LLM completions.
+
+A completion is keyed by (model, system prompt hash, prompt hash, history hash,
+sampling kwargs), so retries of failed buffers and benchmark reruns reuse the
+previous answer instead of paying for another round trip.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Optional
+from ..connectors import get_redis_client
+from ..env import CONFIG, LOG
+
+CACHE_PREFIX = "memobase::llm_cache"
+# Evict once the disk cache grows this far over the limit, so eviction is amortized
+DISK_EVICT_SLACK = 0.1
+
+
+def _hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def compute_cache_key(
+    model: str,
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    history_messages: list = [],
+    kwargs: dict = {},
+) -> str:
+    parts = [
+        model,
+        _hash(system_prompt or ""),
+        _hash(prompt),
+        _hash(json.dumps(history_messages, sort_keys=True, ensure_ascii=False)),
+        _hash(json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)),
+    ]
+    return _hash("::".join(parts))
+
+
+class RedisResponseCache:
+    """Entries expire by TTL; an insertion-ordered sorted set bounds the entry count."""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.index_key = f"{CACHE_PREFIX}::index"
+
+    async def get(self, key: str) -> Optional[str]:
+        async with get_redis_client() as redis_client:
+            return await redis_client.get(f"{CACHE_PREFIX}::{key}")
+
+    async def set(self, key: str, response: str):
+        async with get_redis_client() as redis_client:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(f"{CACHE_PREFIX}::{key}", response, ex=self.ttl)
+                pipe.zadd(self.index_key, {key: time.time()})
+                pipe.zcard(self.index_key)
+                *_, size = await pipe.execute()
+            if size > self.max_entries:
+                evicted = await redis_client.zrange(
+                    self.index_key, 0, size - self.max_entries - 1
+                )
+                if evicted:
+                    await redis_client.delete(
+                        *[f"{CACHE_PREFIX}::{k}" for k in evicted]
+                    )
+                    await redis_client.zrem(self.index_key, *evicted)
+
+
+class DiskResponseCache:
+    """One JSON file per entry; the oldest files are removed when over `max_entries`."""
+
+    def __init__(self, cache_dir: str, ttl: int, max_entries: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+        self._entries = len(os.listdir(cache_dir))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                return json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _set(self, key: str, response: str):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"response": response}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._entries += 1
+        if self._entries > self.max_entries * (1 + DISK_EVICT_SLACK):
+            self._evict()
+
+    def _evict(self):
+        files = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".json")
+        ]
+        files.sort(key=os.path.getmtime)
+        for path in files[: max(len(files) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._entries = min(len(files), self.max_entries)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, response: str):
+        await asyncio.to_thread(self._set, key, response)
+
+
+_response_cache = None
+
+
+def get_response_cache() -> Optional[RedisResponseCache | DiskResponseCache]:
+    global _response_cache
+    if CONFIG.llm_cache_backend == "none":
+        return None
+    if _response_cache is None:
+        if CONFIG.llm_cache_backend == "redis":
+            _response_cache = RedisResponseCache(
+                CONFIG.llm_cache_ttl, CONFIG.llm_cache_max_entries
+            )
+        else:
+            _response_cache = DiskResponseCache(
+                CONFIG.llm_cache_dir, CONFIG.llm_cache_ttl, CONFIG.llm_cache_max_entries
+            )
+        LOG.info(f"LLM response cache enabled: {CONFIG.llm_cache_backend}")
+    return _response_cache
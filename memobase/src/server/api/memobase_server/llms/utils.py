@@ -1,14 +1,20 @@
-from openai import AsyncOpenAI
-from volcenginesdkarkruntime import AsyncArk
+from typing import TYPE_CHECKING
 from ..env import CONFIG
 
+# the SDKs take most of the import time, load them with the first client
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from volcenginesdkarkruntime import AsyncArk
+
 _global_openai_async_client = None
 _global_doubao_async_client = None
 
 
-def get_openai_async_client_instance() -> AsyncOpenAI:
+def get_openai_async_client_instance() -> "AsyncOpenAI":
     global _global_openai_async_client
     if _global_openai_async_client is None:
+        from openai import AsyncOpenAI
+
         _global_openai_async_client = AsyncOpenAI(
             base_url="https://api.zhizengzeng.com/v1",
             api_key=CONFIG.llm_api_key,
@@ -18,10 +24,12 @@ def get_openai_async_client_instance() -> AsyncOpenAI:
     return _global_openai_async_client
 
 
-def get_doubao_async_client_instance() -> AsyncArk:
+def get_doubao_async_client_instance() -> "AsyncArk":
     global _global_doubao_async_client
 
     if _global_doubao_async_client is None:
+        from volcenginesdkarkruntime import AsyncArk
+
         _global_doubao_async_client = AsyncArk(api_key=CONFIG.llm_api_key)
     return _global_doubao_async_client
 
@@ -30,3 +38,11 @@ def exclude_special_kwargs(kwargs: dict):
     prompt_id = kwargs.pop("prompt_id", None)
     no_cache = kwargs.pop("no_cache", None)
     return {"prompt_id": prompt_id, "no_cache": no_cache}, kwargs
+
+
+def preload_sdks():
+    """Import the SDKs of the configured providers ahead of their first call"""
+    import openai  # noqa: F401
+
+    if CONFIG.llm_style == "doubao_cache":
+        import volcenginesdkarkruntime  # noqa: F401
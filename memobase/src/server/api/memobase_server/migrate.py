@@ -0,0 +1,59 @@
+"""
+Create the database tables and indexes of this version.
+
+    python -m memobase_server.migrate
+    MEMOBASE_EMBEDDING_STORAGE=halfvec python -m memobase_server.migrate --embedding-storage
+
+Run it once per deploy and set `migrate_on_startup: false`, so server workers
+start without DDL. Indexes added to existing tables are built concurrently,
+servers keep writing meanwhile. `--embedding-storage` first converts the event embedding
+columns to `embedding_storage`, which rewrites the tables under an exclusive
+lock, stop the servers before running it. `--recount-users` recomputes the
+profile and event counters of every user, after writes by older versions.
+"""
+
+import argparse
+from .env import CONFIG, LOG
+from .connectors import Session, create_tables
+from .models.database import (
+    UserEvent,
+    UserEventGist,
+    migrate_embedding_storage,
+    recount_user_counters,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--embedding-storage",
+        action="store_true",
+        help="convert the event embedding columns to `embedding_storage`",
+    )
+    parser.add_argument(
+        "--recount-users",
+        action="store_true",
+        help="recompute the profile and event counters of all users",
+    )
+    args = parser.parse_args()
+
+    if args.embedding_storage:
+        with Session() as session:
+            for table in [UserEvent, UserEventGist]:
+                # tables missing on a fresh database are left to `create_tables`
+                if not migrate_embedding_storage(table, session):
+                    LOG.info(
+                        f"`{table.__tablename__}.embedding` needs no conversion to "
+                        f"{CONFIG.embedding_storage}"
+                    )
+            session.commit()
+    create_tables(build_indexes=True)
+    if args.recount_users:
+        with Session() as session:
+            users = recount_user_counters(session)
+            session.commit()
+        LOG.info(f"Recounted the profiles and events of {users} users")
+
+
+if __name__ == "__main__":
+    main()
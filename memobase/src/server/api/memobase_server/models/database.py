@@ -4,6 +4,9 @@ from typing import Optional
 from datetime import datetime
 from sqlalchemy import (
     text,
+    literal_column,
+    select,
+    update,
     VARCHAR,
     Integer,
     ForeignKey,
@@ -37,11 +40,15 @@ from ..env import (
     BufferStatus,
 )
 from sqlalchemy.orm.attributes import get_history
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC
 
 REG = registry()
 DEFAULT_PROJECT_ID = "__root__"
 DEFAULT_PROJECT_SECRET = "__root__"
+# full-text index expression of gist contents, lexical searches must match it
+GIST_CONTENT_TSVECTOR = "to_tsvector('english'::regconfig, gist_data ->> 'content')"
+# GIN (jsonb_path_ops) index expression of event tags, tag filters must match it
+EVENT_TAGS_JSONB = "(event_data -> 'event_tags')"
 
 
 def next_month_first_day() -> datetime:
@@ -53,6 +60,75 @@ def next_month_first_day() -> datetime:
     return datetime(today.year, today.month + 1, 1)
 
 
+def embedding_column_type() -> Vector | HALFVEC:
+    if CONFIG.embedding_storage == "halfvec":
+        return HALFVEC(dim=CONFIG.embedding_dim)
+    return Vector(dim=CONFIG.embedding_dim)
+
+
+def check_embedding_storage_supported(session):
+    if CONFIG.embedding_storage == "vector":
+        return
+    supported = session.execute(
+        text("SELECT 1 FROM pg_type WHERE typname = :storage"),
+        {"storage": CONFIG.embedding_storage},
+    ).scalar()
+    if supported is None:
+        raise ValueError(
+            f"embedding_storage `{CONFIG.embedding_storage}` needs pgvector >= 0.7.0, "
+            "run `ALTER EXTENSION vector UPDATE` first"
+        )
+
+
+def get_embedding_storage(cls, session) -> Optional[str]:
+    return session.execute(
+        text(
+            """
+        SELECT pg_type.typname
+        FROM pg_attribute
+        JOIN pg_class ON pg_attribute.attrelid = pg_class.oid
+        JOIN pg_namespace ON pg_class.relnamespace = pg_namespace.oid
+        JOIN pg_type ON pg_attribute.atttypid = pg_type.oid
+        WHERE pg_class.relname = :table_name
+        AND pg_attribute.attname = 'embedding'
+        AND pg_namespace.nspname = current_schema();
+        """
+        ),
+        {"table_name": cls.__tablename__},
+    ).scalar()
+
+
+def check_embedding_storage(cls, session):
+    actual_storage = get_embedding_storage(cls, session)
+    if actual_storage != CONFIG.embedding_storage:
+        raise ValueError(
+            f"Configuration embedding storage ({CONFIG.embedding_storage}) "
+            f"does not match database storage ({actual_storage}) of `{cls.__tablename__}`. "
+            "Run `python -m memobase_server.migrate --embedding-storage` to convert it."
+        )
+
+
+def migrate_embedding_storage(cls, session) -> bool:
+    """Convert the `embedding` column of `cls` to `CONFIG.embedding_storage`.
+
+    Rewrites the whole table under an exclusive lock, so run it in a
+    maintenance window. Returns False if the column is already converted or
+    the table does not exist yet, `create_tables` creates it with the storage.
+    """
+    if get_embedding_storage(cls, session) in (None, CONFIG.embedding_storage):
+        return False
+    check_embedding_storage_supported(session)
+    column_type = f"{CONFIG.embedding_storage}({CONFIG.embedding_dim})"
+    session.execute(
+        text(
+            f"ALTER TABLE {cls.__tablename__} ALTER COLUMN embedding "
+            f"TYPE {column_type} USING embedding::{column_type}"
+        )
+    )
+    LOG.info(f"Converted `{cls.__tablename__}.embedding` to {column_type}")
+    return True
+
+
 def check_legal_embedding_dim(cls, session):
     try:
         # Use table_name from the ORM class to avoid hardcoding
@@ -276,11 +352,43 @@ class User(Base):
         "Project", back_populates="related_users", init=False, foreign_keys=[project_id]
     )
 
+    # Counters of `user_profiles` and `user_events` rows, kept by `adjust_counters`
+    profile_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0"), default=0, init=False
+    )
+    event_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0"), default=0, init=False
+    )
+
     __table_args__ = (
         PrimaryKeyConstraint("id", "project_id"),
         Index("idx_users_id_project_id", "id", "project_id"),
+        Index("idx_users_project_id_updated_at_id", "project_id", "updated_at", "id"),
+        Index(
+            "idx_users_project_id_profile_count_id", "project_id", "profile_count", "id"
+        ),
+        Index("idx_users_project_id_event_count_id", "project_id", "event_count", "id"),
     )
 
+    @classmethod
+    def adjust_counters(
+        cls, session, user_id, project_id: str, profiles: int = 0, events: int = 0
+    ):
+        """Add to the counters of a user, in the transaction of `session`."""
+        if not profiles and not events:
+            return
+        session.execute(
+            update(cls)
+            .where(cls.id == user_id, cls.project_id == project_id)
+            .values(
+                profile_count=cls.profile_count + profiles,
+                event_count=cls.event_count + events,
+                # counters are not user data, don't bump `updated_at`
+                updated_at=cls.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
 
 @REG.mapped_as_dataclass
 class GeneralBlob(Base):
@@ -325,6 +433,14 @@ class GeneralBlob(Base):
         Index(
             "idx_general_blobs_user_id_blob_type", "user_id", "project_id", "blob_type"
         ),
+        Index(
+            "idx_general_blobs_user_id_blob_type_created_at_id",
+            "user_id",
+            "project_id",
+            "blob_type",
+            "created_at",
+            "id",
+        ),
         Index("idx_general_blobs_id_project_id", "id", "project_id", unique=True),
         ForeignKeyConstraint(
             ["user_id", "project_id"],
@@ -482,7 +598,7 @@ class UserEvent(Base):
     )
 
     embedding: Mapped[Vector] = mapped_column(
-        Vector(dim=CONFIG.embedding_dim), nullable=True, default=None
+        embedding_column_type(), nullable=True, default=None
     )
 
     related_user_event_gists: Mapped[list["UserEventGist"]] = relationship(
@@ -497,6 +613,12 @@ class UserEvent(Base):
         PrimaryKeyConstraint("id", "project_id"),
         Index("idx_user_events_user_id_project_id", "user_id", "project_id"),
         Index("idx_user_events_user_id_id_project_id", "user_id", "project_id", "id"),
+        Index(
+            "idx_user_events_event_tags",
+            literal_column(EVENT_TAGS_JSONB).label("event_tags"),
+            postgresql_using="gin",
+            postgresql_ops={"event_tags": "jsonb_path_ops"},
+        ),
         ForeignKeyConstraint(
             ["user_id", "project_id"],
             ["users.id", "users.project_id"],
@@ -508,6 +630,7 @@ class UserEvent(Base):
     @classmethod
     def check_legal_embedding_dim(cls, session):
         check_legal_embedding_dim(cls, session)
+        check_embedding_storage(cls, session)
         LOG.info("UserEvent embedding dimension checked")
 
 
@@ -551,7 +674,7 @@ class UserEventGist(Base):
     )
 
     embedding: Mapped[Vector] = mapped_column(
-        Vector(dim=CONFIG.embedding_dim), nullable=True, default=None
+        embedding_column_type(), nullable=True, default=None
     )
 
     __table_args__ = (
@@ -566,6 +689,11 @@ class UserEventGist(Base):
             "project_id",
             "event_id",
         ),
+        Index(
+            "idx_user_event_gists_content_tsv",
+            text(GIST_CONTENT_TSVECTOR),
+            postgresql_using="gin",
+        ),
         ForeignKeyConstraint(
             ["user_id", "project_id"],
             ["users.id", "users.project_id"],
@@ -583,9 +711,87 @@ class UserEventGist(Base):
     @classmethod
     def check_legal_embedding_dim(cls, session):
         check_legal_embedding_dim(cls, session)
+        check_embedding_storage(cls, session)
         LOG.info("UserEventGist embedding dimension checked")
 
 
+@REG.mapped_as_dataclass
+class UserEventArchive(Base):
+    """Cold `user_events` rows, without embeddings, partitioned by month"""
+
+    __tablename__ = "user_events_archive"
+
+    event_data: Mapped[dict] = mapped_column(JSONB)
+
+    user_id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False,
+    )
+
+    project_id: Mapped[str] = mapped_column(
+        VARCHAR(64),
+        default=DEFAULT_PROJECT_ID,
+    )
+
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "project_id", "created_at"),
+        Index(
+            "idx_user_events_archive_user_id_project_id_created_at",
+            "user_id",
+            "project_id",
+            "created_at",
+        ),
+        ForeignKeyConstraint(
+            ["user_id", "project_id"],
+            ["users.id", "users.project_id"],
+            ondelete="CASCADE",
+            onupdate="CASCADE",
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+@REG.mapped_as_dataclass
+class UserEventGistArchive(Base):
+    """Cold `user_event_gists` rows, without embeddings, partitioned by month"""
+
+    __tablename__ = "user_event_gists_archive"
+
+    gist_data: Mapped[dict] = mapped_column(JSONB)
+
+    event_id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False,
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False,
+    )
+
+    project_id: Mapped[str] = mapped_column(
+        VARCHAR(64),
+        default=DEFAULT_PROJECT_ID,
+    )
+
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "project_id", "created_at"),
+        Index(
+            "idx_user_event_gists_archive_user_id_project_id_created_at",
+            "user_id",
+            "project_id",
+            "created_at",
+        ),
+        ForeignKeyConstraint(
+            ["user_id", "project_id"],
+            ["users.id", "users.project_id"],
+            ondelete="CASCADE",
+            onupdate="CASCADE",
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
 @REG.mapped_as_dataclass
 class UserStatus(Base):
     __tablename__ = "user_statuses"
@@ -628,6 +834,57 @@ class UserStatus(Base):
     )
 
 
+def recount_user_counters(session, project_id: Optional[str] = None) -> int:
+    """Recompute `User.profile_count` and `User.event_count` from the tables."""
+    profile_count = (
+        select(func.count(UserProfile.id))
+        .where(
+            UserProfile.user_id == User.id, UserProfile.project_id == User.project_id
+        )
+        .scalar_subquery()
+    )
+    event_count = (
+        select(func.count(UserEvent.id))
+        .where(UserEvent.user_id == User.id, UserEvent.project_id == User.project_id)
+        .scalar_subquery()
+    )
+    query = update(User).values(
+        profile_count=profile_count,
+        event_count=event_count,
+        updated_at=User.updated_at,
+    )
+    if project_id is not None:
+        query = query.where(User.project_id == project_id)
+    return session.execute(
+        query.execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def migrate_user_counters(session) -> bool:
+    """Add and fill the user counter columns if the `users` table predates them.
+
+    Returns False if the columns already exist.
+    """
+    exists = session.execute(
+        text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'users' AND column_name = 'event_count'"
+        )
+    ).first()
+    if exists:
+        return False
+    session.execute(
+        text(
+            "ALTER TABLE users "
+            "ADD COLUMN IF NOT EXISTS profile_count integer NOT NULL DEFAULT 0, "
+            "ADD COLUMN IF NOT EXISTS event_count integer NOT NULL DEFAULT 0"
+        )
+    )
+    users = recount_user_counters(session)
+    LOG.info(f"Added user counter columns, counted {users} users")
+    return True
+
+
 # Modify event listeners to allow root project initialization
 @event.listens_for(Project, "before_insert")
 def prevent_insert(mapper, connection, target):
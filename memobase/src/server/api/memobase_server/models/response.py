@@ -48,6 +48,18 @@ class IdData(BaseModel):
 
 class IdsData(BaseModel):
     ids: list[UUID] = Field(..., description="List of UUID identifiers")
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to get the next page, null on the last page"
+    )
+
+
+class FlushStageData(BaseModel):
+    name: str = Field(..., description="The flush stage")
+    wall_ms: float = Field(0, description="Wall time of the stage in milliseconds")
+    llm_calls: int = Field(0, description="LLM calls made in the stage")
+    llm_input_tokens: int = Field(0, description="LLM input tokens of the stage")
+    llm_output_tokens: int = Field(0, description="LLM output tokens of the stage")
+    db_statements: int = Field(0, description="Database statements of the stage")
 
 
 class ChatModalResponse(BaseModel):
@@ -61,6 +73,10 @@ class ChatModalResponse(BaseModel):
     delete_profiles: Optional[list[UUID]] = Field(
         ..., description="List of deleted profiles' ids"
     )
+    stages: Optional[list[FlushStageData]] = Field(
+        None,
+        description="Stages of the flush in start order, a stage's usage excludes its nested stages",
+    )
 
 
 class ProfileAttributes(BaseModel):
@@ -203,6 +219,24 @@ class UserStatusesData(BaseModel):
     statuses: list[UserStatusData] = Field(..., description="List of user statuses")
 
 
+class ProbeData(BaseModel):
+    ok: bool = Field(..., description="Whether the last probe passed")
+    latency_ms: float = Field(..., description="Duration of the last probe")
+    checked_at: datetime = Field(..., description="When the last probe ran")
+    error: Optional[str] = Field(None, description="Why the last probe failed")
+
+
+class ReadinessData(BaseModel):
+    ready: bool = Field(..., description="Whether the DB and Redis probes pass")
+    probes: dict[str, ProbeData] = Field(
+        ..., description="The last probe of DB, Redis and the LLM/embedding APIs"
+    )
+    db_pool: dict = Field(..., description="Connection pool status of the database")
+    read_db_pool: Optional[dict] = Field(
+        None, description="Connection pool status of the read replica"
+    )
+
+
 class ProactiveTopicData(BaseModel):
     action: Literal["new_topic", "continue"] = Field(
         ..., description="The action to take"
@@ -211,6 +245,10 @@ class ProactiveTopicData(BaseModel):
         None,
         description="The topic prompt, insert it to your latest user message or system prompt",
     )
+    latency_ms: Optional[dict[str, float]] = Field(
+        None,
+        description="Milliseconds spent in each stage, prefetched stages overlap `detect_interest`",
+    )
 
 
 class ProactiveTopicRequest(BaseModel):
@@ -230,7 +268,12 @@ class UserContextImport(BaseModel):
 
 class ProjectUsersData(BaseModel):
     users: list = Field(..., description="The user list")
-    count: int = Field(0, description="The user count")
+    count: Optional[int] = Field(
+        0, description="The user count, null on pages requested with a cursor"
+    )
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to get the next page, null on the last page"
+    )
 
 
 class DailyUsage(BaseModel):
@@ -342,3 +385,9 @@ class UsageResponse(BaseResponse):
     data: Optional[list[DailyUsage]] = Field(
         None, description="Response containing the daily usage"
     )
+
+
+class ReadinessResponse(BaseResponse):
+    data: Optional[ReadinessData] = Field(
+        None, description="Response containing the probe results"
+    )
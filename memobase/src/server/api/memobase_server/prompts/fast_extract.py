@@ -0,0 +1,101 @@
+import json
+from ..env import CONFIG
+
+ADD_KWARGS = {
+    "prompt_id": "fast_extract",
+}
+EXAMPLE_OUTPUT = {
+    "summary": "- Jack mentioned he works as a software engineer in Memobase. [mention 2023/1/23] // info\n- Jack plans to go the gym. [mention 2023/1/23, plan in 2023/1/24] // schedule",
+    "facts": [
+        {"topic": "work", "sub_topic": "title", "memo": "software engineer"},
+        {"topic": "work", "sub_topic": "company", "memo": "Memobase"},
+        {
+            "topic": "life_event",
+            "sub_topic": "fitness",
+            "memo": "plans to go to the gym [plan in 2023/1/24]",
+        },
+    ],
+    "event_tags": [{"tag": "goals", "value": "go to the gym"}],
+}
+
+FAST_EXTRACT_PROMPT = """You are a expert of logging personal info, schedule, events from chats.
+You will be given a short chat between a user and an assistant, do three things in one pass:
+1. summary: log all possible user info, schedule and events in the chats.
+2. facts: extract the important profiles of user in structured format.
+3. event_tags: fill the values of the event tags mentioned in the chats.
+
+## Requirement
+- {additional_requirements}
+- If the user event/schedule has specific mention time or event happen time, convert the date info in the message based on [TIME]. for example
+    Input: `[2024/04/30] user: I bought a new car yesterday!`
+    Output: `user bought a new car. [mention 2024/04/30, buy car in 2024/04/29]`
+    Input: `[...] user: I bought a new car last week!`
+    Output: `user bought a new car.`
+    Explain: because you don't know the exact date, so don't attach any date.
+- Only extract facts about the user, don't create a topic for other people mentioned in the chats.
+- Only extract the attributes with actual values, if the user does not provide any value, do not extract it.
+- Place all content related to one topic/sub_topic in one fact, no repeat.
+
+### Topics
+Below is the topics/subtopics you should focus on when extracting facts:
+<topics>
+{topics}
+</topics>
+Consider using the same topic/subtopic as the already logged profiles if it's mentioned again.
+
+### Event Tags
+Below is the event tags you should fill, each line is the tag name and its description(if any):
+<event_tags>
+{event_tags}
+</event_tags>
+Strick to the exact tag name, if some tags are not mentioned in the chats, don't include them.
+
+## Input Format
+### Already Logged
+Previous logging result in Profile-format:
+- TOPIC{separator}SUBTOPIC{separator}CONTENT... // maybe truncated
+
+### Input Chats
+- [TIME] NAME: MESSAGE
+where NAME is ALIAS(ROLE) or just ROLE, TIME is the time of this message happened.
+
+## Output Format
+Return a JSON object with the keys `summary`, `facts` and `event_tags`, for example:
+```json
+{example}
+```
+Return empty lists if nothing can be extracted, and an empty `summary` if the chats contain no user info.
+
+Now perform your task.
+"""
+
+
+def pack_input(already_logged_str: str, chat_strs: str, strict_mode: bool = False):
+    header = ""
+    if strict_mode:
+        header = "Don't extract topics/subtopics that are not mentioned in ### Topics, otherwise your answer is invalid!\n"
+    return f"""{header}### Already Logged
+{already_logged_str}
+### Input Chats
+{chat_strs}
+"""
+
+
+def get_prompt(
+    topic_examples: str, event_tags: str, additional_requirements: str = ""
+) -> str:
+    return FAST_EXTRACT_PROMPT.format(
+        topics=topic_examples,
+        event_tags=event_tags or "(no event tags)",
+        additional_requirements=additional_requirements,
+        separator=CONFIG.llm_tab_separator,
+        example=json.dumps(EXAMPLE_OUTPUT, indent=2, ensure_ascii=False),
+    )
+
+
+def get_kwargs() -> dict:
+    return ADD_KWARGS
+
+
+if __name__ == "__main__":
+    print(get_prompt("- work\n  - title", "- goals(the user's goals)"))
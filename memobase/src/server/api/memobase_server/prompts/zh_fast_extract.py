@@ -0,0 +1,101 @@
+import json
+from ..env import CONFIG
+
+ADD_KWARGS = {
+    "prompt_id": "zh_fast_extract",
+}
+EXAMPLE_OUTPUT = {
+    "summary": "- Jack提到他在Memobase工作，是一名软件工程师。[提及于 2023/1/23] // info\n- Jack计划去健身房。[提及于 2023/1/23，计划定在 2023/1/24] // schedule",
+    "facts": [
+        {"topic": "工作", "sub_topic": "职位", "memo": "软件工程师"},
+        {"topic": "工作", "sub_topic": "公司", "memo": "Memobase"},
+        {
+            "topic": "生活事件",
+            "sub_topic": "健身",
+            "memo": "计划去健身房[计划定在 2023/1/24]",
+        },
+    ],
+    "event_tags": [{"tag": "goals", "value": "去健身房"}],
+}
+
+FAST_EXTRACT_PROMPT = """你是一位从聊天记录中记录个人信息、日程安排和事件的专家。
+你将获得用户和助手之间的一段简短对话，请一次性完成三件事：
+1. summary: 记录对话中所有的用户信息、日程安排和事件。
+2. facts: 以结构化格式提取用户的重要画像。
+3. event_tags: 填写对话中提及的事件标签的值。
+
+## 要求
+- {additional_requirements}
+- 如果用户事件/日程有具体的提及时间或者事件发生的时间，根据消息中的[TIME]补充相关的时间信息。例如：
+    输入: `[2024/04/30] user: 我昨天买了一辆新车！`
+    输出: `用户买了一辆新车[提及于 2024/04/30, 买车在2024/04/29]。`
+    输入: `[...] user: 我上周买了一辆新车！`
+    输出: `用户买了一辆新车。`
+    说明: 因为你不知道具体日期，所以不要附加任何日期。
+- 只提取关于用户本人的信息，不要为对话中提到的其他人创建主题。
+- 只提取有实际值的属性，如果用户没有提供任何值，不要提取。
+- 同一个主题/子主题的内容放在同一条fact中，不要重复。
+
+### 主题
+以下是你提取facts时应关注的主题/子主题：
+<topics>
+{topics}
+</topics>
+如果已记录的画像再次被提及，请使用相同的主题/子主题。
+
+### 事件标签
+以下是你需要填写的事件标签，每行是标签名及其描述（如有）：
+<event_tags>
+{event_tags}
+</event_tags>
+严格使用标签名，对话中未提及的标签不要包含在结果中。
+
+## 输入格式
+### 已记录
+已记录信息的组织形式如下:
+- TOPIC{separator}SUBTOPIC{separator}CONTENT... // maybe truncated
+
+### 输入对话
+- [TIME] NAME: MESSAGE
+其中NAME是ALIAS(ROLE)或仅ROLE，TIME是此消息发生的时间。
+
+## 输出格式
+返回一个包含 `summary`、`facts` 和 `event_tags` 三个键的JSON对象，例如：
+```json
+{example}
+```
+如果没有可提取的内容，返回空列表；如果对话中没有用户信息，`summary` 返回空字符串。
+
+现在请执行你的任务。
+"""
+
+
+def pack_input(already_logged_str: str, chat_strs: str, strict_mode: bool = False):
+    header = ""
+    if strict_mode:
+        header = "不要提取 ### 主题 中没有提到的主题/子主题，否则你的回答是无效的！\n"
+    return f"""{header}### 已记录
+{already_logged_str}
+### 输入对话
+{chat_strs}
+"""
+
+
+def get_prompt(
+    topic_examples: str, event_tags: str, additional_requirements: str = ""
+) -> str:
+    return FAST_EXTRACT_PROMPT.format(
+        topics=topic_examples,
+        event_tags=event_tags or "（无事件标签）",
+        additional_requirements=additional_requirements,
+        separator=CONFIG.llm_tab_separator,
+        example=json.dumps(EXAMPLE_OUTPUT, indent=2, ensure_ascii=False),
+    )
+
+
+def get_kwargs() -> dict:
+    return ADD_KWARGS
+
+
+if __name__ == "__main__":
+    print(get_prompt("- 工作\n  - 职位", "- goals(用户的目标)"))
@@ -1,11 +1,137 @@
+import os
+import sys
+import queue
+import atexit
+import random
+import logging
 import structlog
-from contextlib import contextmanager
 import structlog.contextvars
-import logging
-import sys
+from dataclasses import dataclass
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVELS = logging.getLevelNamesMapping()
+LOG_QUEUE_SIZE = 10000
+
+
+@dataclass
+class LogSettings:
+    """`LOG_MODE=production` switches the defaults, each has its own env override"""
+
+    async_handler: bool = False
+    sample_rate: float = 1.0
+    callsite_level: int = logging.NOTSET
+    lean_records: bool = False
+
+    @classmethod
+    def from_env(cls) -> "LogSettings":
+        production = os.getenv("LOG_MODE", "default") == "production"
+        return cls(
+            async_handler=os.getenv("LOG_ASYNC", str(production)).lower() == "true",
+            sample_rate=float(
+                os.getenv("LOG_SAMPLE_RATE", 0.1 if production else 1.0)
+            ),
+            callsite_level=LOG_LEVELS[
+                os.getenv(
+                    "LOG_CALLSITE_LEVEL", "WARNING" if production else "NOTSET"
+                ).upper()
+            ],
+            lean_records=os.getenv("LOG_LEAN_RECORDS", str(production)).lower()
+            == "true",
+        )
+
+
+def apply_lean_records():
+    """Skip the LogRecord fields no formatter of ours renders
+
+    See "Optimization" in the logging HOWTO. The caller lookup is kept, it is
+    process-wide and third-party WARNING+ records need their `pathname`/`lineno`.
+    """
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False
+
+
+def keep_sampled(levelno: int, sample_rate: float) -> bool:
+    # warnings and errors are never sampled out
+    return levelno >= logging.WARNING or random.random() < sample_rate
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if hasattr(record, "_logger"):
+            # from structlog, already sampled by `sample_events`
+            return True
+        return keep_sampled(record.levelno, self.sample_rate)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hand records to a listener thread, rendering happens off the event loop"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the record stays in this process, no need to pre-render or copy it
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def sample_events(sample_rate: float):
+    def processor(logger, method_name, event_dict):
+        levelno = LOG_LEVELS.get(method_name.upper(), logging.INFO)
+        if not keep_sampled(levelno, sample_rate):
+            raise structlog.DropEvent
+        return event_dict
+
+    return processor
+
+
+def add_callsite_from(callsite_level: int):
+    callsite_adder = structlog.processors.CallsiteParameterAdder(
+        [
+            structlog.processors.CallsiteParameter.LINENO,
+            structlog.processors.CallsiteParameter.PATHNAME,
+        ]
+    )
+
+    def processor(logger, method_name, event_dict):
+        # stack inspection is the most expensive processor, skip it for chatty levels
+        levelno = LOG_LEVELS.get(str(event_dict.get("level", "")).upper(), 0)
+        if levelno < callsite_level:
+            return event_dict
+        return callsite_adder(logger, method_name, event_dict)
+
+    return processor
+
+
+def attach_handler(
+    logger: logging.Logger, handler: logging.Handler, settings: LogSettings
+):
+    if settings.lean_records:
+        apply_lean_records()
+    if settings.async_handler:
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        handler = DroppingQueueHandler(log_queue)
+    if settings.sample_rate < 1:
+        handler.addFilter(SamplingFilter(settings.sample_rate))
+    logger.addHandler(handler)
 
 
-def configure_logger():
+def configure_logger(settings: LogSettings | None = None, stream=sys.stdout):
+    settings = settings or LogSettings.from_env()
     shared_processors = [
         structlog.contextvars.merge_contextvars,
         structlog.stdlib.add_logger_name,
@@ -13,18 +139,15 @@ def configure_logger():
         structlog.stdlib.PositionalArgumentsFormatter(),
         structlog.stdlib.ExtraAdder(),
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.CallsiteParameterAdder(
-            [
-                structlog.processors.CallsiteParameter.LINENO,
-                structlog.processors.CallsiteParameter.PATHNAME,
-            ]
-        ),
+        add_callsite_from(settings.callsite_level),
     ]
 
     structlog_processors = shared_processors + [
         structlog.processors.dict_tracebacks,
         structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
     ]
+    if settings.sample_rate < 1:
+        structlog_processors.insert(0, sample_events(settings.sample_rate))
 
     structlog.configure(
         processors=structlog_processors,
@@ -40,11 +163,11 @@ def configure_logger():
         ],
     )
 
-    handler = logging.StreamHandler(stream=sys.stdout)
+    handler = logging.StreamHandler(stream=stream)
     handler.setFormatter(formatter)
 
     root_logger = logging.getLogger()
-    root_logger.addHandler(handler)
+    attach_handler(root_logger, handler, settings)
     root_logger.setLevel(logging.INFO)
 
 
@@ -59,19 +182,20 @@ class ProjectStructLogger:
         self.logger = logger
 
     def debug(self, project_id: str, user_id: str, message: str):
-        with bound_context(project_id=str(project_id), user_id=str(user_id)):
-            self.logger.debug(message)
+        self.logger.debug(message, project_id=str(project_id), user_id=str(user_id))
 
     def info(self, project_id: str, user_id: str, message: str):
-        with bound_context(project_id=str(project_id), user_id=str(user_id)):
-            self.logger.info(message)
+        self.logger.info(message, project_id=str(project_id), user_id=str(user_id))
 
     def warning(self, project_id: str, user_id: str, message: str):
-        with bound_context(project_id=str(project_id), user_id=str(user_id)):
-            self.logger.warning(message)
+        self.logger.warning(message, project_id=str(project_id), user_id=str(user_id))
 
     def error(
         self, project_id: str, user_id: str, message: str, exc_info: bool = False
     ):
-        with bound_context(project_id=str(project_id), user_id=str(user_id)):
-            self.logger.error(message, exc_info=exc_info)
+        self.logger.error(
+            message,
+            exc_info=exc_info,
+            project_id=str(project_id),
+            user_id=str(user_id),
+        )
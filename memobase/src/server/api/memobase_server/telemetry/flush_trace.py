@@ -0,0 +1,104 @@
+"""
+Per-stage traces of buffer flushes.
+
+`trace_flush` collects the stages of one flush, `trace_stage` times one stage
+and counts the LLM tokens and DB statements made inside it, excluding nested
+stages. Stages are emitted as OpenTelemetry spans, listed in the
+`ChatModalResponse` and, with `flush_trace_dir`, appended to a daily JSONL file
+read by `python -m memobase_server.flush_report`.
+"""
+
+import os
+import json
+import time
+import asyncio
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from opentelemetry import trace
+from ..env import CONFIG, LOG
+from ..models.response import FlushStageData
+
+TRACER = trace.get_tracer("memobase_server.flush")
+FLUSH_STAGES: ContextVar[list[FlushStageData] | None] = ContextVar(
+    "flush_stages", default=None
+)
+CURRENT_STAGE: ContextVar[FlushStageData | None] = ContextVar(
+    "current_stage", default=None
+)
+
+
+def flush_trace_path(day: str, trace_dir: str = None) -> str:
+    return os.path.join(trace_dir or CONFIG.flush_trace_dir, f"flush-{day}.jsonl")
+
+
+def write_flush_trace(record: dict):
+    try:
+        path = flush_trace_path(record["at"][:10])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # one short append per line, so processes can share the file
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        LOG.error(f"Failed to write the flush trace: {e}")
+
+
+@asynccontextmanager
+async def trace_flush(user_id: str, project_id: str, blob_type: str):
+    """Collect the stages of a flush, yields their list"""
+    stages = []
+    token = FLUSH_STAGES.set(stages)
+    stage_token = CURRENT_STAGE.set(None)
+    start = time.perf_counter()
+    try:
+        with TRACER.start_as_current_span(
+            "flush", attributes={"project_id": project_id, "blob_type": blob_type}
+        ):
+            yield stages
+    finally:
+        FLUSH_STAGES.reset(token)
+        CURRENT_STAGE.reset(stage_token)
+    if CONFIG.flush_trace_dir is not None:
+        record = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "project_id": project_id,
+            "user_id": str(user_id),
+            "blob_type": blob_type,
+            "wall_ms": round((time.perf_counter() - start) * 1000, 2),
+            "stages": [s.model_dump() for s in stages],
+        }
+        await asyncio.to_thread(write_flush_trace, record)
+
+
+@contextmanager
+def trace_stage(name: str):
+    """Time a stage of the current flush, a no-op outside of flushes"""
+    stages = FLUSH_STAGES.get()
+    if stages is None:
+        yield None
+        return
+    data = FlushStageData(name=name)
+    stages.append(data)
+    token = CURRENT_STAGE.set(data)
+    start = time.perf_counter()
+    with TRACER.start_as_current_span(f"flush.{name}") as span:
+        try:
+            yield data
+        finally:
+            data.wall_ms = round((time.perf_counter() - start) * 1000, 2)
+            CURRENT_STAGE.reset(token)
+            span.set_attributes(data.model_dump(exclude={"name"}))
+
+
+def record_llm_usage(input_tokens: int, output_tokens: int):
+    data = CURRENT_STAGE.get()
+    if data is not None:
+        data.llm_calls += 1
+        data.llm_input_tokens += input_tokens
+        data.llm_output_tokens += output_tokens
+
+
+def record_db_statement():
+    data = CURRENT_STAGE.get()
+    if data is not None:
+        data.db_statements += 1
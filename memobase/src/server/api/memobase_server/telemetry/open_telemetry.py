@@ -1,11 +1,17 @@
 from enum import Enum
 from typing import Dict
 import os
+import sys
 import socket
 from prometheus_client import start_http_server
 from opentelemetry import metrics
 from opentelemetry.exporter.prometheus import PrometheusMetricReader
-from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics import (
+    MeterProvider,
+    AlwaysOnExemplarFilter,
+    AlwaysOffExemplarFilter,
+)
+from opentelemetry.sdk.metrics.view import View
 from opentelemetry.sdk.metrics._internal.instrument import (
     Counter,
     Histogram,
@@ -15,6 +21,13 @@ from opentelemetry.sdk.resources import SERVICE_NAME, Resource, DEPLOYMENT_ENVIR
 from functools import wraps
 from ..env import LOG, CONFIG
 
+# the label capped by `telemetry_max_project_labels`
+PROJECT_LABEL = "project_id"
+OTHER_PROJECTS = "other"
+# request latency series keep these labels, `request_id` stays on the exemplars
+REQUEST_LABELS = {PROJECT_LABEL, "path", "method"}
+# label sets of the attributes cache, beyond it attributes are built per call
+ATTRIBUTES_CACHE_SIZE = 10000
 
 def no_raise_exception(func):
     @wraps(func)
@@ -36,6 +49,8 @@ class CounterMetricName(Enum):
     LLM_TOKENS_INPUT = "llm_input_tokens_total"
     LLM_TOKENS_OUTPUT = "llm_output_tokens_total"
     EMBEDDING_TOKENS = "embedding_tokens_total"
+    LLM_CACHE_HITS = "llm_cache_hits_total"
+    LLM_CACHE_MISSES = "llm_cache_misses_total"
 
     def get_description(self) -> str:
         """Get the description for this metric."""
@@ -46,6 +61,8 @@ class CounterMetricName(Enum):
             CounterMetricName.LLM_TOKENS_INPUT: "Total number of input tokens",
             CounterMetricName.LLM_TOKENS_OUTPUT: "Total number of output tokens",
             CounterMetricName.EMBEDDING_TOKENS: "Total number of embedding tokens",
+            CounterMetricName.LLM_CACHE_HITS: "Total number of LLM response cache hits",
+            CounterMetricName.LLM_CACHE_MISSES: "Total number of LLM response cache misses",
         }
         return descriptions[self]
 
@@ -60,6 +77,8 @@ class HistogramMetricName(Enum):
     LLM_LATENCY_MS = "llm_latency"
     EMBEDDING_LATENCY_MS = "embedding_latency"
     REQUEST_LATENCY_MS = "request_latency"
+    DB_QUERY_LATENCY_MS = "db_query_latency"
+    REDIS_LATENCY_MS = "redis_latency"
 
     def get_description(self) -> str:
         """Get the description for this metric."""
@@ -67,6 +86,8 @@ class HistogramMetricName(Enum):
             HistogramMetricName.LLM_LATENCY_MS: "Latency of the LLM in milliseconds",
             HistogramMetricName.EMBEDDING_LATENCY_MS: "Latency of the embedding in milliseconds",
             HistogramMetricName.REQUEST_LATENCY_MS: "Latency of the request in milliseconds",
+            HistogramMetricName.DB_QUERY_LATENCY_MS: "Latency of the database queries of each module in milliseconds",
+            HistogramMetricName.REDIS_LATENCY_MS: "Latency of the Redis commands of each module in milliseconds",
         }
         return descriptions[self]
 
@@ -80,12 +101,16 @@ class GaugeMetricName(Enum):
 
     INPUT_TOKEN_COUNT = "input_token_count_per_call"
     OUTPUT_TOKEN_COUNT = "output_token_count_per_call"
+    EVENT_TABLE_SIZE_BYTES = "event_table_size_bytes"
+    DB_POOL_CHECKED_OUT = "db_pool_checked_out"
 
     def get_description(self) -> str:
         """Get the description for this metric."""
         descriptions = {
             GaugeMetricName.INPUT_TOKEN_COUNT: "Number of input tokens per call",
             GaugeMetricName.OUTPUT_TOKEN_COUNT: "Number of output tokens per call",
+            GaugeMetricName.EVENT_TABLE_SIZE_BYTES: "Total size of the event tables in bytes, measured by event compaction",
+            GaugeMetricName.DB_POOL_CHECKED_OUT: "Connections checked out of the database pool of each engine",
         }
         return descriptions[self]
 
@@ -94,6 +119,34 @@ class GaugeMetricName(Enum):
         return f"memobase_server_{self.value}"
 
 
+def calling_module(depth: int = 1) -> str:
+    """The memobase_server module that called into the DB or Redis client"""
+    frame = sys._getframe(depth + 1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("memobase_server."):
+            return module[len("memobase_server.") :]
+        frame = frame.f_back
+    return "other"
+
+
+class BoundMetric:
+    """A metric with its attributes built once, for hot paths with fixed labels"""
+
+    def __init__(self, instrument: Counter | Histogram | Gauge, attributes: dict):
+        self._attributes = attributes
+        if isinstance(instrument, Counter):
+            self._record = instrument.add
+        elif isinstance(instrument, Histogram):
+            self._record = instrument.record
+        else:
+            self._record = instrument.set
+
+    @no_raise_exception
+    def record(self, value: float = 1) -> None:
+        self._record(value, self._attributes)
+
+
 class TelemetryManager:
     """Manages telemetry setup and metrics for the memobase server."""
 
@@ -102,16 +155,41 @@ class TelemetryManager:
         service_name: str = "memobase-server",
         prometheus_port: int = 9464,
         deployment_environment: str = "default",
+        max_project_labels: int = 20,
+        project_allowlist: list[str] = None,
+        otlp_endpoint: str = None,
+        otlp_interval_s: int = 15,
     ):
         self._service_name = service_name
         self._prometheus_port = prometheus_port
         self._deployment_environment = deployment_environment
+        self._max_project_labels = max_project_labels
+        self._project_allowlist = set(project_allowlist or [])
+        self._labelled_projects = set()
+        self._otlp_endpoint = otlp_endpoint
+        self._otlp_interval_s = otlp_interval_s
+        # only the OTLP exporter publishes exemplars
+        self._exemplars = otlp_endpoint is not None
+        self._attributes_cache: Dict[tuple, Dict[str, str]] = {}
         self._metrics: Dict[
             CounterMetricName | HistogramMetricName | GaugeMetricName,
             Counter | Histogram | Gauge,
         ] = None
         self._meter = None
 
+        # if os.environ.get("POD_IP"):
+        #     # use k8s downward API to get the pod ip
+        #     pod_ip = os.environ.get("POD_IP", None)
+        # else:
+        #     # use the hostname to get the ip address
+        #     hostname = socket.gethostname()
+        #     pod_ip = socket.gethostbyname(hostname)
+        pod_ip = os.environ.get("POD_IP", None)
+        self._base_attributes = {
+            DEPLOYMENT_ENVIRONMENT: self._deployment_environment,
+            "memobase_server_ip": pod_ip,
+        }
+
     def setup_telemetry(self) -> None:
         """Initialize OpenTelemetry with Prometheus exporter."""
         resource = Resource(
@@ -120,8 +198,26 @@ class TelemetryManager:
                 DEPLOYMENT_ENVIRONMENT: self._deployment_environment,
             }
         )
-        reader = PrometheusMetricReader()
-        provider = MeterProvider(resource=resource, metric_readers=[reader])
+        request_latency = HistogramMetricName.REQUEST_LATENCY_MS.get_metric_name()
+        readers = [PrometheusMetricReader()]
+        if self._otlp_endpoint is not None:
+            readers.append(self._otlp_reader())
+        provider = MeterProvider(
+            resource=resource,
+            metric_readers=readers,
+            exemplar_filter=(
+                AlwaysOnExemplarFilter()
+                if self._exemplars
+                else AlwaysOffExemplarFilter()
+            ),
+            views=[
+                # measurements outside the kept labels are filtered onto exemplars
+                View(
+                    instrument_name=request_latency,
+                    attribute_keys=REQUEST_LABELS | set(self._base_attributes),
+                ),
+            ],
+        )
         metrics.set_meter_provider(provider)
 
         # Start Prometheus HTTP server, skip if port is already in use
@@ -138,21 +234,52 @@ class TelemetryManager:
         # Initialize meter
         self._meter = metrics.get_meter(self._service_name)
 
-    def _construct_attributes(self, **kwargs) -> Dict[str, str]:
+    def _otlp_reader(self):
+        try:
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+                OTLPMetricExporter,
+            )
+        except ImportError as e:
+            raise ImportError(
+                "telemetry_otlp_endpoint needs the `otlp` extra, "
+                "`pip install opentelemetry-exporter-otlp-proto-http`"
+            ) from e
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+        return PeriodicExportingMetricReader(
+            OTLPMetricExporter(endpoint=self._otlp_endpoint),
+            export_interval_millis=self._otlp_interval_s * 1000,
+        )
 
-        # if os.environ.get("POD_IP"):
-        #     # use k8s downward API to get the pod ip
-        #     pod_ip = os.environ.get("POD_IP", None)
-        # else:
-        #     # use the hostname to get the ip address
-        #     hostname = socket.gethostname()
-        #     pod_ip = socket.gethostbyname(hostname)
-        pod_ip = os.environ.get("POD_IP", None)
-        return {
-            DEPLOYMENT_ENVIRONMENT: self._deployment_environment,
-            "memobase_server_ip": pod_ip,
-            **kwargs,
-        }
+    def project_label(self, project_id: str) -> str:
+        """The project id for the first `max_project_labels` projects, else "other" """
+        if project_id in self._labelled_projects:
+            return project_id
+        if project_id in self._project_allowlist:
+            return project_id
+        if len(self._labelled_projects) < self._max_project_labels:
+            self._labelled_projects.add(project_id)
+            return project_id
+        return OTHER_PROJECTS
+
+    def _construct_attributes(
+        self, attributes: Dict[str, str] = None
+    ) -> Dict[str, str]:
+        """The attributes of a measurement, built once per label set"""
+        if not attributes:
+            return self._base_attributes
+        key = tuple(attributes.items())
+        complete_attributes = self._attributes_cache.get(key)
+        if complete_attributes is not None:
+            return complete_attributes
+        complete_attributes = {**self._base_attributes, **attributes}
+        if PROJECT_LABEL in attributes:
+            complete_attributes[PROJECT_LABEL] = self.project_label(
+                attributes[PROJECT_LABEL]
+            )
+        if len(self._attributes_cache) < ATTRIBUTES_CACHE_SIZE:
+            self._attributes_cache[key] = complete_attributes
+        return complete_attributes
 
     def setup_metrics(self) -> None:
         """Initialize all metrics."""
@@ -195,8 +322,7 @@ class TelemetryManager:
     ) -> None:
         """Increment a counter metric."""
         self._validate_metric(metric)
-        complete_attributes = self._construct_attributes(**(attributes or {}))
-        self._metrics[metric].add(value, complete_attributes)
+        self._metrics[metric].add(value, self._construct_attributes(attributes))
 
     @no_raise_exception
     def record_histogram_metric(
@@ -204,10 +330,13 @@ class TelemetryManager:
         metric: HistogramMetricName,
         value: float,
         attributes: Dict[str, str] = None,
+        request_id: str = None,
     ) -> None:
-        """Record a histogram metric value."""
+        """Record a histogram metric value, `request_id` is kept on exemplars."""
         self._validate_metric(metric)
-        complete_attributes = self._construct_attributes(**(attributes or {}))
+        complete_attributes = self._construct_attributes(attributes)
+        if request_id is not None and self._exemplars:
+            complete_attributes = {**complete_attributes, "request_id": request_id}
         self._metrics[metric].record(value, complete_attributes)
 
     @no_raise_exception
@@ -219,8 +348,18 @@ class TelemetryManager:
     ) -> None:
         """Set a gauge metric."""
         self._validate_metric(metric)
-        complete_attributes = self._construct_attributes(**(attributes or {}))
-        self._metrics[metric].set(value, complete_attributes)
+        self._metrics[metric].set(value, self._construct_attributes(attributes))
+
+    def bind(
+        self,
+        metric: CounterMetricName | HistogramMetricName | GaugeMetricName,
+        attributes: Dict[str, str] = None,
+    ) -> BoundMetric:
+        """The metric with these attributes, to record without building them again"""
+        self._validate_metric(metric)
+        return BoundMetric(
+            self._metrics[metric], self._construct_attributes(attributes)
+        )
 
     def _validate_metric(self, metric) -> None:
         """Validate if the metric is initialized."""
@@ -230,7 +369,11 @@ class TelemetryManager:
 
 # Create a global instance
 telemetry_manager = TelemetryManager(
-    deployment_environment=CONFIG.telemetry_deployment_environment
+    deployment_environment=CONFIG.telemetry_deployment_environment,
+    max_project_labels=CONFIG.telemetry_max_project_labels,
+    project_allowlist=CONFIG.telemetry_project_allowlist,
+    otlp_endpoint=CONFIG.telemetry_otlp_endpoint,
+    otlp_interval_s=CONFIG.telemetry_otlp_interval_s,
 )
 telemetry_manager.setup_telemetry()
 telemetry_manager.setup_metrics()
@@ -1,11 +1,12 @@
 import re
+import base64
 import yaml
 import json
-from typing import cast
+from typing import cast, Callable
 from datetime import timezone, datetime
 from functools import wraps
 from pydantic import ValidationError
-from .env import ENCODER, LOG, CONFIG, ProfileConfig
+from .env import get_encoder, LOG, CONFIG, ProfileConfig
 from .models.blob import (
     Blob,
     BlobType,
@@ -85,11 +86,11 @@ def find_list_int_or_none(content: str) -> list[int] | None:
 
 
 def get_encoded_tokens(content: str) -> list[int]:
-    return ENCODER.encode(content)
+    return get_encoder().encode(content)
 
 
 def get_decoded_tokens(tokens: list[int]) -> str:
-    return ENCODER.decode(tokens)
+    return get_encoder().decode(tokens)
 
 
 def truncate_string(content: str, max_tokens: int) -> str:
@@ -171,3 +172,17 @@ def is_valid_profile_config(profile_config: str | None) -> Promise[None]:
         return Promise.reject(CODE.BAD_REQUEST, f"Invalid profile config: {e}")
     except ValidationError as e:
         return Promise.reject(CODE.BAD_REQUEST, f"Invalid profile config: {e}")
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, parsers: list[Callable]) -> Promise[list]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError(values)
+        return Promise.resolve([parse(v) for parse, v in zip(parsers, values)])
+    except (ValueError, TypeError):
+        return Promise.reject(CODE.BAD_REQUEST, f"Invalid cursor {cursor}")
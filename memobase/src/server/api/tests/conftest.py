@@ -2,6 +2,7 @@ import pytest
 import pytest_asyncio
 from api import app
 from memobase_server.env import CONFIG
+from memobase_server.connectors import create_tables
 from fastapi.testclient import TestClient
 
 PREFIX = "/api/v1"
@@ -14,6 +15,7 @@ CONFIG.event_tags = [
 CONFIG.enable_event_embedding = True
 CONFIG.persistent_chat_blobs = True
 CONFIG.llm_api_key = None
+create_tables()
 # @pytest.fixture(scope="session")
 # def event_loop():
 #     try:
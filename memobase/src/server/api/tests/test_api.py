@@ -1,4 +1,5 @@
 import os
+import json
 import pytest
 import numpy as np
 from unittest.mock import patch, Mock, AsyncMock
@@ -34,6 +35,36 @@ def test_health_check(client, db_env):
     assert d["errno"] == 0
 
 
+def test_readiness(db_env):
+    from memobase_server.controllers import health
+
+    # no Authorization header, load balancers call it
+    client = TestClient(app)
+    health.PROBES.clear()
+    response = client.get(f"{PREFIX}/readiness")
+    assert response.status_code == 200
+    d = response.json()["data"]
+    assert d["ready"] and d["probes"]["db"]["ok"] and d["probes"]["redis"]["ok"]
+    assert "utilization_percent" in d["db_pool"]
+
+    # fresh probes are served from the cache
+    checked_at = d["probes"]["db"]["checked_at"]
+    assert client.get(f"{PREFIX}/healthcheck").status_code == 200
+    response = client.get(f"{PREFIX}/readiness")
+    assert response.json()["data"]["probes"]["db"]["checked_at"] == checked_at
+
+    with patch.object(health, "redis_health_check", AsyncMock(return_value=False)):
+        health.PROBES.clear()
+        response = client.get(f"{PREFIX}/readiness")
+        assert response.status_code == 503
+        assert response.json()["detail"]["probes"]["redis"]["error"] == (
+            "redis not available"
+        )
+        response = client.get(f"{PREFIX}/healthcheck")
+        assert response.status_code == 500
+    health.PROBES.clear()
+
+
 @pytest.fixture
 def mock_llm_complete():
     with patch(
@@ -224,6 +255,76 @@ def test_blob_api_curd(client, db_env):
     assert d["errno"] == 0
 
 
+def test_api_cursor_pagination_and_export(client, db_env):
+    u_ids = [client.post(f"{PREFIX}/users", json={}).json()["data"]["id"]]
+    u_ids.append(client.post(f"{PREFIX}/users", json={}).json()["data"]["id"])
+    u_id = u_ids[0]
+    b_ids = []
+    for i in range(5):
+        response = client.post(
+            f"{PREFIX}/blobs/insert/{u_id}",
+            json={"blob_type": "doc", "blob_data": {"content": f"doc {i}"}},
+        )
+        b_ids.append(response.json()["data"]["id"])
+
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(
+            f"{PREFIX}/users/blobs/{u_id}/{BlobType.doc}",
+            params={"page_size": 2, **({"cursor": cursor} if cursor else {})},
+        )
+        d = response.json()
+        assert d["errno"] == 0
+        pages.append(d["data"]["ids"])
+        cursor = d["data"]["next_cursor"]
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert sum(pages, []) == b_ids
+
+    response = client.get(
+        f"{PREFIX}/users/blobs/{u_id}/{BlobType.doc}", params={"cursor": "oops"}
+    )
+    assert response.json()["errno"] == 400
+
+    for order_by in ["updated_at", "profile_count"]:
+        seen = []
+        response = client.get(
+            f"{PREFIX}/project/users", params={"limit": 1, "order_by": order_by}
+        )
+        d = response.json()["data"]
+        assert d["count"] >= 2
+        while True:
+            seen.extend(u["id"] for u in d["users"])
+            if d["next_cursor"] is None:
+                break
+            response = client.get(
+                f"{PREFIX}/project/users",
+                params={"limit": 1, "order_by": order_by, "cursor": d["next_cursor"]},
+            )
+            d = response.json()["data"]
+            assert d["count"] is None
+        assert len(seen) == len(set(seen))
+        assert set(u_ids) <= set(seen)
+
+    with client.stream("GET", f"{PREFIX}/users/export/{u_id}") as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+    assert lines[0]["type"] == "user" and lines[0]["id"] == u_id
+    blobs = [line for line in lines if line["type"] == "blob"]
+    assert [b["id"] for b in blobs] == b_ids
+    assert blobs[0]["blob_data"] == {"content": "doc 0"}
+
+    response = client.get(f"{PREFIX}/users/export/{u_ids[1]}")
+    assert [json.loads(line)["type"] for line in response.text.splitlines()] == [
+        "user"
+    ]
+
+    for u_id in u_ids:
+        client.delete(f"{PREFIX}/users/{u_id}")
+    response = client.get(f"{PREFIX}/users/export/{u_id}")
+    assert response.json()["errno"] == 404
+
+
 @pytest.mark.asyncio
 async def test_api_user_profile(client, db_env):
     response = client.post(f"{PREFIX}/users", json={"data": {"test": 1}})
@@ -1,4 +1,6 @@
+import json
 import pytest
+import asyncio
 from unittest.mock import AsyncMock, Mock, patch
 from memobase_server import controllers
 from memobase_server.models import response as res
@@ -234,6 +236,129 @@ async def test_chat_buffer_modal(
     mock_extract_llm_complete.assert_awaited_once()
 
 
+@pytest.mark.asyncio
+async def test_flush_stage_trace(
+    db_env,
+    monkeypatch,
+    tmp_path,
+    mock_extract_llm_complete,
+    mock_merge_llm_complete,
+    mock_event_tag_llm_complete,
+    mock_entry_summary_llm_complete,
+    mock_event_get_embedding,
+):
+    from memobase_server.flush_report import aggregate
+
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok()
+    u_id = p.data().id
+    blob = res.BlobData(
+        blob_type=BlobType.chat,
+        blob_data={
+            "messages": [
+                {"role": "user", "content": "Hi, nice to meet you, I am Gus"},
+                {"role": "assistant", "content": "Got it, Gus!"},
+                {"role": "user", "content": "I really dig into Chinese food"},
+            ]
+        },
+    )
+    p = await controllers.blob.insert_blob(u_id, DEFAULT_PROJECT_ID, blob)
+    assert p.ok()
+    await controllers.buffer.insert_blob_to_buffer(
+        u_id, DEFAULT_PROJECT_ID, p.data().id, blob.to_blob()
+    )
+
+    monkeypatch.setattr(CONFIG, "flush_trace_dir", str(tmp_path))
+    p = await controllers.buffer.flush_buffer(u_id, DEFAULT_PROJECT_ID, BlobType.chat)
+    assert p.ok()
+    stages = {s.name: s for s in p.data().stages}
+    assert set(stages) == {
+        "load_profiles",
+        "entry_chat_summary",
+        "extract_topics",
+        "merge_or_valid_new_memos",
+        "organize_profiles",
+        "re_summary",
+        "tag_event",
+        "append_user_event",
+        "event_embedding",
+        "handle_user_profile_db",
+    }
+    assert stages["append_user_event"].db_statements > 0
+    assert stages["handle_user_profile_db"].db_statements > 0
+    # the embedding is mocked, so its stage makes no statements of its own
+    assert stages["event_embedding"].db_statements == 0
+
+    (trace_file,) = tmp_path.iterdir()
+    report = aggregate([json.loads(line) for line in trace_file.open()])
+    assert report["flushes"] == 1
+    assert report["stages"]["tag_event"]["count"] == 1
+
+    p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+
+
+@pytest.mark.asyncio
+async def test_chat_concurrent_flush_once(
+    db_env,
+    mock_extract_llm_complete,
+    mock_merge_llm_complete,
+    mock_event_tag_llm_complete,
+    mock_entry_summary_llm_complete,
+    mock_event_get_embedding,
+):
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok()
+    u_id = p.data().id
+
+    for content in ["Hi, I am Gus", "I really dig into Chinese food"]:
+        blob = res.BlobData(
+            blob_type=BlobType.chat,
+            blob_data={"messages": [{"role": "user", "content": content}]},
+        )
+        p = await controllers.blob.insert_blob(u_id, DEFAULT_PROJECT_ID, blob)
+        assert p.ok()
+        await controllers.buffer.insert_blob_to_buffer(
+            u_id, DEFAULT_PROJECT_ID, p.data().id, blob.to_blob()
+        )
+    p = await controllers.buffer.get_unprocessed_buffer_ids(
+        u_id, DEFAULT_PROJECT_ID, BlobType.chat
+    )
+    assert p.ok() and len(p.data().ids) == 2
+    buffer_ids = p.data().ids
+
+    # sync inserts and a manual flush racing for the same buffers
+    results = await asyncio.gather(
+        *[
+            controllers.buffer.flush_buffer_by_ids(
+                u_id, DEFAULT_PROJECT_ID, BlobType.chat, buffer_ids
+            )
+            for _ in range(3)
+        ],
+        controllers.buffer.flush_buffer_by_ids(
+            u_id, DEFAULT_PROJECT_ID, BlobType.chat, buffer_ids[:1]
+        ),
+        controllers.buffer.flush_buffer(u_id, DEFAULT_PROJECT_ID, BlobType.chat),
+    )
+    assert all(r.ok() for r in results)
+    assert all(r.data() == results[0].data() for r in results)
+    assert results[0].data() is not None
+    assert not controllers.buffer.FLUSH_FLIGHTS
+
+    # the mocks only answer once, a duplicated flush would have failed
+    mock_extract_llm_complete.assert_awaited_once()
+    mock_entry_summary_llm_complete.assert_awaited_once()
+    p = await controllers.event.get_user_events(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok() and len(p.data().events) == 1
+    p = await controllers.buffer.get_unprocessed_buffer_ids(
+        u_id, DEFAULT_PROJECT_ID, BlobType.chat, select_status="done"
+    )
+    assert p.ok() and len(p.data().ids) == 2
+
+    p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+
+
 @pytest.mark.asyncio
 async def test_chat_merge_modal(
     db_env,
@@ -369,3 +494,280 @@ async def test_chat_organize_modal(
     assert mock_extract_llm_complete.await_count == 1
     assert mock_merge_llm_complete.await_count == 1
     assert mock_organize_llm_complete.await_count == 1
+
+
+FAST_EXTRACT_RESPONSE = {
+    "summary": "- Gus likes Chinese food and plays basketball. // info",
+    "facts": [
+        {"topic": "basic_info", "sub_topic": "name", "memo": "Gus"},
+        {"topic": "interest", "sub_topic": "sports", "memo": "play basketball"},
+        {"topic": "interest", "sub_topic": "foods", "memo": "Chinese food"},
+    ],
+    "event_tags": [{"tag": "emotion", "value": "happy"}],
+}
+
+
+@pytest.fixture
+def mock_fast_extract_llm_complete():
+    with patch(
+        "memobase_server.controllers.modal.chat.fast_extract.llm_complete"
+    ) as mock_llm:
+        mock_client = AsyncMock()
+        mock_client.ok = Mock(return_value=True)
+        mock_client.data = Mock(return_value=FAST_EXTRACT_RESPONSE)
+
+        mock_llm.side_effect = [mock_client]
+        yield mock_llm
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "validate_mode, merge_response, merged_memos",
+    [
+        # only the conflicting `interest::foods` fact is merged by the LLM
+        (
+            False,
+            "TTTT\n---\n1. UPDATE::user likes Chinese and Japanese food",
+            ["Chinese food"],
+        ),
+        # validation also sends the new `basic_info::name` fact to the LLM
+        (
+            True,
+            "TTTT\n---\n1. UPDATE::Gus\n"
+            "2. UPDATE::user likes Chinese and Japanese food",
+            ["Gus", "Chinese food"],
+        ),
+    ],
+)
+async def test_chat_fast_mode(
+    db_env,
+    monkeypatch,
+    mock_fast_extract_llm_complete,
+    mock_extract_llm_complete,
+    mock_event_tag_llm_complete,
+    mock_entry_summary_llm_complete,
+    mock_event_get_embedding,
+    validate_mode,
+    merge_response,
+    merged_memos,
+):
+    monkeypatch.setattr(CONFIG, "process_mode", "fast")
+    monkeypatch.setattr(CONFIG, "profile_validate_mode", validate_mode)
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok()
+    u_id = p.data().id
+
+    blob = res.BlobData(
+        blob_type=BlobType.chat,
+        blob_data={
+            "messages": [
+                {"role": "user", "content": "I'm Gus, I really dig into Chinese food"},
+                {"role": "assistant", "content": "Got it, Gus!"},
+            ]
+        },
+    )
+    p = await controllers.blob.insert_blob(u_id, DEFAULT_PROJECT_ID, blob)
+    assert p.ok()
+    await controllers.buffer.insert_blob_to_buffer(
+        u_id, DEFAULT_PROJECT_ID, p.data().id, blob.to_blob()
+    )
+    p = await controllers.profile.add_user_profiles(
+        u_id, DEFAULT_PROJECT_ID, PROFILES, PROFILE_ATTRS
+    )
+    assert p.ok()
+
+    with patch(
+        "memobase_server.controllers.modal.chat.merge_yolo.llm_complete"
+    ) as mock_merge_llm:
+        mock_client = AsyncMock()
+        mock_client.ok = Mock(return_value=True)
+        mock_client.data = Mock(return_value=merge_response)
+        mock_merge_llm.side_effect = [mock_client]
+        await controllers.buffer.flush_buffer(
+            u_id, DEFAULT_PROJECT_ID, BlobType.chat
+        )
+
+        mock_merge_llm.assert_awaited_once()
+        for memo in merged_memos:
+            assert memo in mock_merge_llm.await_args.args[1]
+        assert "basketball" not in mock_merge_llm.await_args.args[1]
+
+    p = await controllers.profile.get_user_profiles(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok() and len(p.data().profiles) == len(PROFILES) + 1
+    profiles = {
+        (pf.attributes["topic"], pf.attributes["sub_topic"]): pf.content
+        for pf in p.data().profiles
+    }
+    assert profiles[("basic_info", "name")] == "Gus"
+    assert profiles[("interest", "sports")] == "user likes to play basketball"
+    assert profiles[("interest", "foods")] == "user likes Chinese and Japanese food"
+
+    p = await controllers.event.get_user_events(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok() and len(p.data().events) == 1
+
+    p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+
+    mock_fast_extract_llm_complete.assert_awaited_once()
+    assert mock_entry_summary_llm_complete.await_count == 0
+    assert mock_extract_llm_complete.await_count == 0
+    assert mock_event_tag_llm_complete.await_count == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_extract_modal(
+    db_env,
+    monkeypatch,
+    mock_extract_llm_complete,
+    mock_event_tag_llm_complete,
+    mock_entry_summary_llm_complete,
+    mock_event_get_embedding,
+):
+    from memobase_server import llms
+
+    monkeypatch.setattr(CONFIG, "stream_profile_extract", True)
+    monkeypatch.setattr(CONFIG, "stream_merge_batch_size", 2)
+    stream_facts = "TTTT\n---" + GD_FACTS + "- interest::foods::spicy food\n"
+
+    async def mock_stream(*args, **kwargs):
+        for i in range(0, len(stream_facts), 7):
+            yield stream_facts[i : i + 7]
+
+    merge_responses = []
+    for actions in [
+        "1. UPDATE::Gus\n2. UPDATE::Chinese food",
+        "1. UPDATE::High School\n2. ABORT::ABORT",
+    ]:
+        mock_client = AsyncMock()
+        mock_client.ok = Mock(return_value=True)
+        mock_client.data = Mock(return_value=f"TTTT\n---\n{actions}")
+        merge_responses.append(mock_client)
+
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok()
+    u_id = p.data().id
+    blob = res.BlobData(
+        blob_type=BlobType.chat,
+        blob_data={
+            "messages": [
+                {"role": "user", "content": "I'm Gus, I really dig into Chinese food"},
+                {"role": "assistant", "content": "Got it, Gus!"},
+            ]
+        },
+    )
+    p = await controllers.blob.insert_blob(u_id, DEFAULT_PROJECT_ID, blob)
+    assert p.ok()
+    await controllers.buffer.insert_blob_to_buffer(
+        u_id, DEFAULT_PROJECT_ID, p.data().id, blob.to_blob()
+    )
+
+    with patch.dict(llms.STREAM_FACTORIES, {CONFIG.llm_style: mock_stream}), patch(
+        "memobase_server.controllers.modal.chat.merge_yolo.llm_complete"
+    ) as mock_merge_llm:
+        mock_merge_llm.side_effect = merge_responses
+        await controllers.buffer.flush_buffer(
+            u_id, DEFAULT_PROJECT_ID, BlobType.chat
+        )
+        assert mock_merge_llm.await_count == 2
+
+    p = await controllers.profile.get_user_profiles(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+    profiles = {
+        (pf.attributes["topic"], pf.attributes["sub_topic"]): pf.content
+        for pf in p.data().profiles
+    }
+    assert profiles == {
+        ("basic_info", "name"): "Gus",
+        ("interest", "foods"): "Chinese food; spicy food",
+        ("education", "level"): "High School",
+    }
+
+    p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+    assert mock_extract_llm_complete.await_count == 0
+
+
+@pytest.mark.asyncio
+async def test_proactive_topics_prefetch(db_env):
+    from memobase_server.controllers.modal.roleplay import proactive_topics
+    from memobase_server.env import ContanstTable
+
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok()
+    u_id = p.data().id
+    p = await controllers.profile.add_user_profiles(
+        u_id, DEFAULT_PROJECT_ID, PROFILES, PROFILE_ATTRS
+    )
+    assert p.ok()
+    messages = [
+        res.OpenAICompatibleMessage(role="user", content="Let's talk about food")
+    ]
+
+    calls = []
+
+    def record(name, func):
+        async def wrapper(*args, **kwargs):
+            calls.append(name)
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    async def detect(*args, **kwargs):
+        calls.append("detect_interest:start")
+        # the prefetch runs while the interest call waits
+        await asyncio.sleep(0)
+        calls.append("detect_interest:end")
+        return Promise.resolve('{"action": "new_topic"}')
+
+    async def predict(*args, **kwargs):
+        calls.append("predict_topics")
+        return Promise.resolve(
+            "<themes>food</themes><overview>dinner</overview><timeline>go</timeline>"
+        )
+
+    with patch(
+        "memobase_server.controllers.modal.roleplay.detect_interest.llm_complete",
+        side_effect=detect,
+    ), patch(
+        "memobase_server.controllers.modal.roleplay.predict_new_topics.llm_complete",
+        side_effect=predict,
+    ) as mock_predict, patch.object(
+        proactive_topics,
+        "get_user_statuses",
+        record("user_statuses", proactive_topics.get_user_statuses),
+    ), patch.object(
+        proactive_topics,
+        "get_user_profiles",
+        record("user_profiles", proactive_topics.get_user_profiles),
+    ):
+        p = await proactive_topics.process_messages(u_id, DEFAULT_PROJECT_ID, messages)
+        assert p.ok(), p.msg()
+        assert p.data().action == "new_topic"
+        assert "go" in p.data().topic_prompt
+        assert "interest::sports: user likes to play basketball" in (
+            mock_predict.await_args.args[1]
+        )
+        latency = p.data().latency_ms
+        assert set(latency) == {
+            "project_config",
+            "detect_interest",
+            "user_statuses",
+            "user_profiles",
+            "predict_topics",
+            "total",
+        }
+        # both reads start before the interest is detected, not after it
+        detected = calls.index("detect_interest:end")
+        assert calls.index("user_statuses") < detected
+        assert calls.index("user_profiles") < detected
+        assert calls[-1] == "predict_topics"
+
+    await asyncio.gather(*proactive_topics.PENDING_STATUS_WRITES)
+    p = await controllers.status.get_user_statuses(
+        u_id, DEFAULT_PROJECT_ID, type=ContanstTable.roleplay_plot_status
+    )
+    assert p.ok() and len(p.data().statuses) == 1
+    assert p.data().statuses[0].attributes["new_topic"]["overview"] == "dinner"
+
+    p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
@@ -6,6 +6,7 @@ from memobase_server.controllers import full as controllers
 from memobase_server.models import response as res
 from memobase_server.models.blob import BlobType
 from memobase_server.models.database import DEFAULT_PROJECT_ID
+from memobase_server.models.utils import Promise
 
 
 @pytest.fixture
@@ -454,3 +455,473 @@ async def test_filter_user_events_edge_cases(db_env, mock_event_get_embedding):
     # Cleanup
     p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
     assert p.ok()
+
+
+@pytest.mark.asyncio
+async def test_project_prompt_cache(db_env):
+    from memobase_server.controllers.modal.chat.prompt_cache import (
+        get_project_prompts,
+    )
+
+    p = await controllers.project.get_project_profile_config(DEFAULT_PROJECT_ID)
+    assert p.ok()
+    prompts = get_project_prompts(DEFAULT_PROJECT_ID, p.data())
+    system_prompt = prompts.extract_system_prompt
+
+    # same config, parsed again: reuse the rendered prompt
+    p = await controllers.project.get_project_profile_config(DEFAULT_PROJECT_ID)
+    assert get_project_prompts(DEFAULT_PROJECT_ID, p.data()) is prompts
+    assert prompts.extract_system_prompt is system_prompt
+
+    p = await controllers.project.update_project_profile_config(
+        DEFAULT_PROJECT_ID,
+        """
+overwrite_user_profiles:
+  - topic: "pet"
+    sub_topics:
+      - name: "name"
+event_tags:
+  - name: "mood"
+""",
+    )
+    assert p.ok()
+    p = await controllers.project.get_project_profile_config(DEFAULT_PROJECT_ID)
+    new_prompts = get_project_prompts(DEFAULT_PROJECT_ID, p.data())
+    assert new_prompts is not prompts
+    assert "- pet" in new_prompts.extract_system_prompt
+    assert "- mood" in new_prompts.event_tagging_system_prompt
+
+    p = await controllers.project.update_project_profile_config(
+        DEFAULT_PROJECT_ID, None
+    )
+    assert p.ok()
+
+
+@pytest.mark.asyncio
+async def test_event_compaction(db_env):
+    from sqlalchemy import text
+    from memobase_server.connectors import Session
+    from memobase_server.models.database import (
+        UserEvent,
+        UserEventArchive,
+        UserEventGistArchive,
+    )
+
+    async def get_embedding(project_id, texts, **kwargs):
+        return Promise.resolve(np.full((len(texts), CONFIG.embedding_dim), 0.1))
+
+    with patch(
+        "memobase_server.controllers.event.get_embedding", get_embedding
+    ), patch(
+        "memobase_server.controllers.event_compaction.get_embedding", get_embedding
+    ):
+        p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+        assert p.ok()
+        u_id = p.data().id
+
+        event_ids = []
+        for tip in [
+            "- user went hiking\n- user likes coffee",
+            "- user likes coffee\n- user adopted a cat",
+            "- user started a new job",
+        ]:
+            p = await controllers.event.append_user_event(
+                u_id, DEFAULT_PROJECT_ID, {"event_tip": tip, "profile_delta": []}
+            )
+            assert p.ok()
+            event_ids.append(p.data())
+
+        # the first two events happened in the same week, 60 days ago
+        with Session() as session:
+            for eid, days in zip(event_ids[:2], [60, 59]):
+                for table in ["user_events", "user_event_gists"]:
+                    column = "id" if table == "user_events" else "event_id"
+                    session.execute(
+                        text(
+                            f"UPDATE {table} SET created_at = "
+                            f"date_trunc('week', now() - interval '60 days') "
+                            f"+ interval '{60 - days} days' WHERE {column} = :eid"
+                        ),
+                        {"eid": eid},
+                    )
+            session.commit()
+
+        p = await controllers.event_compaction.compact_events(
+            DEFAULT_PROJECT_ID, hot_retention_days=30
+        )
+        assert p.ok()
+        assert p.data()["events"] == 2
+        assert p.data()["gists"] == 4
+        assert p.data()["summaries"] == 1
+
+        p = await controllers.event.get_user_events(
+            u_id, DEFAULT_PROJECT_ID, time_range_in_days=90
+        )
+        assert p.ok() and len(p.data().events) == 2
+        summary = p.data().events[1].event_data
+        assert summary.event_tip.count("user likes coffee") == 1
+        p = await controllers.event_gist.get_user_event_gists(
+            u_id, DEFAULT_PROJECT_ID, time_range_in_days=90
+        )
+        assert p.ok() and len(p.data().gists) == 2
+        assert "user adopted a cat" in p.data().gists[1].gist_data.content
+
+        # summaries are never compacted again
+        p = await controllers.event_compaction.compact_events(
+            DEFAULT_PROJECT_ID, hot_retention_days=30
+        )
+        assert p.ok() and p.data()["events"] == 0
+
+        with Session() as session:
+            archived = session.query(UserEventArchive).filter_by(user_id=u_id).count()
+            assert archived == 2
+
+        p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+        assert p.ok()
+        with Session() as session:
+            for model in [UserEventArchive, UserEventGistArchive]:
+                assert session.query(model).filter_by(user_id=u_id).count() == 0
+
+
+def test_embedding_storage_check(db_env):
+    from memobase_server.connectors import Session
+    from memobase_server.models.database import (
+        UserEventGist,
+        check_embedding_storage,
+        migrate_embedding_storage,
+    )
+
+    with Session() as session:
+        check_embedding_storage(UserEventGist, session)
+        assert not migrate_embedding_storage(UserEventGist, session)
+        with patch.object(CONFIG, "embedding_storage", "halfvec"):
+            with pytest.raises(ValueError, match="memobase_server.migrate"):
+                check_embedding_storage(UserEventGist, session)
+            # a fresh database has no table to convert yet
+            missing = type("Missing", (), {"__tablename__": "missing_events"})
+            assert not migrate_embedding_storage(missing, session)
+
+
+def test_create_missing_indexes(db_env):
+    from sqlalchemy import text
+    from memobase_server.connectors import DB_ENGINE, create_indexes, missing_indexes
+
+    with DB_ENGINE.begin() as conn:
+        conn.execute(text("DROP INDEX idx_user_event_gists_content_tsv"))
+    with DB_ENGINE.connect() as conn:
+        missing = [index.name for index in missing_indexes(conn)]
+    assert missing == ["idx_user_event_gists_content_tsv"]
+    create_indexes()
+    with DB_ENGINE.connect() as conn:
+        assert missing_indexes(conn) == []
+
+
+@pytest.mark.asyncio
+async def test_search_event_gists_hybrid(db_env):
+    from memobase_server.controllers.context import get_user_event_gists_data
+
+    async def get_embedding(project_id, texts, **kwargs):
+        return Promise.resolve(np.full((len(texts), CONFIG.embedding_dim), 0.1))
+
+    with patch("memobase_server.controllers.event.get_embedding", get_embedding), patch(
+        "memobase_server.controllers.event_gist.get_embedding", get_embedding
+    ), patch.object(CONFIG, "event_search_mode", "hybrid"):
+        p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+        assert p.ok()
+        u_id = p.data().id
+        p = await controllers.event.append_user_event(
+            u_id,
+            DEFAULT_PROJECT_ID,
+            {
+                "event_tip": "- user adopted a cat named Luna\n"
+                "- user went hiking in the alps\n"
+                "- user likes coffee",
+                "profile_delta": [],
+            },
+        )
+        assert p.ok()
+
+        # every gist has the same embedding, the shared words decide the order
+        p = await controllers.event_gist.search_user_event_gists(
+            u_id, DEFAULT_PROJECT_ID, "What is the name of my cats?", topk=3
+        )
+        assert p.ok()
+        gists = p.data().gists
+        assert len(gists) == 3
+        assert "Luna" in gists[0].gist_data.content
+        assert gists[0].similarity is not None
+
+        with patch.object(CONFIG, "enable_event_embedding", False):
+            p = await controllers.event_gist.search_user_event_gists(
+                u_id, DEFAULT_PROJECT_ID, "What is the name of my cats?", topk=3
+            )
+            assert p.ok()
+            gists = p.data().gists
+            assert len(gists) == 1
+            assert "Luna" in gists[0].gist_data.content
+            assert gists[0].similarity is None
+
+            # context fills up with the latest gists after the matches
+            p = await get_user_event_gists_data(
+                u_id,
+                DEFAULT_PROJECT_ID,
+                [res.OpenAICompatibleMessage(role="user", content="Where did I hike?")],
+                False,
+                0.2,
+                21,
+            )
+            assert p.ok()
+            gists = p.data().gists
+            assert len(gists) == 3
+            assert "hiking" in gists[0].gist_data.content
+
+    p = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+
+
+@pytest.mark.asyncio
+async def test_billing_quota_gate():
+    from memobase_server.controllers import billing
+
+    project_id = "test_billing_quota_gate"
+    get_project_billing = AsyncMock(
+        return_value=Promise.resolve(
+            res.BillingData(token_left=20000, project_token_cost_month=0)
+        )
+    )
+    with patch.object(billing, "get_project_billing", get_project_billing), patch.object(
+        CONFIG, "billing_gate_margin_tokens", 10000
+    ):
+        p = await billing.check_project_quota(project_id)
+        assert p.ok() and p.data().token_left == 20000
+        p = await billing.check_project_quota(project_id)
+        assert p.ok()
+        assert get_project_billing.await_count == 1
+
+        # spent locally, still above the margin
+        billing.spend_project_allowance(project_id, 5000)
+        p = await billing.check_project_quota(project_id)
+        assert p.data().token_left == 15000
+        assert p.data().project_token_cost_month == 5000
+        assert get_project_billing.await_count == 1
+
+        # near the limit, every check reads the billing
+        billing.spend_project_allowance(project_id, 6000)
+        get_project_billing.return_value = Promise.resolve(
+            res.BillingData(token_left=9000, project_token_cost_month=11000)
+        )
+        p = await billing.check_project_quota(project_id)
+        assert p.data().token_left == 9000
+        p = await billing.check_project_quota(project_id)
+        assert get_project_billing.await_count == 3
+    billing.PROJECT_ALLOWANCES.pop(project_id)
+
+
+@pytest.mark.asyncio
+async def test_read_session_routing(db_env):
+    import uuid
+    from sqlalchemy.orm import sessionmaker
+    from memobase_server import connectors
+
+    replica = sessionmaker(bind=connectors.DB_ENGINE, info={"replica": True})
+    user_id = str(uuid.uuid4())
+    with patch.object(connectors, "ReadSession", replica):
+        with await connectors.read_session(DEFAULT_PROJECT_ID, user_id) as session:
+            assert session.info.get("replica")
+        await connectors.mark_user_write(DEFAULT_PROJECT_ID, user_id)
+        with await connectors.read_session(DEFAULT_PROJECT_ID, user_id) as session:
+            assert not session.info.get("replica")
+        # project-wide reads don't know the user
+        with await connectors.read_session(DEFAULT_PROJECT_ID) as session:
+            assert session.info.get("replica")
+    # without a replica every read uses the primary
+    with await connectors.read_session(DEFAULT_PROJECT_ID, str(uuid.uuid4())) as session:
+        assert not session.info.get("replica")
+
+
+@pytest.mark.asyncio
+async def test_export_deleted_user(db_env):
+    import json
+
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok()
+    u_id = p.data().id
+    p = await controllers.blob.insert_blob(
+        u_id,
+        DEFAULT_PROJECT_ID,
+        res.BlobData(blob_type=BlobType.doc, blob_data={"content": "doc"}),
+    )
+    assert p.ok()
+
+    p = await controllers.user.export_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+    # deleted after the check, the stream ends without the user's rows
+    p_delete = await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+    assert p_delete.ok()
+    lines = [json.loads(line) for line in p.data()]
+    assert [line["type"] for line in lines] == ["user"]
+    assert lines[0]["id"] == str(u_id)
+
+    p = await controllers.user.export_user(u_id, DEFAULT_PROJECT_ID)
+    assert not p.ok() and p.code() == res.CODE.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_export_closed_unread(db_env):
+    from memobase_server.connectors import DB_ENGINE
+
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    assert p.ok()
+    u_id = p.data().id
+    checked_out = DB_ENGINE.pool.checkedout()
+    p = await controllers.user.export_user(u_id, DEFAULT_PROJECT_ID)
+    assert p.ok()
+    assert DB_ENGINE.pool.checkedout() == checked_out + 1
+    # the response ended before streaming, e.g. the client disconnected
+    p.data().close()
+    assert DB_ENGINE.pool.checkedout() == checked_out
+    await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+
+
+@pytest.mark.asyncio
+async def test_user_counters(db_env, mock_event_get_embedding):
+    from memobase_server.connectors import Session
+    from memobase_server.models.database import User, recount_user_counters
+
+    def counters(u_id):
+        with Session() as session:
+            user = session.query(User).filter_by(id=u_id).one()
+            return user.profile_count, user.event_count, user.updated_at
+
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    u_id = p.data().id
+    *_, updated_at = counters(u_id)
+
+    p = await controllers.profile.add_user_profiles(
+        u_id,
+        DEFAULT_PROJECT_ID,
+        ["Gus", "likes cats", "likes dogs"],
+        [{"topic": "basic_info", "sub_topic": "name"}]
+        + [{"topic": "interest", "sub_topic": "pets"}] * 2,
+    )
+    profile_ids = p.data().ids
+    p = await controllers.profile.add_update_delete_user_profiles(
+        u_id,
+        DEFAULT_PROJECT_ID,
+        ["likes birds"],
+        [{"topic": "interest", "sub_topic": "birds"}],
+        [profile_ids[0]],
+        ["Gus Fring"],
+        [None],
+        profile_ids[1:],
+    )
+    assert p.ok()
+    await controllers.profile.delete_user_profile(
+        u_id, DEFAULT_PROJECT_ID, profile_ids[0]
+    )
+    event_ids = []
+    for _ in range(3):
+        p = await controllers.event.append_user_event(
+            u_id, DEFAULT_PROJECT_ID, {"profile_delta": [], "event_tip": "- hi"}
+        )
+        event_ids.append(p.data())
+    await controllers.event.delete_user_event(u_id, DEFAULT_PROJECT_ID, event_ids[0])
+    assert counters(u_id) == (1, 2, updated_at)
+
+    p = await controllers.project.get_project_users(
+        DEFAULT_PROJECT_ID, order_by="event_count", limit=100
+    )
+    assert {"id": u_id, "profile_count": 1, "event_count": 2}.items() <= next(
+        u for u in p.data().users if u["id"] == u_id
+    ).items()
+
+    with Session() as session:
+        session.query(User).filter_by(id=u_id).update(
+            {"event_count": 0, "updated_at": User.updated_at}
+        )
+        recount_user_counters(session, DEFAULT_PROJECT_ID)
+        session.commit()
+    assert counters(u_id) == (1, 2, updated_at)
+
+    await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+
+
+@pytest.mark.asyncio
+async def test_search_user_events_with_tags(db_env, mock_event_get_embedding):
+    p = await controllers.user.create_user(res.UserData(), DEFAULT_PROJECT_ID)
+    u_id = p.data().id
+    for event_tags in [
+        [{"tag": "emotion", "value": "happy"}, {"tag": "goal", "value": "relax"}],
+        [{"tag": "emotion", "value": 'sa"d'}],
+        None,
+    ]:
+        p = await controllers.event.append_user_event(
+            u_id,
+            DEFAULT_PROJECT_ID,
+            {"profile_delta": [], "event_tip": "- hi", "event_tags": event_tags},
+        )
+        assert p.ok()
+
+    async def search(**tag_filters):
+        p = await controllers.event.search_user_events(
+            u_id, DEFAULT_PROJECT_ID, "hi", topk=10, **tag_filters
+        )
+        assert p.ok(), p.msg()
+        return p.data().events
+
+    assert len(await search()) == 3
+    assert len(await search(has_event_tag=["emotion"])) == 2
+    events = await search(event_tag_equal={"emotion": 'sa"d'})
+    assert [e.event_data.event_tags[0].value for e in events] == ['sa"d']
+    events = await search(has_event_tag=["goal"], event_tag_equal={"emotion": "happy"})
+    assert len(events) == 1
+    assert await search(has_event_tag=["goal"], event_tag_equal={"emotion": 'sa"d'}) == []
+
+    p = await controllers.event.filter_user_events(
+        u_id, DEFAULT_PROJECT_ID, ["goal"], {"emotion": "happy"}
+    )
+    assert len(p.data().events) == 1
+
+    await controllers.user.delete_user(u_id, DEFAULT_PROJECT_ID)
+
+
+@pytest.mark.asyncio
+async def test_metric_labels(db_env):
+    from memobase_server.telemetry import telemetry_manager, HistogramMetricName
+    from memobase_server.telemetry.open_telemetry import TelemetryManager
+
+    manager = TelemetryManager(max_project_labels=2, project_allowlist=["vip"])
+    labels = [
+        manager._construct_attributes({"project_id": p})["project_id"]
+        for p in ["a", "b", "c", "vip", "a"]
+    ]
+    assert labels == ["a", "b", "other", "vip", "a"]
+    # label sets are built once
+    assert manager._construct_attributes({"project_id": "c"}) is (
+        manager._construct_attributes({"project_id": "c"})
+    )
+
+    with patch.object(telemetry_manager, "record_histogram_metric") as record:
+        await controllers.user.get_user(
+            "00000000-0000-0000-0000-000000000000", DEFAULT_PROJECT_ID
+        )
+    db_calls = [
+        c.args
+        for c in record.call_args_list
+        if c.args[0] == HistogramMetricName.DB_QUERY_LATENCY_MS
+    ]
+    assert db_calls and db_calls[0][2] == {
+        "engine": "primary",
+        "module": "controllers.user",
+    }
+
+    with patch.object(telemetry_manager, "record_histogram_metric") as record:
+        await controllers.profile.get_user_profiles(
+            "00000000-0000-0000-0000-000000000000", DEFAULT_PROJECT_ID
+        )
+    redis_calls = [
+        c.args
+        for c in record.call_args_list
+        if c.args[0] == HistogramMetricName.REDIS_LATENCY_MS
+    ]
+    assert redis_calls[0][2] == {"command": "GET", "module": "controllers.profile"}
@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from memobase_server import llms
+from memobase_server.llms.response_cache import (
+    DiskResponseCache,
+    RedisResponseCache,
+    compute_cache_key,
+)
+from memobase_server.models.database import DEFAULT_PROJECT_ID
+from memobase_server.env import CONFIG
+
+
+@pytest.fixture
+def mock_factory():
+    factory = AsyncMock(return_value='{"answer": "cached"}')
+    with patch.dict(llms.FACTORIES, {CONFIG.llm_style: factory}):
+        yield factory
+
+
+def test_cache_key_depends_on_all_inputs():
+    base = compute_cache_key("m", "p", "s", [], {"temperature": 0})
+    assert base == compute_cache_key("m", "p", "s", [], {"temperature": 0})
+    assert base != compute_cache_key("m2", "p", "s", [], {"temperature": 0})
+    assert base != compute_cache_key("m", "p2", "s", [], {"temperature": 0})
+    assert base != compute_cache_key("m", "p", "s2", [], {"temperature": 0})
+    assert base != compute_cache_key("m", "p", "s", [], {"temperature": 1})
+
+
+@pytest.mark.asyncio
+async def test_llm_complete_disk_cache(tmp_path, mock_factory):
+    cache = DiskResponseCache(str(tmp_path), ttl=60, max_entries=10)
+    with patch.object(llms, "get_response_cache", return_value=cache):
+        for _ in range(3):
+            r = await llms.llm_complete(
+                DEFAULT_PROJECT_ID, "hello", json_mode=True, prompt_id="test"
+            )
+            assert r.ok() and r.data() == {"answer": "cached"}
+        assert mock_factory.await_count == 1
+
+        r = await llms.llm_complete(
+            DEFAULT_PROJECT_ID, "hello", json_mode=True, no_cache=True
+        )
+        assert r.ok()
+        assert mock_factory.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_llm_complete_does_not_cache_errors(tmp_path, mock_factory):
+    mock_factory.side_effect = [RuntimeError("timeout"), "ok"]
+    cache = DiskResponseCache(str(tmp_path), ttl=60, max_entries=10)
+    with patch.object(llms, "get_response_cache", return_value=cache):
+        r = await llms.llm_complete(DEFAULT_PROJECT_ID, "hello")
+        assert not r.ok()
+        r = await llms.llm_complete(DEFAULT_PROJECT_ID, "hello")
+        assert r.ok() and r.data() == "ok"
+    assert mock_factory.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_eviction(tmp_path):
+    cache = DiskResponseCache(str(tmp_path), ttl=60, max_entries=5)
+    for i in range(20):
+        await cache.set(f"key{i}", f"value{i}")
+    assert len(list(tmp_path.iterdir())) <= 6
+    assert await cache.get("key19") == "value19"
+    assert await cache.get("key0") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_eviction(db_env):
+    cache = RedisResponseCache(ttl=60, max_entries=3)
+    keys = [f"__test__{i}" for i in range(5)]
+    try:
+        for k in keys:
+            await cache.set(k, k)
+        assert await cache.get(keys[0]) is None
+        assert await cache.get(keys[-1]) == keys[-1]
+    finally:
+        from memobase_server.connectors import get_redis_client
+
+        async with get_redis_client() as redis_client:
+            await redis_client.zrem(cache.index_key, *keys)
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_complete_lines_and_cache(tmp_path):
+    calls = []
+
+    async def mock_stream(*args, **kwargs):
+        calls.append(kwargs)
+        for delta in ["- a::b", "::c\n- d", "::e::f\n", "tail"]:
+            yield delta
+
+    cache = DiskResponseCache(str(tmp_path), ttl=60, max_entries=10)
+    with patch.dict(llms.STREAM_FACTORIES, {CONFIG.llm_style: mock_stream}), patch.object(
+        llms, "get_response_cache", return_value=cache
+    ):
+        for _ in range(2):
+            lines = [
+                line
+                async for line in llms.llm_stream_complete(
+                    DEFAULT_PROJECT_ID, "hello", prompt_id="test"
+                )
+            ]
+            assert lines == ["- a::b::c", "- d::e::f", "tail"]
+    assert len(calls) == 1
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+启动 asyncio 版 GLM-Realtime 语音助手
+从项目根目录运行：python run_realtime_async.py [--agent]
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import realtime_async
+
+if __name__ == "__main__":
+    realtime_async.cli()
@@ -0,0 +1,74 @@
+"""
+测试轮次延迟追踪：工具调用轮次不会在首个 response.done 时提前结束
+按 app/realtime_with_agent.py 中 on_message_with_agent 的处理顺序回放服务端事件
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.latency_tracer import TurnTracer
+
+# 带 function call 的一轮对话：工具结果触发的回复才包含音频
+AGENT_TURN = [
+    "input_audio_buffer.speech_stopped",
+    "response.function_call_arguments.done",
+    "response.done",
+    "response.audio.delta",
+    "first_audible",
+    "response.done",
+]
+
+
+def on_message_with_agent(tracer: TurnTracer, msg_type: str, mark_tool_requested: bool = True):
+    """与 on_message_with_agent 相同的打点顺序（function call 在消息线程内同步执行）"""
+    if msg_type == "first_audible":
+        # 播放线程把第一个音频样本交给设备
+        tracer.mark("first_audible")
+    elif msg_type == "response.function_call_arguments.done":
+        if mark_tool_requested:
+            tracer.on_server_event(msg_type)
+        tracer.tool_call_started()
+        tracer.tool_call_finished()
+    else:
+        # 其余消息经 rt.on_message 处理
+        tracer.on_server_event(msg_type)
+
+
+def replay(mark_tool_requested: bool) -> list[dict]:
+    with tempfile.TemporaryDirectory() as output_dir:
+        tracer = TurnTracer(output_dir=output_dir)
+        tracer.note_audio(np.full(160, tracer.voice_rms_threshold * 2))
+        for msg_type in AGENT_TURN:
+            on_message_with_agent(tracer, msg_type, mark_tool_requested)
+        with open(tracer.jsonl_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+
+def test_agent_tool_turn():
+    """agent 分支标记 tool_requested 后，整轮只写一条完整记录"""
+    records = replay(mark_tool_requested=True)
+    assert len(records) == 1, records
+    stages = records[0]["stages"]
+    for stage in ("vad_detect", "first_delta", "playback_start", "end_to_end", "tool_call"):
+        assert stage in stages, stages
+
+
+def test_tool_turn_without_tool_requested():
+    """未标记 tool_requested 时，仍以工具往返记录保持本轮"""
+    records = replay(mark_tool_requested=False)
+    assert len(records) == 1, records
+    assert "end_to_end" in records[0]["stages"]
+    assert len(records[0]["stages"]["tool_call"]) == 1
+
+
+if __name__ == "__main__":
+    test_agent_tool_turn()
+    test_tool_turn_without_tool_requested()
+    print("✅ 工具调用轮次延迟记录正确")
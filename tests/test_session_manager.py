@@ -0,0 +1,138 @@
+"""
+测试 RTSessionManager 的断线重连、退避与会话重放
+本地 aiohttp WebSocket 服务端在首个连接收到指定条数消息后断开
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+from aiohttp import web
+
+# 添加 SDK 路径
+SDK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "glm-realtime-sdk", "python")
+if SDK_PATH not in sys.path:
+    sys.path.insert(0, SDK_PATH)
+
+from rtclient import RTSessionManager, close_shared_connector
+
+SESSION_UPDATE = {"type": "session.update", "session": {"instructions": "你是旅行助手"}}
+
+
+def item(text: str) -> dict:
+    return {
+        "type": "conversation.item.create",
+        "item": {"type": "message", "role": "user", "content": [{"type": "input_text", "text": text}]},
+    }
+
+
+class DroppingServer:
+    """首个连接收到 drop_after 条消息后直接断开 TCP 连接（不发送 close 帧）"""
+
+    def __init__(self, drop_after: int, reject: int = 0):
+        self.drop_after = drop_after
+        self.reject = reject
+        self.attempts = 0
+        self.connections: list[list[dict]] = []
+        self.dropped = asyncio.Event()
+
+    async def handler(self, request: web.Request):
+        self.attempts += 1
+        if self.attempts <= self.reject:
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        received: list[dict] = []
+        self.connections.append(received)
+        async for msg in ws:
+            received.append(json.loads(msg.data))
+            if len(self.connections) == 1 and len(received) == self.drop_after:
+                request.transport.abort()
+                self.dropped.set()
+                break
+        return ws
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/", self.handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        return f"ws://127.0.0.1:{port}/"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def send_after_drop(message: dict) -> tuple[DroppingServer, RTSessionManager]:
+    """session.update 与一条条目发出后服务端断开，再发送 message"""
+    server = DroppingServer(drop_after=2)
+    url = await server.start()
+    manager = RTSessionManager(url, initial_backoff=0.01)
+    try:
+        await manager.connect()
+        await manager.send(SESSION_UPDATE)
+        await manager.send(item("你好"))
+        await asyncio.wait_for(server.dropped.wait(), 5)
+        # 等待客户端感知到 TCP 断开；此时 ws.closed 仍为 False
+        await asyncio.sleep(0.1)
+        assert not manager.client.closed
+        await manager.send(message)
+        # 等待服务端处理重放的消息
+        for _ in range(50):
+            if len(server.connections) == 2 and len(server.connections[1]) >= 3:
+                break
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.05)
+    finally:
+        await manager.close()
+        await close_shared_connector()
+        await server.stop()
+    return server, manager
+
+
+def test_replayable_message_resent_once():
+    """发送失败的 conversation.item.create 随重放发送，且只发送一次"""
+    server, manager = asyncio.run(send_after_drop(item("去北京")))
+    assert len(server.connections) == 2
+    assert server.connections[1] == [SESSION_UPDATE, item("你好"), item("去北京")]
+    assert len(manager.reconnect_times) == 1
+
+
+def test_other_message_sent_after_replay():
+    """不可重放的消息在重放之后发送到新连接"""
+    commit = {"type": "input_audio_buffer.commit"}
+    server, manager = asyncio.run(send_after_drop(commit))
+    assert len(server.connections) == 2
+    assert server.connections[1] == [SESSION_UPDATE, item("你好"), commit]
+    assert len(manager.reconnect_times) == 1
+
+
+def test_connect_backoff():
+    """握手被拒绝时按退避重试，直到连接成功"""
+
+    async def run() -> DroppingServer:
+        server = DroppingServer(drop_after=0, reject=2)
+        url = await server.start()
+        manager = RTSessionManager(url, initial_backoff=0.01)
+        try:
+            await manager.connect()
+            assert not manager.client.closed
+        finally:
+            await manager.close()
+            await close_shared_connector()
+            await server.stop()
+        return server
+
+    server = asyncio.run(run())
+    assert server.attempts == 3
+
+
+if __name__ == "__main__":
+    test_replayable_message_resent_once()
+    test_other_message_sent_after_replay()
+    test_connect_backoff()
+    print("✅ 断线重连与会话重放正常")